@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""GPU telemetry sampler with pluggable backends, so every GPU bar module shares one query.
+
+A sample is a GpuSample of the first GPU: name, utilization (%), temperature (°C) and
+memory used/total (bytes). Backends:
+    nvml        libnvidia-ml through ctypes, initialized once and queried in-process
+    nvidia-smi  one `nvidia-smi --query-gpu=...` run per sample with every field at once
+    fake        scripted or synthetic samples, for machines without a GPU
+open_backend("auto") prefers NVML and falls back to nvidia-smi; GPU_BACKEND overrides it.
+GpuSampler takes one sample per tick and keeps it as `latest` for all consumers.
+"""
+
+import ctypes
+import logging
+import math
+import os
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+GpuSample = namedtuple("GpuSample", "name utilization temperature memory_used memory_total")
+BACKENDS = ("auto", "nvml", "nvidia-smi", "fake")
+SMI_FIELDS = "name,utilization.gpu,temperature.gpu,memory.used,memory.total"
+SMI_TIMEOUT = 2.0
+
+
+class GpuError(OSError):
+    """The GPU backend is unavailable or a query failed."""
+
+
+class NvmlBackend:
+    """Persistent NVML session on GPU 0 through ctypes (no process per sample)."""
+
+    name = "nvml"
+    LIBRARIES = ("libnvidia-ml.so.1", "libnvidia-ml.so")
+    NVML_TEMPERATURE_GPU = 0
+
+    class Utilization(ctypes.Structure):
+        _fields_ = [("gpu", ctypes.c_uint), ("memory", ctypes.c_uint)]
+
+    class Memory(ctypes.Structure):
+        _fields_ = [("total", ctypes.c_ulonglong), ("free", ctypes.c_ulonglong), ("used", ctypes.c_ulonglong)]
+
+    def __init__(self, index=0):
+        self.lib = None
+        for library in self.LIBRARIES:
+            try:
+                self.lib = ctypes.CDLL(library)
+                break
+            except OSError:
+                continue
+        if self.lib is None:
+            raise GpuError("libnvidia-ml not found")
+        self._call("nvmlInit_v2")
+        self.handle = ctypes.c_void_p()
+        try:
+            self._call("nvmlDeviceGetHandleByIndex_v2", ctypes.c_uint(index), ctypes.byref(self.handle))
+            name = ctypes.create_string_buffer(96)
+            self._call("nvmlDeviceGetName", self.handle, name, ctypes.c_uint(len(name)))
+        except GpuError:
+            self.lib.nvmlShutdown()
+            raise
+        self.device_name = name.value.decode(errors="replace")
+
+    def _call(self, function, *args):
+        status = getattr(self.lib, function)(*args)
+        if status != 0:
+            self.lib.nvmlErrorString.restype = ctypes.c_char_p
+            message = self.lib.nvmlErrorString(status) or b"unknown error"
+            raise GpuError(f"{function}: {message.decode(errors='replace')}")
+
+    def sample(self):
+        utilization = self.Utilization()
+        temperature = ctypes.c_uint()
+        memory = self.Memory()
+        self._call("nvmlDeviceGetUtilizationRates", self.handle, ctypes.byref(utilization))
+        self._call("nvmlDeviceGetTemperature", self.handle, self.NVML_TEMPERATURE_GPU, ctypes.byref(temperature))
+        self._call("nvmlDeviceGetMemoryInfo", self.handle, ctypes.byref(memory))
+        return GpuSample(self.device_name, float(utilization.gpu), float(temperature.value), memory.used, memory.total)
+
+    def close(self):
+        if self.lib is not None:
+            self.lib.nvmlShutdown()
+            self.lib = None
+
+
+class SmiBackend:
+    """One `nvidia-smi` query per sample, asking for every field in the same call."""
+
+    name = "nvidia-smi"
+
+    def __init__(self, index=0):
+        import shutil
+
+        if not shutil.which("nvidia-smi"):
+            raise GpuError("nvidia-smi not found")
+        self.command = ["nvidia-smi", f"--id={index}", f"--query-gpu={SMI_FIELDS}", "--format=csv,noheader,nounits"]
+
+    def sample(self):
+        import subprocess
+
+        try:
+            result = subprocess.run(self.command, capture_output=True, text=True, timeout=SMI_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise GpuError(f"nvidia-smi: {e}") from e
+        if result.returncode != 0:
+            raise GpuError(f"nvidia-smi: {result.stderr.strip() or f'exit status {result.returncode}'}")
+        return parse_smi_line(result.stdout.strip().splitlines()[0] if result.stdout.strip() else "")
+
+    def close(self):
+        pass
+
+
+def parse_smi_line(line):
+    """GpuSample from one CSV line of SMI_FIELDS (MiB memory, "[N/A]" for unsupported fields)."""
+    fields = [field.strip() for field in line.rsplit(",", 4)]
+    if len(fields) != 5:
+        raise GpuError(f"unexpected nvidia-smi output {line!r}")
+
+    def number(value):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    used, total = number(fields[3]), number(fields[4])
+    if used is None or total is None:
+        raise GpuError(f"no memory figures in {line!r}")
+    return GpuSample(fields[0], number(fields[1]), number(fields[2]), int(used * 2**20), int(total * 2**20))
+
+
+class FakeBackend:
+    """Replays samples in a loop, or synthesizes a slow load wave if none are given."""
+
+    name = "fake"
+
+    def __init__(self, samples=None, device_name="Fake GPU", memory_total=8 * 2**30):
+        self.samples = list(samples or ())
+        self.device_name = device_name
+        self.memory_total = memory_total
+        self.calls = 0
+
+    def sample(self):
+        self.calls += 1
+        if self.samples:
+            sample = self.samples[(self.calls - 1) % len(self.samples)]
+            if isinstance(sample, Exception):
+                raise sample
+            return sample
+        load = (math.sin(self.calls / 5) + 1) / 2
+        return GpuSample(self.device_name, round(load * 100, 1), round(40 + load * 35, 1),
+                         int(self.memory_total * (0.2 + load * 0.6)), self.memory_total)
+
+    def close(self):
+        pass
+
+
+def open_backend(name=None):
+    """Open the named backend (GPU_BACKEND or auto by default), raising GpuError if unavailable."""
+    name = name or os.environ.get("GPU_BACKEND", "auto")
+    if name == "fake":
+        return FakeBackend()
+    if name == "nvml":
+        return NvmlBackend()
+    if name == "nvidia-smi":
+        return SmiBackend()
+    if name != "auto":
+        raise GpuError(f"unknown GPU backend {name!r} (available: {', '.join(BACKENDS)})")
+    try:
+        return NvmlBackend()
+    except GpuError as e:
+        log.info(f"NVML unavailable ({e}), trying nvidia-smi")
+    return SmiBackend()
+
+
+class GpuSampler:
+    """Takes one sample per tick from a backend and caches it for every GPU module.
+
+    sample() returns the new GpuSample, or None while no backend works. A failed
+    backend is closed and reopened at most every RETRY seconds, so a missing driver
+    costs nothing per tick.
+    """
+
+    name = "gpu"
+    RETRY = 30.0
+
+    def __init__(self, backend=None, backend_name=None):
+        self.backend = backend
+        self.backend_name = backend_name
+        self.latest = None
+        self.error = None
+        self._failed_at = None
+
+    def _open(self):
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.RETRY:
+            return None
+        try:
+            self.backend = open_backend(self.backend_name)
+            log.info(f"GPU backend: {self.backend.name}")
+        except GpuError as e:
+            self._fail(e)
+        return self.backend
+
+    def _fail(self, error):
+        if str(error) != str(self.error):
+            log.warning(f"GPU sampling unavailable: {error}")
+        self.error = error
+        self.latest = None
+        self._failed_at = time.monotonic()
+
+    def sample(self):
+        if self.backend is None and self._open() is None:
+            return None
+        try:
+            self.latest = self.backend.sample()
+            self.error = None
+        except GpuError as e:
+            self.backend.close()
+            self.backend = None
+            self._fail(e)
+        return self.latest
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Hyprland IPC client that talks to the compositor's Unix sockets instead of forking hyprctl.
+
+Hyprland answers one request per connection on .socket.sock, so several commands
+are sent together as a [[BATCH]] request; .socket2.sock streams events for as long
+as the connection stays open. MockHyprland serves the same sockets from a temporary
+directory so callers can be exercised without a running compositor.
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+
+DEFAULT_TIMEOUT = 1.0
+# Hyprland separates the replies of a batch with an empty line
+BATCH_SEPARATOR = "\n\n"
+
+
+class HyprlandError(OSError):
+    """Hyprland is not reachable or rejected a command."""
+
+
+def socket_dir(signature=None, runtime_dir=None):
+    """Directory holding the sockets of the given (default: current) Hyprland instance."""
+    signature = signature or os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        raise HyprlandError("HYPRLAND_INSTANCE_SIGNATURE is not set, is Hyprland running?")
+    runtime_dir = runtime_dir or os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    path = os.path.join(runtime_dir, "hypr", signature)
+    # Hyprland before 0.40 kept its sockets under /tmp
+    legacy = os.path.join("/tmp", "hypr", signature)
+    if not os.path.isdir(path) and os.path.isdir(legacy):
+        return legacy
+    return path
+
+
+def _recv_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks).decode("utf-8", "replace")
+        chunks.append(chunk)
+
+
+class HyprlandIPC:
+    """Request/reply client for one Hyprland instance."""
+
+    def __init__(self, signature=None, runtime_dir=None, timeout=DEFAULT_TIMEOUT, path=None):
+        self.path = path or socket_dir(signature, runtime_dir)
+        self.timeout = timeout
+
+    def _exchange(self, socket_name, payload):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(os.path.join(self.path, socket_name))
+            sock.sendall(payload.encode())
+            return _recv_all(sock)
+        except OSError as e:
+            raise HyprlandError(f"{socket_name}: {e}") from e
+        finally:
+            sock.close()
+
+    def request(self, command, json_reply=False):
+        """Send one raw command (e.g. "dispatch exit") and return the reply text or parsed JSON."""
+        reply = self._exchange(".socket.sock", f"j/{command}" if json_reply else command)
+        if not json_reply:
+            return reply
+        try:
+            return json.loads(reply)
+        except ValueError as e:
+            raise HyprlandError(f"{command}: {reply.strip() or e}") from e
+
+    def command(self, command):
+        """Send a command that answers "ok", raising HyprlandError with the reply otherwise."""
+        reply = self.request(command).strip()
+        if reply != "ok":
+            raise HyprlandError(f"{command}: {reply}")
+        return reply
+
+    def batch(self, commands):
+        """Send several commands over one connection and return their replies in order."""
+        commands = list(commands)
+        if not commands:
+            return []
+        reply = self.request("[[BATCH]]" + ";".join(commands))
+        replies = [part.strip() for part in reply.strip().split(BATCH_SEPARATOR)]
+        return replies + [""] * (len(commands) - len(replies))
+
+    def batch_commands(self, commands):
+        """batch() for commands that answer "ok", raising on the first that did not."""
+        commands = list(commands)
+        for command, reply in zip(commands, self.batch(commands)):
+            if reply != "ok":
+                raise HyprlandError(f"{command}: {reply}")
+
+    def keyword(self, name, value):
+        return self.command(f"keyword {name} {value}")
+
+    def dispatch(self, dispatcher, args=""):
+        return self.command(f"dispatch {dispatcher} {args}".rstrip())
+
+    def reload(self):
+        return self.command("reload")
+
+    def monitors(self):
+        return self.request("monitors", json_reply=True)
+
+    def focused_monitor(self):
+        monitors = self.monitors()
+        if not monitors:
+            raise HyprlandError("no monitors")
+        return next((m for m in monitors if m.get("focused")), monitors[0])
+
+    def active_window(self):
+        return self.request("activewindow", json_reply=True)
+
+    def hyprpaper(self, command):
+        """Send a command to hyprpaper's socket, which lives beside Hyprland's."""
+        reply = self._exchange(".hyprpaper.sock", command).strip()
+        if reply != "ok":
+            raise HyprlandError(f"hyprpaper {command}: {reply}")
+        return reply
+
+    def has_hyprpaper(self):
+        try:
+            self._exchange(".hyprpaper.sock", "listloaded")
+            return True
+        except HyprlandError:
+            return False
+
+    def events(self):
+        """Yield (event, data) pairs from the event socket until the connection closes.
+
+        The connection stays open between events; closing the generator closes it.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(os.path.join(self.path, ".socket2.sock"))
+        except OSError as e:
+            sock.close()
+            raise HyprlandError(f".socket2.sock: {e}") from e
+        try:
+            with sock.makefile("r", encoding="utf-8", errors="replace") as stream:
+                for line in stream:
+                    event, _, data = line.rstrip("\n").partition(">>")
+                    yield event, data
+        finally:
+            sock.close()
+
+
+def connect(timeout=DEFAULT_TIMEOUT):
+    """Client for the running Hyprland instance, or None outside Hyprland."""
+    try:
+        ipc = HyprlandIPC(timeout=timeout)
+    except HyprlandError:
+        return None
+    return ipc if os.path.exists(os.path.join(ipc.path, ".socket.sock")) else None
+
+
+class MockHyprland:
+    """Stand-in Hyprland instance serving the IPC sockets from a temporary directory.
+
+    replies maps a request (without the j/ prefix) to its reply: a string, a
+    JSON-serializable object, or a callable taking the request. Unknown requests
+    answer "ok". Every request (batches split into their commands) and every
+    hyprpaper command is recorded, and emit() pushes events to subscribers.
+
+        with MockHyprland({"monitors": [...]}) as hypr:
+            ipc = HyprlandIPC(path=hypr.path)
+    """
+
+    def __init__(self, replies=None):
+        self.replies = dict(replies or {})
+        self.requests = []
+        self.hyprpaper_requests = []
+        self._subscribers = []
+        self._servers = []
+        self._tmp = None
+        self.path = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix="hypr-mock-")
+        self.path = self._tmp.name
+        self._serve(".socket.sock", self._handle_request)
+        self._serve(".socket2.sock", self._handle_subscriber)
+        self._serve(".hyprpaper.sock", self._handle_hyprpaper)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for server in self._servers + self._subscribers:
+            server.close()
+        self._tmp.cleanup()
+
+    def _serve(self, name, handler):
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(os.path.join(self.path, name))
+        server.listen()
+        self._servers.append(server)
+
+        def accept_loop():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                handler(conn)
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+
+    def _reply(self, command):
+        json_reply = command.startswith("j/")
+        command = command[2:] if json_reply else command
+        self.requests.append(command)
+        reply = self.replies.get(command, "ok")
+        if callable(reply):
+            reply = reply(command)
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    def _handle_request(self, conn):
+        with conn:
+            command = conn.recv(65536).decode()
+            if command.startswith("[[BATCH]]"):
+                reply = BATCH_SEPARATOR.join(self._reply(c.strip()) for c in command[9:].split(";"))
+            else:
+                reply = self._reply(command)
+            conn.sendall(reply.encode())
+
+    def _handle_hyprpaper(self, conn):
+        with conn:
+            self.hyprpaper_requests.append(conn.recv(65536).decode())
+            conn.sendall(b"ok")
+
+    def _handle_subscriber(self, conn):
+        self._subscribers.append(conn)
+
+    def emit(self, event, data=""):
+        for conn in list(self._subscribers):
+            try:
+                conn.sendall(f"{event}>>{data}\n".encode())
+            except OSError:
+                self._subscribers.remove(conn)
@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+"""Resident system-metrics daemon streaming bar modules as newline-delimited output.
+
+One process samples every module on a shared tick: /proc/stat and /proc/meminfo (and
+the CPU temperature sensor) stay open and are re-read in place, CPU usage is the delta
+against the previous tick, and one GPU sample per tick (gpu_sampler.py: NVML, else a
+single nvidia-smi query) feeds the vram, gpu-usage, gpu-temp and gpu modules alike.
+Bar modules run the `watch` client, which starts the daemon if needed and relays the
+module's lines to stdout: Waybar's continuous `exec` mode (no interval) and i3blocks'
+`interval=persist` read them as they arrive. A line is written only when it changes.
+
+Every tick is also recorded in a fixed-size history (metrics_history.py, an hour by
+default): Waybar tooltips show sparklines from it and `export` dumps it.
+
+Protocol, one command line per connection on a Unix socket:
+    watch MODULE [FORMAT]   stream MODULE (cpu, memory, vram, gpu-usage, gpu-temp, gpu) as FORMAT lines:
+                            waybar (JSON, default) or i3blocks (plain text)
+    export [MINUTES|all] [csv|json] [COLUMN,...]
+                            the last MINUTES of history (default all, as CSV)
+    get                     one JSON object with the latest sample of every module
+    quit                    stop the daemon
+
+Usage:
+    metrics-daemon.py [--profile-startup] serve [--interval SECONDS] [--history MINUTES]
+    metrics-daemon.py [--profile-startup] watch MODULE [waybar|i3blocks]
+    metrics-daemon.py [--profile-startup] export [MINUTES|all] [csv|json] [COLUMN,...]
+    metrics-daemon.py [--profile-startup] get|quit
+"""
+
+import json
+import logging
+import os
+import selectors
+import socket
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(HERE), "theming-engine"))
+
+import startup_profile
+from metrics_history import MetricHistory, blocks
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+SOCKET_PATH = os.environ.get("METRICS_SOCKET") or os.path.join(RUNTIME_DIR, "metrics.sock")
+DEFAULT_INTERVAL = 2.0
+# History kept in memory; at the default interval an hour is 1800 slots per column
+DEFAULT_HISTORY_MINUTES = 60
+# Samples in a tooltip sparkline (a minute at the default interval)
+SPARKLINE_TICKS = 30
+FORMATS = ("waybar", "i3blocks")
+EXPORT_FORMATS = ("csv", "json")
+# hwmon drivers whose temp1_input is the CPU package or die temperature
+CPU_SENSORS = ("coretemp", "k10temp", "zenpower", "cpu_thermal")
+# A watcher that cannot take a line this big is stuck; drop it instead of blocking the tick
+MAX_PENDING = 64 * 1024
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+log = logging.getLogger(__name__)
+
+
+class ProcFile:
+    """A /proc or /sys file kept open and re-read from offset 0 on every sample."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+
+    def read(self):
+        # pread: no seek, and the kernel regenerates the contents on each read from 0
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.fd, 65536, offset)
+            if not chunk:
+                return b"".join(chunks).decode()
+            chunks.append(chunk)
+            offset += len(chunk)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def cpu_model(path="/proc/cpuinfo"):
+    """First three words of the CPU model name, read once."""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return " ".join(line.split(":", 1)[1].split()[:3])
+    except OSError:
+        pass
+    return "CPU"
+
+
+def find_cpu_sensor(root="/sys/class/hwmon"):
+    """Path of the CPU temperature input, or None."""
+    try:
+        entries = sorted(os.listdir(root))
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            with open(os.path.join(root, entry, "name")) as f:
+                name = f.read().strip()
+        except OSError:
+            continue
+        path = os.path.join(root, entry, "temp1_input")
+        if name in CPU_SENSORS and os.path.exists(path):
+            return path
+    return None
+
+
+class CpuSampler:
+    """CPU usage (htop's definition), total and per core, as the delta of /proc/stat against the previous sample."""
+
+    name = "cpu"
+
+    def __init__(self, stat_path="/proc/stat", sensor_path=None, model=None):
+        self.stat = ProcFile(stat_path)
+        sensor_path = sensor_path or find_cpu_sensor()
+        self.sensor = ProcFile(sensor_path) if sensor_path else None
+        self.model = model or cpu_model()
+        self.previous = self._read_times()
+
+    def _read_times(self):
+        """(busy, total) jiffies for the whole CPU, then for each core."""
+        times = []
+        # The cpu and cpuN lines come first: cpuN user nice system idle iowait irq softirq steal ...
+        for line in self.stat.read().splitlines():
+            if not line.startswith("cpu"):
+                break
+            user, nice, system, idle, iowait, irq, softirq, steal = map(int, line.split()[1:9])
+            busy = user + nice + system + irq + softirq + steal
+            times.append((busy, busy + idle + iowait))
+        return times
+
+    @property
+    def cores(self):
+        return len(self.previous) - 1
+
+    def _temperature(self):
+        if self.sensor is None:
+            return None
+        try:
+            return int(self.sensor.read()) / 1000
+        except (OSError, ValueError):
+            return None
+
+    def sample(self):
+        times = self._read_times()
+        usage = []
+        for (busy, total), (prev_busy, prev_total) in zip(times, self.previous):
+            elapsed = total - prev_total
+            usage.append((busy - prev_busy) * 100 / elapsed if elapsed > 0 else 0.0)
+        self.previous = times
+        return {"usage": usage[0], "cores": usage[1:], "temperature": self._temperature(), "model": self.model}
+
+    def close(self):
+        self.stat.close()
+        if self.sensor:
+            self.sensor.close()
+
+
+class MemorySampler:
+    """Used memory as MemTotal - MemAvailable (what htop shows), plus swap."""
+
+    name = "memory"
+    FIELDS = ("MemTotal", "MemAvailable", "SwapTotal", "SwapFree")
+
+    def __init__(self, meminfo_path="/proc/meminfo"):
+        self.meminfo = ProcFile(meminfo_path)
+
+    def sample(self):
+        values = {}
+        for line in self.meminfo.read().splitlines():
+            key, _, rest = line.partition(":")
+            if key in self.FIELDS:
+                values[key] = int(rest.split()[0]) * 1024
+        total = values.get("MemTotal", 0)
+        used = total - values.get("MemAvailable", 0)
+        return {
+            "total": total,
+            "used": used,
+            "percentage": used * 100 / total if total else 0.0,
+            "swap_total": values.get("SwapTotal", 0),
+            "swap_used": values.get("SwapTotal", 0) - values.get("SwapFree", 0),
+        }
+
+    def close(self):
+        self.meminfo.close()
+
+
+def _gib(value):
+    return f"{value / 2**30:.1f}"
+
+
+def _trend(history, column, high=100.0):
+    """Tooltip line with a sparkline of column over the last SPARKLINE_TICKS samples."""
+    if history is None or history.count < 2:
+        return ""
+    width = min(SPARKLINE_TICKS, history.count)
+    span = width * history.interval
+    label = f"{span / 60:.0f} min" if span >= 60 else f"{span:.0f} s"
+    return f"\nLast {label}: {history.sparkline(column, width, high=high)}"
+
+
+def format_cpu(sample, fmt, history=None):
+    percent = round(sample["usage"])
+    temperature = sample["temperature"]
+    if fmt == "i3blocks":
+        temp = f"{temperature:.0f}°" if temperature is not None else "N/A"
+        return f"{sample['model']} {sample['usage']:.1f}% {temp}"
+    tooltip = f"CPU: {percent}% used"
+    if temperature is not None:
+        tooltip += f"\nTemperature: {temperature:.0f}°C"
+    tooltip += _trend(history, "cpu")
+    if sample["cores"]:
+        tooltip += f"\nCores: {blocks(sample['cores'])}"
+    return {"text": f"{percent}%", "tooltip": tooltip, "percentage": percent}
+
+
+def format_memory(sample, fmt, history=None):
+    percent = round(sample["percentage"])
+    if fmt == "i3blocks":
+        return f"{_gib(sample['used'])}GB/{_gib(sample['total'])}GB"
+    return {"text": f"{_gib(sample['used'])}/{_gib(sample['total'])}G",
+            "tooltip": f"RAM: {percent}% used\nSwap: {_gib(sample['swap_used'])}/{_gib(sample['swap_total'])}G"
+                       + _trend(history, "memory"),
+            "percentage": percent}
+
+
+def format_vram(sample, fmt, history=None):
+    if sample is None:
+        return "N/A" if fmt == "i3blocks" else {"text": "N/A", "tooltip": "GPU unavailable"}
+    percent = int(sample.memory_used * 100 / sample.memory_total) if sample.memory_total else 0
+    if fmt == "i3blocks":
+        return f"{_gib(sample.memory_used)}GB/{_gib(sample.memory_total)}GB"
+    return {"text": f"{_gib(sample.memory_used)}G/{_gib(sample.memory_total)}G",
+            "tooltip": f"VRAM: {percent}% used" + _trend(history, "vram"), "percentage": percent}
+
+
+def _reading(value, unit):
+    return f"{value:.0f}{unit}" if value is not None else "N/A"
+
+
+def format_gpu_usage(sample, fmt, history=None):
+    if sample is None:
+        return "N/A" if fmt == "i3blocks" else {"text": "N/A", "tooltip": "GPU unavailable"}
+    text = _reading(sample.utilization, "%")
+    if fmt == "i3blocks":
+        return text
+    return {"text": text, "tooltip": f"{sample.name}: {text} busy" + _trend(history, "gpu_usage"),
+            "percentage": round(sample.utilization or 0)}
+
+
+def format_gpu_temp(sample, fmt, history=None):
+    if sample is None:
+        return "N/A" if fmt == "i3blocks" else {"text": "N/A", "tooltip": "GPU unavailable"}
+    text = _reading(sample.temperature, "°")
+    if fmt == "i3blocks":
+        return text
+    return {"text": text,
+            "tooltip": f"{sample.name}: {_reading(sample.temperature, '°C')}" + _trend(history, "gpu_temp", high=None)}
+
+
+def format_gpu(sample, fmt, history=None):
+    """Name, usage and temperature together (the i3blocks gpu_info block)."""
+    if sample is None:
+        text = "Integrated N/A"
+        return text if fmt == "i3blocks" else {"text": text, "tooltip": "GPU unavailable"}
+    # "NVIDIA GeForce RTX 4070" -> "NVIDIA GeForce", as the bar has always shown it
+    name = " ".join(sample.name.split()[:2])
+    text = f"{name} {_reading(sample.utilization, '%')} {_reading(sample.temperature, '°')}"
+    if fmt == "i3blocks":
+        return text
+    return {"text": text, "tooltip": f"{sample.name}\nVRAM: {format_vram(sample, 'i3blocks')}"
+                                     + _trend(history, "gpu_usage")}
+
+
+# Module -> (sample it is rendered from, formatter); the GPU modules share one sample per tick
+MODULES = {
+    "cpu": ("cpu", format_cpu),
+    "memory": ("memory", format_memory),
+    "vram": ("gpu", format_vram),
+    "gpu-usage": ("gpu", format_gpu_usage),
+    "gpu-temp": ("gpu", format_gpu_temp),
+    "gpu": ("gpu", format_gpu),
+}
+
+
+def render(module, samples, fmt, history=None):
+    """One output line (without newline) for module in fmt from the latest samples."""
+    source, formatter = MODULES[module]
+    out = formatter(samples.get(source), fmt, history)
+    return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False)
+
+
+def history_columns(cores):
+    """History columns: total CPU, one per core, then memory, GPU and temperatures (percent or °C)."""
+    return ("cpu", *(f"cpu{core}" for core in range(cores)), "cpu_temp", "memory", "swap",
+            "vram", "gpu_usage", "gpu_temp")
+
+
+def history_values(samples):
+    """The history columns' values for one tick of samples (None where a reading is missing)."""
+    values = {}
+    cpu = samples.get("cpu")
+    if cpu:
+        values["cpu"] = cpu["usage"]
+        values["cpu_temp"] = cpu["temperature"]
+        for core, usage in enumerate(cpu["cores"]):
+            values[f"cpu{core}"] = usage
+    memory = samples.get("memory")
+    if memory:
+        values["memory"] = memory["percentage"]
+        if memory["swap_total"]:
+            values["swap"] = memory["swap_used"] * 100 / memory["swap_total"]
+    gpu = samples.get("gpu")
+    if gpu:
+        if gpu.memory_total:
+            values["vram"] = gpu.memory_used * 100 / gpu.memory_total
+        values["gpu_usage"] = gpu.utilization
+        values["gpu_temp"] = gpu.temperature
+    return values
+
+
+class Watcher:
+    """One client connection streaming one module in one format."""
+
+    def __init__(self, sock, module, fmt):
+        self.sock = sock
+        self.module = module
+        self.fmt = fmt
+        self.last = None
+        self.pending = b""
+
+    def offer(self, line):
+        """Queue line unless it repeats the last one; returns False if the client is gone or stuck."""
+        if line == self.last:
+            return True
+        self.last = line
+        self.pending += f"{line}\n".encode()
+        return self.flush()
+
+    def flush(self):
+        try:
+            sent = self.sock.send(self.pending)
+            self.pending = self.pending[sent:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            return False
+        return len(self.pending) <= MAX_PENDING
+
+
+class MetricsDaemon:
+    """Samples every module once per tick and fans the lines out to the watchers."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, samplers=None, history_minutes=DEFAULT_HISTORY_MINUTES):
+        self.interval = interval
+        self.selector = selectors.DefaultSelector()
+        if samplers is None:
+            from gpu_sampler import GpuSampler
+
+            samplers = {"cpu": CpuSampler(), "memory": MemorySampler(), "gpu": GpuSampler()}
+        self.samplers = samplers
+        self.samples = {}
+        cores = getattr(samplers.get("cpu"), "cores", 0)
+        self.history = MetricHistory(history_columns(cores), max(1, round(history_minutes * 60 / interval)), interval)
+        log.info(f"Keeping {history_minutes} min of history ({self.history.nbytes // 1024} KiB)")
+        self.watchers = {}
+        self.server = None
+        self.server_path = None
+        self.running = False
+
+    def listen(self, path=SOCKET_PATH):
+        # Only reached when nobody answers on the socket, so a leftover file is stale
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            self.server.bind(path)
+        finally:
+            os.umask(old_umask)
+        self.server_path = path
+        self.server.listen(16)
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, self._accept)
+        log.info(f"Listening on {path}")
+
+    def _accept(self, server):
+        try:
+            conn, _ = server.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self.selector.register(conn, selectors.EVENT_READ, self._read_command)
+
+    def _read_command(self, conn):
+        # Commands are one short line, sent right after connecting
+        try:
+            data = conn.recv(256)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        watcher = self.watchers.get(conn)
+        if watcher is not None or not data:
+            # Watchers send nothing after their command: data or EOF means they went away
+            self._drop(conn)
+            return
+        line = data.decode("utf-8", "replace").strip()
+        reply = self.handle(conn, line)
+        if reply is not None:
+            try:
+                conn.sendall(f"{reply}\n".encode())
+            except OSError:
+                pass
+            self._drop(conn)
+
+    def handle(self, conn, line):
+        """Run a command; returns the reply, or None if conn became a watcher."""
+        if not line.split():
+            return "error: empty command"
+        command, *args = line.split()
+        if command == "watch" and args and args[0] in MODULES:
+            fmt = args[1] if len(args) > 1 else "waybar"
+            if fmt not in FORMATS:
+                return f"error: unknown format {fmt!r} (available: {', '.join(FORMATS)})"
+            watcher = self.watchers[conn] = Watcher(conn, args[0], fmt)
+            if MODULES[args[0]][0] in self.samples:
+                watcher.offer(render(args[0], self.samples, fmt, self.history))
+            return None
+        if command == "watch":
+            return f"error: unknown module (available: {', '.join(MODULES)})"
+        if command == "get":
+            return json.dumps({name: sample._asdict() if hasattr(sample, "_asdict") else sample
+                               for name, sample in self.samples.items()})
+        if command == "export":
+            return self.export(conn, args)
+        if command == "quit":
+            self.running = False
+            return "ok"
+        return f"error: unknown command {line!r}"
+
+    def export(self, conn, args):
+        """Stream `export [MINUTES] [csv|json] [COLUMN,...]` to conn; returns an error reply or None."""
+        try:
+            seconds = float(args[0]) * 60 if args and args[0] != "all" else None
+        except ValueError:
+            return f"error: bad number of minutes {args[0]!r}"
+        fmt = args[1] if len(args) > 1 else "csv"
+        if fmt not in EXPORT_FORMATS:
+            return f"error: unknown export format {fmt!r} (available: {', '.join(EXPORT_FORMATS)})"
+        columns = args[2].split(",") if len(args) > 2 else None
+        unknown = [name for name in columns or () if name not in self.history.values]
+        if unknown:
+            return f"error: unknown columns {', '.join(unknown)} (available: {', '.join(self.history.columns)})"
+        # Written row by row straight to the socket; blocking, as the client reads it all at once
+        conn.settimeout(5)
+        try:
+            with conn.makefile("w", encoding="utf-8") as out:
+                getattr(self.history, f"export_{fmt}")(out, seconds, columns=columns)
+        except OSError as e:
+            log.warning(f"History export failed: {e}")
+        self._drop(conn)
+        return None
+
+    def _drop(self, conn):
+        self.watchers.pop(conn, None)
+        try:
+            self.selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        conn.close()
+
+    def tick(self):
+        """Take one sample of every module, record it and send each watcher its line if it changed."""
+        for name, sampler in self.samplers.items():
+            try:
+                self.samples[name] = sampler.sample()
+            except (OSError, ValueError) as e:
+                log.warning(f"Sampling {name} failed: {e}")
+        self.history.record(time.time(), history_values(self.samples))
+        lines = {}
+        for conn, watcher in list(self.watchers.items()):
+            key = (watcher.module, watcher.fmt)
+            if key not in lines:
+                lines[key] = render(watcher.module, self.samples, watcher.fmt, self.history)
+            if not watcher.offer(lines[key]):
+                self._drop(conn)
+
+    def run(self):
+        self.running = True
+        # The first tick waits one interval so the CPU delta spans a full period
+        next_tick = time.monotonic() + self.interval
+        while self.running:
+            timeout = max(0.0, next_tick - time.monotonic())
+            for key, _ in self.selector.select(timeout):
+                try:
+                    key.data(key.fileobj)
+                except Exception:
+                    # One misbehaving client must not take the daemon and its history down
+                    log.exception("Error handling a client")
+                    if key.fileobj is not self.server:
+                        self._drop(key.fileobj)
+            if time.monotonic() >= next_tick:
+                try:
+                    self.tick()
+                except Exception:
+                    log.exception("Error during tick")
+                next_tick += self.interval
+                # After a suspend, resume the schedule instead of catching up
+                if next_tick < time.monotonic():
+                    next_tick = time.monotonic() + self.interval
+
+    def close(self):
+        for conn in list(self.watchers):
+            self._drop(conn)
+        if self.server is not None:
+            self.selector.unregister(self.server)
+            self.server.close()
+            try:
+                os.unlink(self.server_path)
+            except OSError:
+                pass
+        for sampler in self.samplers.values():
+            sampler.close()
+        self.selector.close()
+
+
+def connect(timeout=None):
+    """Connected socket to the daemon, or None if nobody answers."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(SOCKET_PATH)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def request(command, timeout=1.0):
+    """Send one command and return the daemon's reply, or None if it is not running."""
+    sock = connect(timeout)
+    if sock is None:
+        return None
+    try:
+        sock.sendall(f"{command}\n".encode())
+        return sock.makefile("r").readline().strip()
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+
+def export(args):
+    """Copy a history export from the daemon to stdout."""
+    sock = connect(5)
+    if sock is None:
+        print("Metrics daemon is not running", file=sys.stderr)
+        return 1
+    with sock:
+        sock.sendall(f"export {' '.join(args)}\n".encode())
+        first = True
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return 0
+            if first and chunk.startswith(b"error:"):
+                sys.stderr.write(chunk.decode("utf-8", "replace"))
+                return 1
+            first = False
+            sys.stdout.buffer.write(chunk)
+
+
+def start_daemon():
+    import subprocess
+
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve"], stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def watch(module, fmt):
+    """Relay module's lines to stdout for the bar, (re)starting the daemon whenever it is gone."""
+    while True:
+        sock = connect()
+        if sock is None:
+            start_daemon()
+            for _ in range(20):
+                time.sleep(0.1)
+                sock = connect()
+                if sock is not None:
+                    break
+            else:
+                # Another watcher may be starting it, or it failed; try again shortly
+                time.sleep(2)
+                continue
+        with sock:
+            sock.sendall(f"watch {module} {fmt}\n".encode())
+            for line in sock.makefile("r", encoding="utf-8"):
+                if line.startswith("error:"):
+                    print(line.strip(), file=sys.stderr)
+                    return 1
+                sys.stdout.write(line)
+                sys.stdout.flush()
+        time.sleep(1)
+
+
+def serve(interval, history_minutes):
+    # Checked before binding: the bar starts one watcher per module at once
+    sock = connect()
+    if sock is not None:
+        sock.close()
+        log.info("Metrics daemon already running")
+        return 0
+    import fcntl
+
+    lock = open(f"{SOCKET_PATH}.lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        log.info("Metrics daemon already starting")
+        return 0
+    daemon = MetricsDaemon(interval, history_minutes=history_minutes)
+    daemon.listen(SOCKET_PATH)
+    startup_profile.mark()
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        lock.close()
+    return 0
+
+
+USAGE = ("Usage: metrics-daemon.py [--profile-startup] serve [--interval SECONDS] [--history MINUTES]\n"
+         "       metrics-daemon.py [--profile-startup] watch MODULE [waybar|i3blocks]\n"
+         "       metrics-daemon.py [--profile-startup] export [MINUTES|all] [csv|json] [COLUMN,...]\n"
+         "       metrics-daemon.py [--profile-startup] get|quit")
+
+
+def parse_serve_options(args):
+    """{option: value} for serve's --interval/--history pairs, or None if they do not parse."""
+    options = {"--interval": DEFAULT_INTERVAL, "--history": DEFAULT_HISTORY_MINUTES}
+    if len(args) % 2:
+        return None
+    for option, value in zip(args[::2], args[1::2]):
+        if option not in options:
+            return None
+        try:
+            options[option] = float(value)
+        except ValueError:
+            return None
+    return options if options["--interval"] > 0 and options["--history"] > 0 else None
+
+
+def main():
+    startup_profile.maybe_profile()
+    args = sys.argv[1:]
+    options = parse_serve_options(args[1:]) if args[:1] == ["serve"] else None
+    if options is not None:
+        sys.exit(serve(options["--interval"], options["--history"]))
+    if args[:1] == ["watch"] and len(args) in (2, 3):
+        startup_profile.mark()
+        try:
+            sys.exit(watch(args[1], args[2] if len(args) == 3 else "waybar"))
+        except (KeyboardInterrupt, BrokenPipeError):
+            sys.exit(0)
+    if args[:1] == ["export"] and len(args) <= 4:
+        startup_profile.mark()
+        try:
+            sys.exit(export(args[1:]))
+        except BrokenPipeError:
+            sys.exit(0)
+    if args in (["get"], ["quit"]):
+        startup_profile.mark()
+        reply = request(args[0])
+        if reply is None:
+            print("Metrics daemon is not running", file=sys.stderr)
+            sys.exit(1 if args[0] == "get" else 0)
+        print(reply)
+        sys.exit(1 if reply.startswith("error") else 0)
+    print(USAGE, file=sys.stderr)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Fixed-size metric history for the metrics daemon: ring buffers, sparklines and export.
+
+Every column (total and per-core CPU, memory, VRAM, temperatures...) is one array('f')
+preallocated to the capacity, with a shared array('d') of timestamps, so recording a
+tick writes into existing slots and memory stays the same however long the daemon
+runs. Missing readings are stored as NaN. Queries walk the slots in place instead of
+copying the buffers.
+"""
+
+import json
+import math
+import time
+from array import array
+
+NAN = float("nan")
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def blocks(values, low=0.0, high=100.0):
+    """Values as block characters scaled to low..high, NaN as a space."""
+    span = (high - low) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(" " if math.isnan(value) else SPARK_CHARS[max(0, min(top, round((value - low) / span * top)))]
+                   for value in values)
+
+
+class MetricHistory:
+    """The last `capacity` ticks of a fixed set of columns, recorded every `interval` seconds."""
+
+    def __init__(self, columns, capacity, interval):
+        if capacity < 1:
+            raise ValueError("history capacity must be at least 1")
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self.interval = interval
+        self.times = array("d", [0.0]) * capacity
+        self.values = {name: array("f", [NAN]) * capacity for name in self.columns}
+        # Slot the next record goes to, and how many slots hold records
+        self.head = 0
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (self.times, *self.values.values()))
+
+    def record(self, timestamp, values):
+        """Store one tick; columns missing from values (or None) are recorded as NaN."""
+        slot = self.head
+        self.times[slot] = timestamp
+        for name, column in self.values.items():
+            value = values.get(name)
+            column[slot] = NAN if value is None else value
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def slots(self, n=None):
+        """Slot indices of the last n records (all by default), oldest first."""
+        n = self.count if n is None else max(0, min(n, self.count))
+        start = self.head - n
+        return (slot % self.capacity for slot in range(start, start + n))
+
+    def count_since(self, seconds, now=None):
+        """How many of the most recent records are no older than seconds before now."""
+        cutoff = (time.time() if now is None else now) - seconds
+        n = 0
+        while n < self.count and self.times[(self.head - 1 - n) % self.capacity] >= cutoff:
+            n += 1
+        return n
+
+    def sparkline(self, name, width, low=0.0, high=100.0):
+        """The last width values of a column as block characters, scaled to low..high.
+
+        With high=None the scale is the window's own range, for readings like
+        temperatures that have no natural maximum. NaN renders as a space.
+        """
+        column = self.values[name]
+        if high is None:
+            window = [column[slot] for slot in self.slots(width) if not math.isnan(column[slot])]
+            if not window:
+                return ""
+            low, high = min(window), max(window)
+        return blocks((column[slot] for slot in self.slots(width)), low, high)
+
+    def _selection(self, seconds, now, columns):
+        columns = self.columns if columns is None else tuple(columns)
+        unknown = [name for name in columns if name not in self.values]
+        if unknown:
+            raise KeyError(f"unknown columns: {', '.join(unknown)} (available: {', '.join(self.columns)})")
+        n = self.count if seconds is None else self.count_since(seconds, now)
+        return columns, [self.values[name] for name in columns], n
+
+    @staticmethod
+    def _cell(value):
+        return "" if math.isnan(value) else f"{value:.1f}"
+
+    def export_csv(self, out, seconds=None, now=None, columns=None):
+        """Write the last seconds of history (all by default) to out as CSV, one row at a time."""
+        columns, arrays, n = self._selection(seconds, now, columns)
+        out.write(",".join(("time", *columns)) + "\n")
+        for slot in self.slots(n):
+            out.write(f"{self.times[slot]:.3f}," + ",".join(self._cell(column[slot]) for column in arrays) + "\n")
+        return n
+
+    def export_json(self, out, seconds=None, now=None, columns=None):
+        """Write the last seconds of history as {"columns": [...], "rows": [[time, ...], ...]}, streamed."""
+        columns, arrays, n = self._selection(seconds, now, columns)
+        out.write('{"columns": ' + json.dumps(["time", *columns]) + ', "rows": [')
+        for i, slot in enumerate(self.slots(n)):
+            cells = ("null" if math.isnan(column[slot]) else f"{column[slot]:.1f}" for column in arrays)
+            out.write(("," if i else "") + f"\n[{self.times[slot]:.3f}," + ",".join(cells) + "]")
+        out.write("\n]}\n")
+        return n
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Resident popup-bar server - keeps one QApplication with every popup bar pre-built and hidden.
+
+Bars are the PopupBar subclasses registered by the `*-bar.py` scripts (see popup_bar.py).
+
+popup-bar.py sends one command line per connection on a Unix socket:
+    toggle NAME   show the bar (hiding any other one), or hide it if it is open
+    hide          hide whichever bar is open
+    status        report the bars and which one is open
+    quit          stop the server
+Only one bar is ever visible, so no PID lock files are needed.
+"""
+
+import logging
+import os
+import socket
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(HERE), "theming-engine"))
+
+import startup_profile
+
+SOCKET_PATH = os.environ.get("POPUP_BAR_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}"), "popup-bars.sock"
+)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.expanduser("~/popup-bar-server.log")),
+        logging.StreamHandler(),
+    ],
+)
+log = logging.getLogger(__name__)
+
+
+def socket_in_use(path):
+    """Return True if another server is answering on the socket."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class PopupBarServer:
+    def __init__(self, app):
+        from PyQt6.QtNetwork import QLocalServer
+
+        import hypr_ipc
+        import popup_bar
+
+        self.app = app
+        self.ipc = hypr_ipc.connect()
+        self.monitors = popup_bar.MonitorGeometry(self.ipc)
+        self.theme_mtime = popup_bar.theme_mtime()
+        colors = popup_bar.load_theme_colors()
+        self.bars = {name: cls(colors) for name, cls in popup_bar.load_bars().items()}
+        for bar in self.bars.values():
+            bar.adjustSize()
+        self.server = QLocalServer()
+        self.server.newConnection.connect(self._on_connection)
+
+    def listen(self, path):
+        from PyQt6.QtNetwork import QLocalServer
+
+        # Only reached when nobody answers on the socket, so a leftover file is stale
+        QLocalServer.removeServer(path)
+        old_umask = os.umask(0o077)
+        try:
+            ok = self.server.listen(path)
+        finally:
+            os.umask(old_umask)
+        if not ok:
+            raise RuntimeError(f"Cannot listen on {path}: {self.server.errorString()}")
+        self.app.aboutToQuit.connect(self.server.close)
+        log.info(f"Listening on {path}")
+
+    def _on_connection(self):
+        conn = self.server.nextPendingConnection()
+        conn.readyRead.connect(lambda: self._on_ready_read(conn))
+        conn.disconnected.connect(conn.deleteLater)
+
+    def _on_ready_read(self, conn):
+        if not conn.canReadLine():
+            return
+        line = bytes(conn.readLine()).decode("utf-8", "replace").strip()
+        try:
+            reply = self.handle(line)
+        except Exception as e:
+            log.exception(f"Error handling {line!r}")
+            reply = f"error: {e}"
+        conn.write(f"{reply}\n".encode())
+        conn.flush()
+        conn.disconnectFromServer()
+
+    def handle(self, line):
+        command, _, arg = line.partition(" ")
+        if command == "toggle":
+            return self.toggle(arg.strip())
+        if command == "hide":
+            self.hide_all()
+            return "ok"
+        if command == "status":
+            visible = [name for name, bar in self.bars.items() if bar.isVisible()]
+            return f"bars: {', '.join(self.bars)}; open: {', '.join(visible) or 'none'}"
+        if command == "quit":
+            self.app.quit()
+            return "ok"
+        return f"error: unknown command {line!r}"
+
+    def toggle(self, name):
+        bar = self.bars.get(name)
+        if bar is None:
+            return f"error: unknown bar {name!r} (available: {', '.join(self.bars)})"
+        if bar.isVisible():
+            log.info(f"Hiding {name}")
+            bar.hide()
+        else:
+            self.hide_all()
+            self.show_bar(bar)
+        return "ok"
+
+    def hide_all(self):
+        for bar in self.bars.values():
+            if bar.isVisible():
+                bar.hide()
+
+    def refresh_colors(self):
+        """Restyle the bars if the theming engine applied a new theme since the last show."""
+        import popup_bar
+
+        mtime = popup_bar.theme_mtime()
+        if mtime == self.theme_mtime:
+            return
+        self.theme_mtime = mtime
+        colors = popup_bar.load_theme_colors()
+        for bar in self.bars.values():
+            bar.apply_colors(colors)
+
+    def show_bar(self, bar):
+        self.refresh_colors()
+        bar.popup(self.monitors, self.ipc)
+
+
+def main():
+    startup_profile.maybe_profile()
+    toggle = None
+    if len(sys.argv) == 3 and sys.argv[1] == "--toggle":
+        toggle = sys.argv[2]
+    elif len(sys.argv) != 1:
+        print("Usage: popup-bar-server.py [--profile-startup] [--toggle BAR_NAME]", file=sys.stderr)
+        sys.exit(1)
+
+    # Checked before importing Qt: a second server just hands its request to the first
+    if socket_in_use(SOCKET_PATH):
+        log.info("Server already running")
+        if toggle:
+            import subprocess
+            subprocess.run([sys.executable, os.path.join(HERE, "popup-bar.py"), toggle])
+        sys.exit(0)
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+    # Hidden bars must not end the event loop
+    app.setQuitOnLastWindowClosed(False)
+    server = PopupBarServer(app)
+    server.listen(SOCKET_PATH)
+    startup_profile.mark()
+    if toggle:
+        QTimer.singleShot(0, lambda: server.toggle(toggle))
+    log.info("popup-bar-server ready")
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
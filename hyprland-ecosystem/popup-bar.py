@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Toggle a popup bar in the resident popup-bar server, starting the server if it is not running.
+
+Stdlib only and no Qt, so a key press costs one short Python start and a socket write.
+Run with --profile-startup to see where that start goes (see theming-engine/startup_profile.py).
+"""
+
+import os
+import socket
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(HERE), "theming-engine"))
+
+import startup_profile
+
+SOCKET_PATH = os.environ.get("POPUP_BAR_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}"), "popup-bars.sock"
+)
+SERVER = os.path.join(HERE, "popup-bar-server.py")
+COMMANDS = ("hide", "status", "quit")
+
+
+def send(command, timeout=1.0):
+    """Send one command line to the server and return its reply, or None if no server answers."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(SOCKET_PATH)
+        sock.sendall(f"{command}\n".encode())
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+        return reply.decode().strip()
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+
+def start_server(*args):
+    import subprocess
+
+    subprocess.Popen([sys.executable, SERVER, *args], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def main():
+    startup_profile.maybe_profile()
+    if len(sys.argv) != 2:
+        print("Usage: popup-bar.py [--profile-startup] <BAR_NAME|hide|status|quit>", file=sys.stderr)
+        sys.exit(1)
+    arg = sys.argv[1]
+    command = arg if arg in COMMANDS else f"toggle {arg}"
+
+    startup_profile.mark()
+    reply = send(command)
+    if reply is None:
+        if arg in COMMANDS:
+            print("Popup bar server is not running", file=sys.stderr)
+            sys.exit(1 if arg == "status" else 0)
+        # First press after login (or after a crash): the server shows the bar once it is up
+        start_server("--toggle", arg)
+        return
+    if reply != "ok":
+        print(reply, file=sys.stderr if reply.startswith("error") else sys.stdout)
+        sys.exit(1 if reply.startswith("error") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Shared popup-bar framework: PopupBar base widget, bar registry, theming and positioning.
+
+A bar is a `*-bar.py` script in this directory defining a PopupBar subclass with
+a button table and a run_action() method, registered under the name the client
+uses (`popup-bar.py NAME`). Colors come from the theme the theming engine last
+applied, so the bars follow the wallpaper like the rest of the desktop.
+"""
+
+import glob
+import importlib.util
+import json
+import logging
+import os
+import sys
+import threading
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFont, QCursor
+from PyQt6.QtWidgets import QApplication, QWidget, QHBoxLayout, QPushButton
+
+import hypr_ipc
+
+log = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CURRENT_THEME = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "theming-engine", "current-theme.json"
+)
+# Wofi-matched colors, used until the theming engine has written a theme
+DEFAULT_COLORS = {
+    "background": (20, 22, 28),
+    "border": (100, 110, 130),
+    "text": (176, 184, 196),
+    "text_active": (224, 228, 234),
+    "highlight": (80, 100, 130),
+}
+# Popup color -> theming engine role (the waybar panel roles, so bar and popups match)
+THEME_ROLES = {
+    "background": "panel_bg",
+    "border": "accent_border",
+    "text": "panel_text_dim",
+    "text_active": "panel_text",
+    "highlight": "accent",
+}
+FONT = ("VictorMono Nerd Font", 14)
+# Distance of the bar from the bottom edge of the monitor
+BOTTOM_MARGIN = 80
+
+BARS = {}
+
+
+def register(name):
+    """Class decorator adding a PopupBar subclass to the registry under name."""
+    def decorator(cls):
+        cls.name = name
+        BARS[name] = cls
+        return cls
+    return decorator
+
+
+def load_bars(directory=HERE):
+    """Import every `*-bar.py` script in directory so its bars register themselves."""
+    for path in sorted(glob.glob(os.path.join(directory, "*-bar.py"))):
+        name = os.path.basename(path)[:-3].replace("-", "_")
+        if name in sys.modules:
+            continue
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[name]
+            log.exception(f"Failed to load bar script {path}")
+    return BARS
+
+
+def _hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def theme_mtime(path=CURRENT_THEME):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_theme_colors(path=CURRENT_THEME):
+    """Popup colors from the current generated theme, falling back to DEFAULT_COLORS."""
+    try:
+        with open(path) as f:
+            roles = json.load(f)["roles"]
+        return {key: _hex_to_rgb(roles[role]) for key, role in THEME_ROLES.items()}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.debug(f"Using default popup colors: {e}")
+        return dict(DEFAULT_COLORS)
+
+
+def stylesheet(colors):
+    def rgba(key, alpha):
+        return "rgba({}, {}, {}, {})".format(*colors[key], alpha)
+
+    def rgb(key):
+        return "#{:02x}{:02x}{:02x}".format(*colors[key])
+
+    return f"""
+        QWidget#bar {{
+            background-color: {rgba("background", 180)};
+            border-radius: 12px;
+            border: 1px solid {rgba("border", 77)};
+        }}
+        QPushButton {{
+            background-color: transparent;
+            color: {rgb("text")};
+            border: none;
+            border-radius: 8px;
+            padding: 12px 24px;
+            font-size: 14px;
+            outline: none;
+        }}
+        QPushButton:hover, QPushButton:focus {{
+            background-color: {rgba("highlight", 51)};
+            color: {rgb("text_active")};
+        }}
+        QPushButton:pressed {{
+            background-color: {rgba("highlight", 77)};
+        }}
+    """
+
+
+def set_window_rule(ipc, rule):
+    """Add (or unset) a window rule over the Hyprland socket."""
+    if ipc is None:
+        return
+    try:
+        ipc.keyword("windowrule", rule)
+    except OSError as e:
+        log.warning(f"Failed to set window rule '{rule}': {e}")
+
+
+class MonitorGeometry:
+    """Focused monitor geometry, cached and kept current from Hyprland's event socket.
+
+    The monitor list is fetched once; focus changes arrive as focusedmon events and
+    monitor hotplug or a config reload drops the cache. If the event stream ends the
+    cache is no longer trusted and every lookup asks Hyprland again.
+    """
+
+    LAYOUT_EVENTS = {"monitoradded", "monitoraddedv2", "monitorremoved", "monitorremovedv2", "configreloaded"}
+    FALLBACK = (0, 0, 1920, 1080)
+
+    def __init__(self, ipc):
+        self.ipc = ipc
+        self._lock = threading.Lock()
+        self._monitors = None
+        self._focused = None
+        self._watching = ipc is not None
+        if self._watching:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        try:
+            for event, data in self.ipc.events():
+                with self._lock:
+                    if event == "focusedmon":
+                        self._focused = data.split(",", 1)[0]
+                    elif event in self.LAYOUT_EVENTS:
+                        self._monitors = None
+        except OSError as e:
+            log.warning(f"Hyprland event stream failed: {e}")
+        with self._lock:
+            self._watching = False
+            self._monitors = None
+
+    def _fetch(self):
+        monitors, focused = {}, None
+        for m in self.ipc.monitors():
+            scale = m.get("scale", 1.0)
+            monitors[m["name"]] = (m["x"], m["y"], int(m["width"] / scale), int(m["height"] / scale))
+            if m.get("focused"):
+                focused = m["name"]
+        if not monitors:
+            raise hypr_ipc.HyprlandError("no monitors")
+        return monitors, focused or next(iter(monitors))
+
+    def focused(self):
+        """(x, y, width, height) of the focused monitor in logical pixels."""
+        if self.ipc is None:
+            return self.FALLBACK
+        with self._lock:
+            if self._monitors is not None and self._focused in self._monitors:
+                return self._monitors[self._focused]
+        try:
+            monitors, focused = self._fetch()
+        except (OSError, KeyError, TypeError) as e:
+            log.warning(f"Failed to get monitor info: {e}")
+            return self.FALLBACK
+        with self._lock:
+            if self._watching:
+                self._monitors, self._focused = monitors, focused
+        return monitors[focused]
+
+
+class PopupBar(QWidget):
+    """Frameless row of buttons shown at the bottom center of the focused monitor.
+
+    Subclasses set title (the window title Hyprland's window rules match) and
+    buttons, a sequence of (label, action) pairs, and implement run_action(action).
+    """
+
+    name = None
+    title = None
+    buttons = ()
+
+    def __init__(self, colors=None):
+        super().__init__()
+        self.setWindowFlags(
+            Qt.WindowType.FramelessWindowHint
+            | Qt.WindowType.WindowStaysOnTopHint
+        )
+        self.setWindowTitle(self.title)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.apply_colors(colors or load_theme_colors())
+        self._build_ui()
+
+    def apply_colors(self, colors):
+        self.setStyleSheet(stylesheet(colors))
+
+    def _build_ui(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+
+        container = QWidget(self)
+        container.setObjectName("bar")
+        inner = QHBoxLayout(container)
+        inner.setContentsMargins(8, 8, 8, 8)
+        inner.setSpacing(4)
+
+        font = QFont(*FONT)
+        self._first_btn = None
+        for label, action in self.buttons:
+            btn = QPushButton(label)
+            btn.setFont(font)
+            btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+            btn.clicked.connect(lambda checked, a=action: self._on_click(a))
+            inner.addWidget(btn)
+            self._first_btn = self._first_btn or btn
+
+        layout.addWidget(container)
+
+    def run_action(self, action):
+        raise NotImplementedError
+
+    def _on_click(self, action):
+        log.info(f"{self.name}: button clicked: {action}")
+        self.hide()
+        # Let the bar disappear before screenshots or power actions run
+        QTimer.singleShot(200, lambda: self.run_action(action))
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            focused = QApplication.focusWidget()
+            if isinstance(focused, QPushButton):
+                focused.click()
+            return
+        if key in (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Tab, Qt.Key.Key_Space):
+            super().keyPressEvent(event)
+            return
+        log.info(f"{self.name}: key pressed: {key}, hiding")
+        self.hide()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._first_btn:
+            QTimer.singleShot(50, self._first_btn.setFocus)
+
+    def popup(self, monitors, ipc):
+        """Show the bar centered at the bottom of the focused monitor."""
+        self.adjustSize()
+        # Qt sizes are logical pixels, Hyprland positions in physical ones
+        dpr = QApplication.instance().primaryScreen().devicePixelRatio()
+        w = int(self.sizeHint().width() * dpr)
+        h = int(self.sizeHint().height() * dpr)
+
+        mx, my, mw, mh = monitors.focused()
+        x = mx + (mw - w) // 2
+        y = my + mh - h - BOTTOM_MARGIN
+        log.debug(f"Showing {self.title} at ({x},{y}), bar={w}x{h}, dpr={dpr}, monitor={mw}x{mh}")
+
+        # Set a move rule BEFORE showing so Hyprland places it correctly on first frame
+        set_window_rule(ipc, f"move {x} {y}, match:title ^{self.title}$")
+        self.show()
+        self.activateWindow()
+        # Remove the move rule so it doesn't affect other windows with stale coords
+        QTimer.singleShot(200, lambda: set_window_rule(ipc, f"unset move, match:title ^{self.title}$"))
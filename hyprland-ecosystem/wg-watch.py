@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""WireGuard + network drive status for Waybar, pushed on state changes instead of polled.
+
+Runs as a continuous Waybar `exec` module. Link state comes from rtnetlink: the
+watcher joins the RTMGRP_LINK multicast group and re-checks the interface only when
+a link message names it. Mount state comes from /proc/self/mountinfo, which the
+kernel flags for poll() (POLLPRI) whenever the mount table changes. One JSON line
+is printed at start and then only on a transition, so nothing forks and nothing
+wakes up while the state holds.
+
+A source is anything with fileno(), a poll() event mask and read() returning the
+current state after consuming its event; FakeSource stands in for either one.
+
+Usage:
+    wg-watch.py [--profile-startup] [--interface wg0] [--mount /mnt/wbsolutions] [--label WBS]
+"""
+
+import errno
+import json
+import os
+import select
+import socket
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(HERE), "theming-engine"))
+
+import startup_profile
+
+DEFAULT_INTERFACE = "wg0"
+DEFAULT_MOUNT = "/mnt/wbsolutions"
+DEFAULT_LABEL = "WBS"
+
+# linux/rtnetlink.h and linux/if_link.h
+RTMGRP_LINK = 0x1
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+IFLA_IFNAME = 3
+NLMSG_HEADER = struct.Struct("=LHHLL")  # length, type, flags, sequence, port id
+IFINFO = struct.Struct("=BxHiII")  # family, type, index, flags, change
+RTATTR = struct.Struct("=HH")  # length, type
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def link_events(data):
+    """(message type, interface name) for each RTM_NEWLINK/RTM_DELLINK in a netlink datagram."""
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type = NLMSG_HEADER.unpack_from(data, offset)[:2]
+        if length < NLMSG_HEADER.size:
+            break
+        end = offset + length
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+            name = None
+            attr = offset + NLMSG_HEADER.size + IFINFO.size
+            while attr + RTATTR.size <= end:
+                attr_length, attr_type = RTATTR.unpack_from(data, attr)
+                if attr_length < RTATTR.size:
+                    break
+                if attr_type == IFLA_IFNAME:
+                    name = data[attr + RTATTR.size:attr + attr_length].split(b"\0", 1)[0].decode(errors="replace")
+                    break
+                attr += _align(attr_length)
+            yield msg_type, name
+        offset += _align(length)
+
+
+class LinkSource:
+    """Whether a network interface exists, kept current from rtnetlink link messages."""
+
+    events = select.POLLIN
+
+    def __init__(self, interface, sysfs="/sys/class/net"):
+        self.interface = interface
+        self.path = os.path.join(sysfs, interface)
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_LINK))
+        self.sock.setblocking(False)
+        # Subscribed before the first check, so no change can fall in between
+        self.state = os.path.exists(self.path)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return self.state
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                # Messages were dropped, so ask the kernel directly
+                self.state = os.path.exists(self.path)
+                continue
+            for msg_type, name in link_events(data):
+                if name == self.interface:
+                    self.state = msg_type == RTM_NEWLINK
+
+    def close(self):
+        self.sock.close()
+
+
+def unescape_mountinfo(field):
+    """Undo mountinfo's octal escapes (\\040 for a space and so on)."""
+    if "\\" not in field:
+        return field
+    return field.encode().decode("unicode_escape").encode("latin-1").decode(errors="replace")
+
+
+def is_mounted(mountinfo, mount_point):
+    """Whether mountinfo has a real (non-autofs) filesystem mounted on mount_point."""
+    for line in mountinfo.splitlines():
+        fields = line.split()
+        # id parent major:minor root mount-point options [optional...] - fstype source super-options
+        if len(fields) < 7 or unescape_mountinfo(fields[4]) != mount_point:
+            continue
+        try:
+            fstype = fields[fields.index("-", 6) + 1]
+        except (ValueError, IndexError):
+            continue
+        # A systemd automount point shows as autofs until something is actually mounted on it
+        if fstype != "autofs":
+            return True
+    return False
+
+
+class MountSource:
+    """Whether a mount point has a filesystem on it, re-read when the mount table changes."""
+
+    events = select.POLLPRI | select.POLLERR
+
+    def __init__(self, mount_point, mountinfo="/proc/self/mountinfo"):
+        self.mount_point = os.path.normpath(mount_point)
+        self.fd = os.open(mountinfo, os.O_RDONLY | os.O_CLOEXEC)
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        # Reading the table from the start also re-arms the change notification
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.fd, 65536, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return is_mounted(b"".join(chunks).decode(errors="replace"), self.mount_point)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FakeSource:
+    """Event source driven by set() instead of the kernel, for tests and demos."""
+
+    events = select.POLLIN
+
+    def __init__(self, state=False):
+        self.state = state
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+
+    def set(self, state):
+        self.state = state
+        os.write(self._write_fd, b"!")
+
+    def fileno(self):
+        return self._read_fd
+
+    def read(self):
+        try:
+            os.read(self._read_fd, 4096)
+        except BlockingIOError:
+            pass
+        return self.state
+
+    def close(self):
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+
+def status(wg_up, mounted, interface=DEFAULT_INTERFACE, mount_point=DEFAULT_MOUNT, label=DEFAULT_LABEL):
+    """The Waybar JSON object for a state."""
+    drive = f"Drive: {mount_point} mounted" if mounted else "Drive: NOT mounted"
+    if wg_up and mounted:
+        return {"text": f"󰖂 {label}", "tooltip": f"WireGuard ({interface}): Connected\n{drive}", "class": "connected"}
+    if wg_up:
+        return {"text": f"󰖂 {label} 󰋊✗", "tooltip": f"WireGuard ({interface}): Connected\n{drive}", "class": "partial"}
+    return {"text": f"󰖃 {label}", "tooltip": f"WireGuard ({interface}): Disconnected\n{drive}", "class": "disconnected"}
+
+
+class StatusWatcher:
+    """Polls a link and a mount source and emits a status line on every transition."""
+
+    def __init__(self, link, mount, interface=DEFAULT_INTERFACE, mount_point=DEFAULT_MOUNT,
+                 label=DEFAULT_LABEL, out=sys.stdout):
+        self.link = link
+        self.mount = mount
+        self.names = (interface, mount_point, label)
+        self.out = out
+        self.poller = select.poll()
+        for source in (link, mount):
+            self.poller.register(source, source.events)
+        self.state = None
+
+    def emit_if_changed(self, state):
+        if state == self.state:
+            return False
+        self.state = state
+        self.out.write(json.dumps(status(*state, *self.names), ensure_ascii=False) + "\n")
+        self.out.flush()
+        return True
+
+    def step(self, timeout=None):
+        """Wait for events (timeout in seconds, None for ever); returns True if a line was written."""
+        if self.state is None:
+            return self.emit_if_changed((self.link.read(), self.mount.read()))
+        wg_up, mounted = self.state
+        for fd, _ in self.poller.poll(None if timeout is None else timeout * 1000):
+            if fd == self.link.fileno():
+                wg_up = self.link.read()
+            elif fd == self.mount.fileno():
+                mounted = self.mount.read()
+        return self.emit_if_changed((wg_up, mounted))
+
+    def run(self):
+        while True:
+            self.step()
+
+
+USAGE = "Usage: wg-watch.py [--profile-startup] [--interface NAME] [--mount PATH] [--label TEXT]"
+
+
+def main():
+    startup_profile.maybe_profile()
+    options = {"--interface": DEFAULT_INTERFACE, "--mount": DEFAULT_MOUNT, "--label": DEFAULT_LABEL}
+    args = sys.argv[1:]
+    if len(args) % 2 or any(option not in options for option in args[::2]):
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    options.update(zip(args[::2], args[1::2]))
+    interface, mount_point, label = options["--interface"], options["--mount"], options["--label"]
+
+    watcher = StatusWatcher(LinkSource(interface), MountSource(mount_point), interface, mount_point, label)
+    startup_profile.mark()
+    try:
+        watcher.run()
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -281,7 +281,7 @@ setup_python_venv() {
 
             if [ "$venv_python_version" = "$system_python_version" ]; then
                 # Check if packages are installed
-                if "$VENV_DIR/bin/python" -c "import PIL; import sklearn; import numpy" 2>/dev/null; then
+                if "$VENV_DIR/bin/python" -c "import PIL; import numpy" 2>/dev/null; then
                     echo "✓ Virtual environment exists and is compatible (Python $venv_python_version)"
                     return 0
                 else
@@ -315,10 +315,10 @@ setup_python_venv() {
     # Install packages using venv's pip directly
     echo "Installing Python packages..."
     "$VENV_DIR/bin/pip" install --upgrade pip --quiet
-    "$VENV_DIR/bin/pip" install Pillow scikit-learn numpy --quiet
+    "$VENV_DIR/bin/pip" install Pillow numpy --quiet
 
     echo "✓ Virtual environment ready at: $VENV_DIR"
-    echo "  Packages: Pillow, scikit-learn, numpy"
+    echo "  Packages: Pillow, numpy (scikit-learn is optional, for --quantizer sklearn)"
 }
 
 # Check for font dependencies
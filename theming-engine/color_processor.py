@@ -2,19 +2,170 @@
 
 import os
 import sys
-import subprocess
 import colorsys
 import json
-from PIL import Image
-from sklearn.cluster import KMeans
-import numpy as np
+import re
+import threading
+import time
+from functools import lru_cache
+
+# NumPy and PIL are imported where pixels are handled, so commands that never
+# extract a palette (cache, select, bundle hits, the client) start quickly
+import config_writer
+import startup_profile
+from lockscreen import LockScreen, parse_resolution
+from palette_cache import CACHE_ROOT, EXTRACTION_PARAMS, PaletteCache
+from quantizers import DEFAULT_QUANTIZER, QUANTIZERS, get_quantizer
+from substitution import MultiSubstitution, SectionSubstitution
+from theme import THEME_VERSION, Theme
+from theme_bundles import BundleStore
+
+# Used when extraction fails or filtering leaves too few colors
+FALLBACK_COLORS = [(120, 80, 60), (80, 120, 100), (100, 80, 120), (90, 90, 70), (70, 90, 90)]
+
+# The last applied theme, for programs that style themselves (e.g. the popup bars)
+CURRENT_THEME_PATH = os.path.join(CACHE_ROOT, 'current-theme.json')
+
+# Config target -> ColorProcessor method that renders its new content
+TARGET_RENDERERS = {
+    'i3': 'render_i3_config',
+    'hyprland': 'render_hyprland_config',
+    'kitty': 'render_kitty_config',
+    'dunst': 'render_dunst_config',
+    'mako': 'render_mako_config',
+    'i3blocks': 'render_i3blocks_config',
+    'waybar': 'render_waybar_config',
+    'waybar_style': 'render_waybar_style',
+    'nvim': 'render_nvim_config',
+}
+
+# Per-target key -> pattern rewrites, compiled once and applied in a single pass
+I3_SUBSTITUTIONS = MultiSubstitution({
+    'window_colors': r'# class\s+border\s+backgr\.\s+text\s+indicator\s+child_border.*?client\.placeholder.*?#[0-9a-fA-F]{6}(?:\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6})*',
+    'bar_colors': r'colors\s*\{[^}]*\}',
+}, re.DOTALL)
+KITTY_SUBSTITUTIONS = MultiSubstitution({
+    'foreground': r'foreground\s+#[0-9a-fA-F]{6}',
+    'background': r'background\s+#[0-9a-fA-F]{6}',
+    'selection_background': r'selection_background\s+#[0-9a-fA-F]{6}',
+    'selection_foreground': r'selection_foreground\s+#[0-9a-fA-F]{6}',
+    'cursor': r'cursor\s+#[0-9a-fA-F]{6}',
+})
+DUNST_SUBSTITUTIONS = MultiSubstitution({
+    'background': r'background\s*=\s*"#[0-9a-fA-F]{6}"',
+    'foreground': r'foreground\s*=\s*"#[0-9a-fA-F]{6}"',
+    'frame_color': r'frame_color\s*=\s*"#[0-9a-fA-F]{6}"',
+})
+HYPRLAND_SUBSTITUTIONS = MultiSubstitution({
+    'active_border': r'col\.active_border\s*=\s*rgba\([0-9a-fA-F]{8}\)\s*rgba\([0-9a-fA-F]{8}\)\s*\d+deg',
+    'inactive_border': r'col\.inactive_border\s*=\s*rgba\([0-9a-fA-F]{8}\)',
+})
+# Only the @define-color variables; all other waybar colors use @references
+WAYBAR_STYLE_SUBSTITUTIONS = MultiSubstitution({
+    name: rf'@define-color {name} #[0-9a-fA-F]{{6}};'
+    for name in ('bg_color', 'bg_module', 'text_color', 'text_dim', 'accent_color', 'border_color')
+})
+MAKO_SUBSTITUTIONS = MultiSubstitution({
+    'background-color': r'background-color\s*=\s*#[0-9a-fA-F]{6}',
+    'text-color': r'text-color\s*=\s*#[0-9a-fA-F]{6}',
+    'border-color': r'border-color\s*=\s*#[0-9a-fA-F]{6}',
+})
+NVIM_SUBSTITUTIONS = MultiSubstitution({
+    'colorscheme': r'\" Custom color scheme to match kitty Deep Space theme.*?highlight Warning guifg=#[0-9a-fA-F]{6} guibg=#[0-9a-fA-F]{6}',
+}, re.DOTALL)
+
+# i3blocks blocks colored from the bar gradient, in gradient order
+I3BLOCKS_THEMED_BLOCKS = (
+    'wifi_info', 'cpu_info', 'gpu_info', 'memory_usage',
+    'disk_usage', 'volume', 'brightness', 'date',
+    'time', 'battery'
+)
+
+# Patterns masking each target's themed regions when fingerprinting its template
+TARGET_TEMPLATE_MASKS = {
+    'i3': I3_SUBSTITUTIONS,
+    'hyprland': HYPRLAND_SUBSTITUTIONS,
+    'kitty': KITTY_SUBSTITUTIONS,
+    'dunst': DUNST_SUBSTITUTIONS,
+    'mako': MAKO_SUBSTITUTIONS,
+    'i3blocks': SectionSubstitution(I3BLOCKS_THEMED_BLOCKS, {'color': r'^color=#[0-9a-fA-F]{6}$'}, re.MULTILINE),
+    'waybar_style': WAYBAR_STYLE_SUBSTITUTIONS,
+    'nvim': NVIM_SUBSTITUTIONS,
+}
+
+# Lightness levels tried by create_readable_text_color
+TEXT_BRIGHTNESS_RANGE = (0.95, 0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6, 0.55, 0.5,
+                         0.45, 0.4, 0.35, 0.3, 0.25, 0.2, 0.15, 0.1, 0.05)
+
+
+def _linearize_channel(c):
+    c = c / 255.0
+    return c / 12.92 if c <= 0.03928 else pow((c + 0.055) / 1.055, 2.4)
+
+
+@lru_cache(maxsize=None)
+def _channel_luminance():
+    """WCAG linearized value for every 8-bit channel, so batch luminance is a table lookup"""
+    import numpy as np
+    
+    return np.array([_linearize_channel(c) for c in range(256)])
+
+
+def _hls_to_rgb_array(h, l, s):
+    """Vectorized colorsys.hls_to_rgb returning truncated 0-255 ints with shape (..., 3)"""
+    import numpy as np
+    
+    def channel(m1, m2, hue):
+        hue = np.mod(hue, 1.0)
+        return np.where(hue < colorsys.ONE_SIXTH, m1 + (m2-m1)*hue*6.0,
+               np.where(hue < 0.5, m2,
+               np.where(hue < colorsys.TWO_THIRD, m1 + (m2-m1)*(colorsys.TWO_THIRD-hue)*6.0, m1)))
+    
+    m2 = np.where(l <= 0.5, l * (1.0+s), l+s-(l*s))
+    m1 = 2.0*l - m2
+    rgb = np.stack([channel(m1, m2, h+colorsys.ONE_THIRD), channel(m1, m2, h), channel(m1, m2, h-colorsys.ONE_THIRD)], axis=-1)
+    rgb = np.where((s == 0.0)[..., None], np.asarray(l)[..., None], rgb)
+    return (rgb * 255).astype(np.int64)
+
+
+def _contrast_with(bg_luminance, rgb):
+    """WCAG contrast of each 0-255 RGB row against a background luminance"""
+    import numpy as np
+    
+    table = _channel_luminance()
+    lum = (0.2126 * table[rgb[:, 0]]
+           + 0.7152 * table[rgb[:, 1]]
+           + 0.0722 * table[rgb[:, 2]])
+    lighter = np.maximum(bg_luminance, lum)
+    darker = np.minimum(bg_luminance, lum)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+_stderr_lock = threading.Lock()
+
+
+def log(message):
+    """Print to stderr without interleaving lines from concurrent writer threads"""
+    with _stderr_lock:
+        print(message, file=sys.stderr)
 
 
 class ColorProcessor:
     """Advanced color extraction and theme generation system"""
     
-    def __init__(self, config_paths):
+    def __init__(self, config_paths, palette_cache=None, quantizer=DEFAULT_QUANTIZER, bundles=None, lockscreen=None,
+                 live_push=None):
         self.config_paths = config_paths
+        self.palette_cache = palette_cache
+        self.quantizer = quantizer
+        # Optional theme_bundles.BundleStore of precomputed target configs
+        self.bundles = bundles
+        # Optional lockscreen.LockScreen updated alongside the configs
+        self.lockscreen = lockscreen
+        # Optional live_push.LivePush recoloring running kitty and Neovim instances
+        self.live_push = live_push
+        # Theme applied last, so callers can see which roles a switch changed
+        self.last_theme = None
     
     def rgb_to_hex(self, r, g, b):
         """Convert RGB to hex color"""
@@ -55,68 +206,64 @@ class ColorProcessor:
             return '#ffffff' if white_contrast > black_contrast else '#000000'
     
     def create_readable_text_color(self, bg_color, accent_colors, min_contrast=4.5, prefer_color=True):
-        """Generate readable text color with optional color preference"""
-        bg_r, bg_g, bg_b = self.hex_to_rgb(bg_color)
-        bg_luminance = self.get_luminance(bg_r, bg_g, bg_b)
+        """Generate readable text color with optional color preference
+        
+        Every candidate (accent x lightness) is evaluated at once with NumPy; the
+        ranking is the same as trying them one by one in accent order.
+        """
+        import numpy as np
+        
+        accents = [tuple(int(c) for c in accent) for accent in accent_colors]
+        bg_luminance = self.get_luminance(*self.hex_to_rgb(bg_color))
+        if not accents:
+            return self.ensure_text_contrast(bg_color, min_contrast)
+        
+        hls = np.array([colorsys.rgb_to_hls(r/255.0, g/255.0, b/255.0) for r, g, b in accents])
+        hue, sat = hls[:, 0], hls[:, 2]
         
-        candidates = []
+        rgb_blocks, distance_blocks = [], []
         
         # Try color-based candidates if preferred
         if prefer_color and min_contrast <= 3.0:
-            for accent in accent_colors:
-                accent_r, accent_g, accent_b = accent
-                h, l, s = colorsys.rgb_to_hls(accent_r/255.0, accent_g/255.0, accent_b/255.0)
-                
-                if bg_luminance < 0.3:
-                    ultra_bright = colorsys.hls_to_rgb(h, 0.8, min(s * 2.0, 1.0))
-                else:
-                    ultra_bright = colorsys.hls_to_rgb(h, 0.2, min(s * 2.0, 1.0))
-                
-                candidate = self.rgb_to_hex(int(ultra_bright[0]*255), int(ultra_bright[1]*255), int(ultra_bright[2]*255))
-                contrast = self.get_contrast_ratio(bg_color, candidate)
-                
-                if contrast >= min_contrast:
-                    candidates.append((candidate, contrast, 2.0, 0.8))
-        
-        # Generate brightness variations
-        for accent in accent_colors:
-            accent_hex = self.rgb_to_hex(*accent)
-            accent_r, accent_g, accent_b = accent
-            h, l, s = colorsys.rgb_to_hls(accent_r/255.0, accent_g/255.0, accent_b/255.0)
-            
-            brightness_range = [0.95, 0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6, 0.55, 0.5, 0.45, 0.4, 0.35, 0.3, 0.25, 0.2, 0.15, 0.1, 0.05]
-            
-            for brightness in brightness_range:
-                if bg_luminance < 0.3:
-                    target_l = max(brightness, 0.4)
-                elif bg_luminance < 0.7:
-                    target_l = brightness
-                else:
-                    target_l = min(brightness, 0.3)
-                
-                boosted_s = min(s * 1.6, 1.0)
-                r, g, b = colorsys.hls_to_rgb(h, target_l, boosted_s)
-                candidate = self.rgb_to_hex(int(r*255), int(g*255), int(b*255))
-                contrast = self.get_contrast_ratio(bg_color, candidate)
-                
-                if contrast >= min_contrast:
-                    color_distance = abs(target_l - 1.0) + abs(target_l - 0.0)
-                    candidates.append((candidate, contrast, color_distance, target_l))
-        
-        if not candidates:
+            lightness = np.full(len(accents), 0.8 if bg_luminance < 0.3 else 0.2)
+            rgb_blocks.append(_hls_to_rgb_array(hue, lightness, np.minimum(sat * 2.0, 1.0)))
+            distance_blocks.append(np.full(len(accents), 2.0))
+        
+        # Generate brightness variations (accent-major, like the nested loops they replace)
+        if bg_luminance < 0.3:
+            target_l = np.maximum(TEXT_BRIGHTNESS_RANGE, 0.4)
+        elif bg_luminance < 0.7:
+            target_l = np.asarray(TEXT_BRIGHTNESS_RANGE)
+        else:
+            target_l = np.minimum(TEXT_BRIGHTNESS_RANGE, 0.3)
+        grid_l = np.broadcast_to(target_l, (len(accents), len(target_l)))
+        grid_h = np.broadcast_to(hue[:, None], grid_l.shape)
+        grid_s = np.broadcast_to(np.minimum(sat * 1.6, 1.0)[:, None], grid_l.shape)
+        rgb_blocks.append(_hls_to_rgb_array(grid_h, grid_l, grid_s).reshape(-1, 3))
+        distance_blocks.append((np.abs(grid_l - 1.0) + np.abs(grid_l - 0.0)).ravel())
+        
+        rgb = np.concatenate(rgb_blocks)
+        distance = np.concatenate(distance_blocks)
+        contrast = _contrast_with(bg_luminance, rgb)
+        
+        keep = contrast >= min_contrast
+        if not keep.any():
             return self.ensure_text_contrast(bg_color, min_contrast)
+        rgb, distance, contrast = rgb[keep], distance[keep], contrast[keep]
         
+        # Stable sort: first key listed last
         if prefer_color:
-            candidates.sort(key=lambda x: (-x[2], -x[1]))
+            order = np.lexsort((-contrast, -distance))
         else:
-            candidates.sort(key=lambda x: (-x[1], -x[2]))
+            order = np.lexsort((-distance, -contrast))
         
-        if prefer_color and len(candidates) > 3:
-            top_colorful = [c for c in candidates if c[2] > 1.0]
-            if top_colorful:
-                return top_colorful[0][0]
+        best = order[0]
+        if prefer_color and len(order) > 3:
+            colorful = order[distance[order] > 1.0]
+            if len(colorful):
+                best = colorful[0]
         
-        return candidates[0][0]
+        return self.rgb_to_hex(*(int(c) for c in rgb[best]))
     
     def adjust_brightness(self, hex_color, factor):
         """Adjust brightness of hex color by factor"""
@@ -137,209 +284,217 @@ class ColorProcessor:
             return self.rgb_to_hex(int(r*255), int(g*255), int(b*255))
         return hex_color
     
-    def extract_dominant_colors_kmeans(self, image_path, n_colors=5):
-        """Extract dominant colors using k-means clustering for better performance"""
+    def extract_dominant_colors_kmeans(self, image_path, n_colors=5, dark_threshold=30, light_threshold=225, quantizer=None):
+        """Extract dominant colors using the configured quantizer (k-means by default)"""
+        params = {'n_colors': n_colors, 'dark_threshold': dark_threshold, 'light_threshold': light_threshold,
+                  'quantizer': quantizer or self.quantizer}
+        return self._extract_cached(image_path, params)[0]
+    
+    def _extract_cached(self, image_path, params, fallback=True):
+        """Return (colors, cache entry or None, source or None) for a wallpaper
+
+        Extraction errors yield FALLBACK_COLORS, or propagate when fallback is False.
+        """
+        source = None
+        if self.palette_cache:
+            try:
+                source = self.palette_cache.describe_source(image_path)
+            except OSError:
+                source = None
+            cached = self.palette_cache.get(image_path, params, source=source) if source else None
+            if cached is not None:
+                print(f'Using cached palette for {os.path.basename(image_path)}', file=sys.stderr)
+                return cached['colors'], cached, source
+        
         try:
-            img = Image.open(image_path)
-            img = img.convert('RGB')
-            
-            # Resize for performance but keep reasonable quality
-            img = img.resize((100, 100))
-            
-            # Convert to numpy array
-            data = np.array(img)
-            data = data.reshape((-1, 3))
-            
-            # Sample random pixels for very large images
-            if len(data) > 10000:
-                indices = np.random.choice(len(data), 10000, replace=False)
-                data = data[indices]
-            
-            # Use k-means clustering
-            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-            kmeans.fit(data)
-            
-            # Get cluster centers (dominant colors)
-            colors = kmeans.cluster_centers_.astype(int)
-            
-            # Filter out blacks and whites, ensure we have good colors
-            filtered_colors = []
-            for color in colors:
-                r, g, b = color
-                # Skip blacks and whites
-                if (r < 30 and g < 30 and b < 30) or (r > 225 and g > 225 and b > 225):
-                    continue
-                filtered_colors.append(tuple(color))
-            
-            # Fallback colors if not enough found
-            if len(filtered_colors) < n_colors:
-                fallback_colors = [(120, 80, 60), (80, 120, 100), (100, 80, 120), (90, 90, 70), (70, 90, 90)]
-                filtered_colors.extend(fallback_colors[:n_colors - len(filtered_colors)])
-            
-            return filtered_colors[:n_colors]
-            
+            colors = self.extract_palette(image_path, **params)
         except Exception as e:
+            if not fallback:
+                raise
             print(f'Error extracting colors: {e}', file=sys.stderr)
-            return [(120, 80, 60), (80, 120, 100), (100, 80, 120), (90, 90, 70), (70, 90, 90)]
+            return list(FALLBACK_COLORS), None, None
+        
+        if self.palette_cache and source:
+            self.palette_cache.put(image_path, params, colors, source=source)
+        return colors, None, source
+    
+    def extraction_params(self):
+        """Extraction parameters used for themes (and as their cache key)"""
+        return dict(EXTRACTION_PARAMS, quantizer=self.quantizer)
+    
+    def extract_theme(self, image_path, fallback=True):
+        """Extract the palette and its derived theme, reusing cached theme roles when present"""
+        params = self.extraction_params()
+        colors, cached, source = self._extract_cached(image_path, params, fallback)
+        
+        derived = cached.get('derived', {}).get('theme') if cached else None
+        if derived and derived.get('version') == THEME_VERSION:
+            return Theme.from_dict(self, derived)
+        
+        theme = Theme(self, colors)
+        if self.palette_cache and source:
+            self.palette_cache.put(image_path, params, colors, derived={'theme': theme.to_dict()}, source=source)
+        return theme
+    
+    def as_theme(self, theme_or_colors):
+        """Accept either a Theme or a plain list of RGB colors"""
+        if isinstance(theme_or_colors, Theme):
+            return theme_or_colors
+        return Theme(self, theme_or_colors)
+    
+    def load_pixels(self, image_path):
+        """Decode a wallpaper into an (N, 3) array of RGB samples"""
+        import numpy as np
+        from image_loader import load_thumbnail
+        
+        # Decode straight to a small size (JPEG DCT scaling) rather than full resolution
+        img = load_thumbnail(image_path, (100, 100))
+        
+        # Convert to numpy array
+        data = np.array(img)
+        data = data.reshape((-1, 3))
+        
+        # Sample random pixels for very large images
+        if len(data) > 10000:
+            indices = np.random.choice(len(data), 10000, replace=False)
+            data = data[indices]
+        
+        return data
     
-    def update_config_safely(self, config_path, update_func, colors):
+    def extract_palette(self, image_path, n_colors=5, dark_threshold=30, light_threshold=225, quantizer=None):
+        """Run the uncached extraction pipeline, raising on unreadable images"""
+        import numpy as np
+        
+        data = self.load_pixels(image_path)
+        
+        # Quantize, then order the palette from most to least dominant
+        centers, counts = get_quantizer(quantizer or self.quantizer)(data, n_colors)
+        colors = np.asarray(centers)[np.argsort(-np.asarray(counts), kind='stable')].astype(int)
+        
+        # Filter out blacks and whites, ensure we have good colors
+        filtered_colors = []
+        for color in colors:
+            r, g, b = (int(c) for c in color)
+            # Skip blacks and whites
+            if (r < dark_threshold and g < dark_threshold and b < dark_threshold) or \
+                    (r > light_threshold and g > light_threshold and b > light_threshold):
+                continue
+            filtered_colors.append((r, g, b))
+        
+        # Fallback colors if not enough found
+        if len(filtered_colors) < n_colors:
+            filtered_colors.extend(FALLBACK_COLORS[:n_colors - len(filtered_colors)])
+        
+        return filtered_colors[:n_colors]
+    
+    def update_config_safely(self, config_path, update_func, theme):
         """Update config file"""
         try:
-            update_func(config_path, colors)
+            update_func(config_path, theme)
             return True
         except Exception as e:
             print(f'Error updating {config_path}: {e}', file=sys.stderr)
             return False
     
-    def update_i3_config(self, config_path, colors):
-        """Update i3 window manager config"""
+    def substitute(self, target, config_path, substitution, text, values):
+        """Apply a target's substitutions in one pass, warning about keys that matched nothing"""
+        text, counts = substitution.apply(text, values)
+        missing = substitution.unmatched(counts)
+        if missing:
+            log(f"Warning: {target} patterns matched nothing in {config_path}: {', '.join(missing)}")
+        return text
+    
+    def render_i3_config(self, config_path, theme):
+        """Render the updated i3 window manager config"""
+        theme = self.as_theme(theme)
         with open(config_path, 'r') as f:
             config = f.read()
         
-        # Find most vibrant color for focused window
-        most_vibrant = colors[0]
-        max_vibrancy = 0
-        
-        for color in colors:
-            r, g, b = color
-            color_range = max(r, g, b) - min(r, g, b)
-            brightness = (r + g + b) / 3
-            vibrancy = color_range * (brightness / 255.0)
-            
-            if vibrancy > max_vibrancy:
-                max_vibrancy = vibrancy
-                most_vibrant = color
-        
-        primary = self.rgb_to_hex(*most_vibrant)
-        primary = self.ensure_minimum_brightness(primary, 0.25)
-        secondary = self.adjust_brightness(primary, 0.7)
-        tertiary = self.adjust_brightness(primary, 0.4)
-        quaternary = self.adjust_brightness(primary, 0.2)
-        
-        focused_text = self.create_readable_text_color(primary, colors, 3.5)
-        inactive_text = self.create_readable_text_color(secondary, colors, 2.5)
-        unfocused_text = self.create_readable_text_color(tertiary, colors, 2.0)
+        primary = theme['primary']
+        secondary = theme['primary_inactive']
+        tertiary = theme['primary_unfocused']
+        quaternary = theme['primary_placeholder']
         
         new_window_colors = f'''# class                 border  backgr. text    indicator child_border
-client.focused          {primary} {primary} {focused_text} {primary}   {primary}
-client.focused_inactive {secondary} {secondary} {inactive_text} {secondary}   {secondary}
-client.unfocused        {tertiary} {tertiary} {unfocused_text} {tertiary}   {tertiary}
+client.focused          {primary} {primary} {theme['focused_text']} {primary}   {primary}
+client.focused_inactive {secondary} {secondary} {theme['inactive_text']} {secondary}   {secondary}
+client.unfocused        {tertiary} {tertiary} {theme['unfocused_text']} {tertiary}   {tertiary}
 client.urgent           #ff4444 #ff4444 #ffffff #ff4444   #ff4444
-client.placeholder      {quaternary} {quaternary} {self.create_readable_text_color(quaternary, colors, 1.8)} {quaternary}   {quaternary}'''
-        
-        import re
-        pattern = r'# class\s+border\s+backgr\.\s+text\s+indicator\s+child_border.*?client\.placeholder.*?#[0-9a-fA-F]{6}(?:\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6}\s+#[0-9a-fA-F]{6})*'
-        config = re.sub(pattern, new_window_colors, config, flags=re.DOTALL)
+client.placeholder      {quaternary} {quaternary} {theme['placeholder_text']} {quaternary}   {quaternary}'''
         
-        bar_bg = self.adjust_brightness(primary, 0.15)
-        bar_bg = self.ensure_minimum_brightness(bar_bg, 0.1)
-        bar_text = self.create_readable_text_color(bar_bg, colors, 3.0)
-        bar_sep = self.adjust_brightness(primary, 0.3)
-        
-        workspace_text = self.create_readable_text_color(primary, colors, 3.0)
         
         new_bar_colors = f'''    colors {{
-        background {bar_bg}
-        statusline {bar_text}
-        separator {bar_sep}
-        focused_workspace  {primary} {primary} {workspace_text}
-        active_workspace   {secondary} {secondary} {self.create_readable_text_color(secondary, colors, 3.0)}
-        inactive_workspace {tertiary} {tertiary} {self.create_readable_text_color(tertiary, colors, 2.5)}
+        background {theme['bar_bg']}
+        statusline {theme['bar_text']}
+        separator {theme['bar_separator']}
+        focused_workspace  {primary} {primary} {theme['workspace_focused_text']}
+        active_workspace   {secondary} {secondary} {theme['workspace_active_text']}
+        inactive_workspace {tertiary} {tertiary} {theme['workspace_inactive_text']}
         urgent_workspace   #f38ba8 #f38ba8 #000000
         binding_mode       #f9e2af #f9e2af #000000
     }}'''
         
-        pattern = r'colors\s*\{[^}]*\}'
-        config = re.sub(pattern, new_bar_colors, config, flags=re.DOTALL)
-        
-        with open(config_path, 'w') as f:
-            f.write(config)
+        config = self.substitute('i3', config_path, I3_SUBSTITUTIONS, config, {
+            'window_colors': new_window_colors,
+            'bar_colors': new_bar_colors,
+        })
         
-        print(f'Updated i3 config with primary color: {primary}', file=sys.stderr)
+        log(f'Updated i3 config with primary color: {primary}')
+        return config
     
-    def update_kitty_config(self, config_path, colors):
-        """Update kitty terminal config"""
+    def kitty_colors(self, theme):
+        """kitty color settings for a theme (also pushed live by live_push.py)"""
+        return {
+            'foreground': theme['fg_on_bg'],
+            'background': theme['bg'],
+            'selection_background': theme['selection_bg'],
+            'selection_foreground': theme['selection_fg'],
+            'cursor': theme['cursor'],
+        }
+    
+    def render_kitty_config(self, config_path, theme):
+        """Render the updated kitty terminal config"""
+        theme = self.as_theme(theme)
         with open(config_path, 'r') as f:
             config = f.read()
         
-        primary = self.rgb_to_hex(*colors[0])
-        bg_color = self.adjust_brightness(primary, 0.08)
-        bg_color = self.ensure_minimum_brightness(bg_color, 0.05)
-        
-        fg_color = self.create_readable_text_color(bg_color, colors[1:3], 3.0, prefer_color=True)
-        selection_bg = self.adjust_brightness(primary, 0.3)
-        selection_bg = self.ensure_minimum_brightness(selection_bg, 0.2)
-        selection_fg = self.create_readable_text_color(selection_bg, colors, 3.0)
-        
-        cursor_color = self.adjust_brightness(primary, 0.7)
-        cursor_color = self.ensure_minimum_brightness(cursor_color, 0.4)
+        colors = self.kitty_colors(theme)
+        config = self.substitute('kitty', config_path, KITTY_SUBSTITUTIONS, config,
+                                 {key: f'{key} {color}' for key, color in colors.items()})
         
-        import re
-        config = re.sub(r'foreground\s+#[0-9a-fA-F]{6}', f'foreground {fg_color}', config)
-        config = re.sub(r'background\s+#[0-9a-fA-F]{6}', f'background {bg_color}', config)
-        config = re.sub(r'selection_background\s+#[0-9a-fA-F]{6}', f'selection_background {selection_bg}', config)
-        config = re.sub(r'selection_foreground\s+#[0-9a-fA-F]{6}', f'selection_foreground {selection_fg}', config)
-        config = re.sub(r'cursor\s+#[0-9a-fA-F]{6}', f'cursor {cursor_color}', config)
-        
-        with open(config_path, 'w') as f:
-            f.write(config)
-        
-        print(f'Updated kitty config with contrast ratio: {self.get_contrast_ratio(bg_color, fg_color):.1f}:1', file=sys.stderr)
+        contrast = self.get_contrast_ratio(colors['background'], colors['foreground'])
+        log(f'Updated kitty config with contrast ratio: {contrast:.1f}:1')
+        return config
     
-    def update_dunst_config(self, config_path, colors):
-        """Update dunst notification config"""
+    def render_dunst_config(self, config_path, theme):
+        """Render the updated dunst notification config"""
+        theme = self.as_theme(theme)
         with open(config_path, 'r') as f:
             config = f.read()
         
-        primary = self.rgb_to_hex(*colors[0])
-        secondary = self.rgb_to_hex(*colors[1]) if len(colors) > 1 else self.adjust_brightness(primary, 0.8)
-        
-        bg_color = self.adjust_brightness(primary, 0.15)
-        bg_color = self.ensure_minimum_brightness(bg_color, 0.1)
+        bg_color = theme['notification_bg']
+        fg_color = theme['notification_fg']
+        frame_color = theme['notification_border']
         
-        fg_color = self.create_readable_text_color(bg_color, colors, 3.5, prefer_color=True)
-        frame_color = self.adjust_brightness(secondary, 0.6)
-        frame_color = self.ensure_minimum_brightness(frame_color, 0.3)
+        config = self.substitute('dunst', config_path, DUNST_SUBSTITUTIONS, config, {
+            'background': f'background = "{bg_color}"',
+            'foreground': f'foreground = "{fg_color}"',
+            'frame_color': f'frame_color = "{frame_color}"',
+        })
         
-        import re
-        config = re.sub(r'background\s*=\s*"#[0-9a-fA-F]{6}"', f'background = "{bg_color}"', config)
-        config = re.sub(r'foreground\s*=\s*"#[0-9a-fA-F]{6}"', f'foreground = "{fg_color}"', config)
-        config = re.sub(r'frame_color\s*=\s*"#[0-9a-fA-F]{6}"', f'frame_color = "{frame_color}"', config)
-        
-        with open(config_path, 'w') as f:
-            f.write(config)
-        
-        print(f'Updated dunst config: bg={bg_color}, fg={fg_color}, frame={frame_color}', file=sys.stderr)
+        log(f'Updated dunst config: bg={bg_color}, fg={fg_color}, frame={frame_color}')
+        return config
     
-    def update_i3blocks_config(self, config_path, colors):
-        """Update i3blocks status bar config"""
+    def render_i3blocks_config(self, config_path, theme):
+        """Render the updated i3blocks status bar config"""
+        theme = self.as_theme(theme)
         with open(config_path, 'r') as f:
             config = f.read()
         
-        # Generate gradient colors from wallpaper
-        primary = self.rgb_to_hex(*colors[0])
-        primary = self.ensure_minimum_brightness(primary, 0.3)
+        # Gradient colors generated from the wallpaper's dominant color
+        gradient_colors = theme['bar_gradient']
         
-        # Create a smooth gradient from primary color
-        gradient_colors = []
-        base_h, base_l, base_s = colorsys.rgb_to_hls(*[c/255.0 for c in colors[0]])
-        
-        # Generate 12 colors in a gradient
-        for i in range(12):
-            hue_shift = (i * 30) % 360 / 360.0
-            new_h = (base_h + hue_shift * 0.3) % 1.0
-            new_l = 0.4 + (0.4 * (i / 11.0))
-            new_s = min(base_s * 1.4, 0.9)
-            
-            r, g, b = colorsys.hls_to_rgb(new_h, new_l, new_s)
-            color_hex = self.rgb_to_hex(int(r*255), int(g*255), int(b*255))
-            gradient_colors.append(color_hex)
-        
-        blocks = [
-            'wifi_info', 'cpu_info', 'gpu_info', 'memory_usage',
-            'disk_usage', 'volume', 'brightness', 'date',
-            'time', 'battery'
-        ]
+        blocks = I3BLOCKS_THEMED_BLOCKS
         
         lines = config.split('\n')
         new_lines = []
@@ -356,33 +511,16 @@ client.placeholder      {quaternary} {quaternary} {self.create_readable_text_col
         
         config = '\n'.join(new_lines)
         
-        with open(config_path, 'w') as f:
-            f.write(config)
-        
-        print(f'Updated i3blocks config with gradient from {primary}', file=sys.stderr)
+        log(f"Updated i3blocks config with gradient from {theme['panel_primary']}")
+        return config
     
-    def update_hyprland_config(self, config_path, colors):
-        """Update Hyprland window manager config"""
+    def render_hyprland_config(self, config_path, theme):
+        """Render the updated Hyprland window manager config"""
+        theme = self.as_theme(theme)
         with open(config_path, 'r') as f:
             config = f.read()
         
-        # Find most vibrant color for focused window
-        most_vibrant = colors[0]
-        max_vibrancy = 0
-        
-        for color in colors:
-            r, g, b = color
-            color_range = max(r, g, b) - min(r, g, b)
-            brightness = (r + g + b) / 3
-            vibrancy = color_range * (brightness / 255.0)
-            
-            if vibrancy > max_vibrancy:
-                max_vibrancy = vibrancy
-                most_vibrant = color
-        
-        primary = self.rgb_to_hex(*most_vibrant)
-        primary = self.ensure_minimum_brightness(primary, 0.25)
-        secondary = self.adjust_brightness(primary, 0.7)
+        primary = theme['primary']
         
         # Convert hex to rgba format for Hyprland
         def hex_to_rgba(hex_color, alpha="ee"):
@@ -390,118 +528,76 @@ client.placeholder      {quaternary} {quaternary} {self.create_readable_text_col
             return f"rgba({hex_color}{alpha})"
         
         primary_rgba = hex_to_rgba(primary, "ee")
-        secondary_rgba = hex_to_rgba(secondary, "aa")
-        
-        import re
-        
-        # Update active border
-        config = re.sub(r'col\.active_border\s*=\s*rgba\([0-9a-fA-F]{8}\)\s*rgba\([0-9a-fA-F]{8}\)\s*\d+deg',
-                       f'col.active_border = {primary_rgba} {primary_rgba} 45deg', config)
+        secondary_rgba = hex_to_rgba(theme['primary_inactive'], "aa")
         
-        # Update inactive border  
-        config = re.sub(r'col\.inactive_border\s*=\s*rgba\([0-9a-fA-F]{8}\)',
-                       f'col.inactive_border = {secondary_rgba}', config)
+        # Update active and inactive borders
+        config = self.substitute('hyprland', config_path, HYPRLAND_SUBSTITUTIONS, config, {
+            'active_border': f'col.active_border = {primary_rgba} {primary_rgba} 45deg',
+            'inactive_border': f'col.inactive_border = {secondary_rgba}',
+        })
         
-        with open(config_path, 'w') as f:
-            f.write(config)
-        
-        print(f'Updated Hyprland config with primary color: {primary}', file=sys.stderr)
+        log(f'Updated Hyprland config with primary color: {primary}')
+        return config
     
-    def update_waybar_config(self, config_path, colors):
-        """Update Waybar config"""
+    def render_waybar_config(self, config_path, theme):
+        """Render the updated Waybar config"""
         if not os.path.exists(config_path):
-            print(f'Warning: Waybar config not found at {config_path}', file=sys.stderr)
+            log(f'Warning: Waybar config not found at {config_path}')
             return
-            
+        
         try:
             with open(config_path, 'r') as f:
                 waybar_config = json.load(f)
         except Exception as e:
-            print(f'Warning: Could not parse Waybar config: {e}', file=sys.stderr)
+            log(f'Warning: Could not parse Waybar config: {e}')
             return
         
         # Update waybar config if needed
-        print(f'Waybar config exists but no color updates needed (handled by CSS)', file=sys.stderr)
+        log(f'Waybar config exists but no color updates needed (handled by CSS)')
+        return None
     
-    def update_waybar_style(self, style_path, colors):
-        """Update Waybar CSS style"""
+    def render_waybar_style(self, style_path, theme):
+        """Render the updated Waybar CSS style"""
+        theme = self.as_theme(theme)
         if not os.path.exists(style_path):
-            print(f'Warning: Waybar style not found at {style_path}', file=sys.stderr)
+            log(f'Warning: Waybar style not found at {style_path}')
             return
-            
+        
         try:
             with open(style_path, 'r') as f:
                 css = f.read()
         except Exception as e:
-            print(f'Warning: Could not read Waybar style: {e}', file=sys.stderr)
+            log(f'Warning: Could not read Waybar style: {e}')
             return
         
-        primary = self.rgb_to_hex(*colors[0])
-        primary = self.ensure_minimum_brightness(primary, 0.3)
-
-        # Background colors
-        bg_color = self.adjust_brightness(primary, 0.1)
-        bg_color = self.ensure_minimum_brightness(bg_color, 0.05)
-        bg_module = self.adjust_brightness(bg_color, 2.0)
-        bg_module = self.ensure_minimum_brightness(bg_module, 0.08)
-
-        # Text colors
-        text_color = self.create_readable_text_color(bg_color, colors, 3.0)
-        text_dim = self.adjust_brightness(text_color, 0.6)
-
-        # Find most vibrant color for accent
-        most_vibrant = colors[0]
-        max_vibrancy = 0
-        for color in colors:
-            r, g, b = color
-            color_range = max(r, g, b) - min(r, g, b)
-            brightness = (r + g + b) / 3
-            vibrancy = color_range * (brightness / 255.0)
-            if vibrancy > max_vibrancy:
-                max_vibrancy = vibrancy
-                most_vibrant = color
-
-        accent_color = self.rgb_to_hex(*most_vibrant)
-        accent_color = self.ensure_minimum_brightness(accent_color, 0.3)
-        border_color = self.adjust_brightness(accent_color, 0.8)
-        border_color = self.ensure_minimum_brightness(border_color, 0.25)
-
-        import re
-
         # Update @define-color declarations (GTK CSS variables)
-        # Only targets the variable definitions — all other colors use @references
-        css = re.sub(r'@define-color bg_color #[0-9a-fA-F]{6};', f'@define-color bg_color {bg_color};', css)
-        css = re.sub(r'@define-color bg_module #[0-9a-fA-F]{6};', f'@define-color bg_module {bg_module};', css)
-        css = re.sub(r'@define-color text_color #[0-9a-fA-F]{6};', f'@define-color text_color {text_color};', css)
-        css = re.sub(r'@define-color text_dim #[0-9a-fA-F]{6};', f'@define-color text_dim {text_dim};', css)
-        css = re.sub(r'@define-color accent_color #[0-9a-fA-F]{6};', f'@define-color accent_color {accent_color};', css)
-        css = re.sub(r'@define-color border_color #[0-9a-fA-F]{6};', f'@define-color border_color {border_color};', css)
+        values = {
+            'bg_color': theme['panel_bg'],
+            'bg_module': theme['panel_module_bg'],
+            'text_color': theme['panel_text'],
+            'text_dim': theme['panel_text_dim'],
+            'accent_color': theme['accent'],
+            'border_color': theme['accent_border'],
+        }
+        css = self.substitute('waybar_style', style_path, WAYBAR_STYLE_SUBSTITUTIONS, css,
+                              {name: f'@define-color {name} {value};' for name, value in values.items()})
         # Note: urgent_color and charging_color are intentionally not updated — they stay fixed
         
-        try:
-            with open(style_path, 'w') as f:
-                f.write(css)
-            print(f'Updated Waybar style with primary color: {primary}', file=sys.stderr)
-        except Exception as e:
-            print(f'Warning: Could not write Waybar style: {e}', file=sys.stderr)
+        log(f"Updated Waybar style with primary color: {theme['panel_primary']}")
+        return css
     
-    def update_mako_config(self, config_path, colors):
-        """Update Mako notification config"""
-        primary = self.rgb_to_hex(*colors[0])
-        secondary = self.rgb_to_hex(*colors[1]) if len(colors) > 1 else self.adjust_brightness(primary, 0.8)
-        
-        bg_color = self.adjust_brightness(primary, 0.15)
-        bg_color = self.ensure_minimum_brightness(bg_color, 0.1)
-        
-        fg_color = self.create_readable_text_color(bg_color, colors, 3.5, prefer_color=True)
-        border_color = self.adjust_brightness(secondary, 0.6)
-        border_color = self.ensure_minimum_brightness(border_color, 0.3)
+    def render_mako_config(self, config_path, theme):
+        """Render the updated Mako notification config"""
+        theme = self.as_theme(theme)
+        bg_color = theme['notification_bg']
+        fg_color = theme['notification_fg']
+        border_color = theme['notification_border']
         
         if not os.path.exists(config_path):
             # Create a basic mako config if it doesn't exist
             config_dir = os.path.dirname(config_path)
             os.makedirs(config_dir, exist_ok=True)
-            
+        
             config_content = f"""# Mako notification daemon config
 background-color={bg_color}
 text-color={fg_color}
@@ -514,140 +610,266 @@ font=Victor Mono 11
         else:
             with open(config_path, 'r') as f:
                 config_content = f.read()
-            
-            import re
-            config_content = re.sub(r'background-color\s*=\s*#[0-9a-fA-F]{6}', f'background-color={bg_color}', config_content)
-            config_content = re.sub(r'text-color\s*=\s*#[0-9a-fA-F]{6}', f'text-color={fg_color}', config_content)
-            config_content = re.sub(r'border-color\s*=\s*#[0-9a-fA-F]{6}', f'border-color={border_color}', config_content)
         
-        with open(config_path, 'w') as f:
-            f.write(config_content)
+            config_content = self.substitute('mako', config_path, MAKO_SUBSTITUTIONS, config_content, {
+                'background-color': f'background-color={bg_color}',
+                'text-color': f'text-color={fg_color}',
+                'border-color': f'border-color={border_color}',
+            })
         
-        print(f'Updated Mako config: bg={bg_color}, fg={fg_color}, border={border_color}', file=sys.stderr)
+        log(f'Updated Mako config: bg={bg_color}, fg={fg_color}, border={border_color}')
+        return config_content
     
-    def update_nvim_config(self, config_path, colors):
-        """Update Neovim config with extracted colors"""
-        with open(config_path, 'r') as f:
-            config = f.read()
-        
-        primary = self.rgb_to_hex(*colors[0])
-        secondary = self.rgb_to_hex(*colors[1]) if len(colors) > 1 else self.adjust_brightness(primary, 0.8)
-        tertiary = self.rgb_to_hex(*colors[2]) if len(colors) > 2 else self.adjust_brightness(primary, 0.6)
+    def nvim_highlights(self, theme):
+        """Neovim highlight groups for a theme as {group: nvim_set_hl attributes}"""
+        primary = theme['base']
+        secondary = theme['secondary']
+        tertiary = theme['tertiary']
         
-        # Generate background and UI colors
-        bg_color = self.adjust_brightness(primary, 0.08)
-        bg_color = self.ensure_minimum_brightness(bg_color, 0.05)
+        # Background and UI colors
+        bg_color = theme['bg']
+        cursor_line_bg = theme['cursor_line_bg']
         
-        cursor_line_bg = self.adjust_brightness(bg_color, 1.5)
-        line_nr_bg = bg_color
-        
-        # Generate foreground and text colors
-        fg_color = self.create_readable_text_color(bg_color, colors, 3.0, prefer_color=True)
-        line_nr_fg = self.adjust_brightness(primary, 0.4)
-        cursor_line_nr_fg = primary
+        # Foreground and text colors
+        fg_color = theme['editor_fg']
+        line_nr_fg = theme['line_nr_fg']
         
         # Selection colors
-        selection_bg = self.adjust_brightness(primary, 0.3)
-        selection_bg = self.ensure_minimum_brightness(selection_bg, 0.2)
-        selection_fg = self.create_readable_text_color(selection_bg, colors, 3.0)
-        
-        # Search highlighting
-        search_bg = primary
-        search_fg = self.create_readable_text_color(search_bg, colors, 4.0, prefer_color=False)
-        inc_search_bg = secondary
-        inc_search_fg = self.create_readable_text_color(inc_search_bg, colors, 4.0, prefer_color=False)
+        selection_bg = theme['selection_bg']
+        selection_fg = theme['selection_fg']
         
         # UI elements
-        status_line_bg = self.adjust_brightness(primary, 0.2)
-        status_line_fg = self.create_readable_text_color(status_line_bg, colors, 3.0)
-        status_line_nc_bg = self.adjust_brightness(bg_color, 1.2)
-        status_line_nc_fg = self.adjust_brightness(primary, 0.4)
-        
-        vert_split_fg = selection_bg
-        
-        # Popup menu
-        pmenu_bg = status_line_bg
-        pmenu_fg = status_line_fg
-        pmenu_sel_bg = selection_bg
-        pmenu_sel_fg = selection_fg
-        
-        # Syntax highlighting colors
-        comment_fg = self.adjust_brightness(primary, 0.5)
-        string_fg = tertiary
-        number_fg = primary
-        function_fg = secondary
-        keyword_fg = self.adjust_brightness(secondary, 1.2)
-        type_fg = self.adjust_brightness(tertiary, 1.1)
-        special_fg = primary
-        
-        # Error and warning colors
-        error_fg = "#ff6b6b"
-        error_bg = "#2a0a0a"
-        warning_fg = "#ffa500" 
-        warning_bg = "#2a1a00"
+        status_line_bg = theme['status_line_bg']
+        status_line_fg = theme['status_line_fg']
+        
+        return {
+            'Normal': {'fg': fg_color, 'bg': bg_color},
+            'CursorLine': {'bg': cursor_line_bg},
+            'LineNr': {'fg': line_nr_fg, 'bg': bg_color},
+            'CursorLineNr': {'fg': primary, 'bg': cursor_line_bg, 'bold': True},
+            'Visual': {'fg': selection_fg, 'bg': selection_bg},
+            # Search highlighting
+            'Search': {'fg': theme['search_fg'], 'bg': primary},
+            'IncSearch': {'fg': theme['inc_search_fg'], 'bg': secondary},
+            'StatusLine': {'fg': status_line_fg, 'bg': status_line_bg},
+            'StatusLineNC': {'fg': line_nr_fg, 'bg': theme['status_line_nc_bg']},
+            'VertSplit': {'fg': selection_bg, 'bg': bg_color},
+            # Popup menu
+            'Pmenu': {'fg': status_line_fg, 'bg': status_line_bg},
+            'PmenuSel': {'fg': selection_fg, 'bg': selection_bg},
+            # Syntax highlighting colors
+            'Comment': {'fg': theme['comment_fg'], 'italic': True},
+            'String': {'fg': tertiary},
+            'Number': {'fg': primary},
+            'Function': {'fg': secondary},
+            'Keyword': {'fg': theme['keyword_fg'], 'bold': True},
+            'Type': {'fg': theme['type_fg']},
+            'Special': {'fg': primary},
+            # Error and warning colors
+            'Error': {'fg': '#ff6b6b', 'bg': '#2a0a0a'},
+            'Warning': {'fg': '#ffa500', 'bg': '#2a1a00'},
+        }
+    
+    def render_nvim_config(self, config_path, theme):
+        """Render the updated Neovim config with extracted colors"""
+        theme = self.as_theme(theme)
+        with open(config_path, 'r') as f:
+            config = f.read()
         
         # Build the new color scheme block
-        new_colors = f'''\" Custom color scheme to match kitty Deep Space theme
-highlight Normal guifg={fg_color} guibg={bg_color}
-highlight CursorLine guibg={cursor_line_bg}
-highlight LineNr guifg={line_nr_fg} guibg={line_nr_bg}
-highlight CursorLineNr guifg={cursor_line_nr_fg} guibg={cursor_line_bg} gui=bold
-highlight Visual guifg={selection_fg} guibg={selection_bg}
-highlight Search guifg={search_fg} guibg={search_bg}
-highlight IncSearch guifg={inc_search_fg} guibg={inc_search_bg}
-highlight StatusLine guifg={status_line_fg} guibg={status_line_bg}
-highlight StatusLineNC guifg={status_line_nc_fg} guibg={status_line_nc_bg}
-highlight VertSplit guifg={vert_split_fg} guibg={bg_color}
-highlight Pmenu guifg={pmenu_fg} guibg={pmenu_bg}
-highlight PmenuSel guifg={pmenu_sel_fg} guibg={pmenu_sel_bg}
-highlight Comment guifg={comment_fg} gui=italic
-highlight String guifg={string_fg}
-highlight Number guifg={number_fg}
-highlight Function guifg={function_fg}
-highlight Keyword guifg={keyword_fg} gui=bold
-highlight Type guifg={type_fg}
-highlight Special guifg={special_fg}
-highlight Error guifg={error_fg} guibg={error_bg}
-highlight Warning guifg={warning_fg} guibg={warning_bg}'''
-        
-        import re
-        # Replace the entire color scheme block
-        pattern = r'\" Custom color scheme to match kitty Deep Space theme.*?highlight Warning guifg=#[0-9a-fA-F]{6} guibg=#[0-9a-fA-F]{6}'
-        config = re.sub(pattern, new_colors, config, flags=re.DOTALL)
+        lines = ['" Custom color scheme to match kitty Deep Space theme']
+        for group, attrs in self.nvim_highlights(theme).items():
+            line = f'highlight {group}'
+            if 'fg' in attrs:
+                line += f" guifg={attrs['fg']}"
+            if 'bg' in attrs:
+                line += f" guibg={attrs['bg']}"
+            styles = [style for style in ('bold', 'italic') if attrs.get(style)]
+            if styles:
+                line += f" gui={','.join(styles)}"
+            lines.append(line)
         
-        with open(config_path, 'w') as f:
-            f.write(config)
+        # Replace the entire color scheme block
+        config = self.substitute('nvim', config_path, NVIM_SUBSTITUTIONS, config, {'colorscheme': '\n'.join(lines)})
         
-        print(f'Updated nvim config: bg={bg_color}, fg={fg_color}, accent={primary}', file=sys.stderr)
+        log(f"Updated nvim config: bg={theme['bg']}, fg={theme['editor_fg']}, accent={theme['base']}")
+        return config
+    
+    def update_target(self, config_name, config_path, theme):
+        """Render one target and write it atomically, returning True if the file changed"""
+        content = getattr(self, TARGET_RENDERERS[config_name])(config_path, theme)
+        if content is None or config_writer.is_current(config_path, content):
+            return False
+        config_writer.write_atomic(config_path, content)
+        return True
     
-    def update_razer_keyboard(self, colors):
+    def update_i3_config(self, config_path, theme):
+        """Update i3 window manager config"""
+        self.update_target('i3', config_path, theme)
+    
+    def update_kitty_config(self, config_path, theme):
+        """Update kitty terminal config"""
+        self.update_target('kitty', config_path, theme)
+    
+    def update_dunst_config(self, config_path, theme):
+        """Update dunst notification config"""
+        self.update_target('dunst', config_path, theme)
+    
+    def update_i3blocks_config(self, config_path, theme):
+        """Update i3blocks status bar config"""
+        self.update_target('i3blocks', config_path, theme)
+    
+    def update_hyprland_config(self, config_path, theme):
+        """Update Hyprland window manager config"""
+        self.update_target('hyprland', config_path, theme)
+    
+    def update_waybar_config(self, config_path, theme):
+        """Update Waybar config"""
+        self.update_target('waybar', config_path, theme)
+    
+    def update_waybar_style(self, style_path, theme):
+        """Update Waybar CSS style"""
+        self.update_target('waybar_style', style_path, theme)
+    
+    def update_mako_config(self, config_path, theme):
+        """Update Mako notification config"""
+        self.update_target('mako', config_path, theme)
+    
+    def update_nvim_config(self, config_path, theme):
+        """Update Neovim config with extracted colors"""
+        self.update_target('nvim', config_path, theme)
+    
+    def _stage_target(self, config_name, config_path, theme, bundle=None):
+        """Render and stage one target, returning (ok, staged file or None, seconds)
+        
+        A precomputed bundle file is copied in instead of rendering when it is valid.
+        Nothing is staged when the new content matches the file on disk.
+        """
+        start = time.perf_counter()
+        if bundle and config_name in bundle.valid:
+            try:
+                staged = None
+                if not config_writer.same_content(config_path, bundle.file(config_name)):
+                    staged = config_writer.stage_copy(config_path, bundle.file(config_name))
+                return True, staged, time.perf_counter() - start
+            except OSError as e:
+                # Bundle replaced or pruned underneath us, render instead
+                log(f'Warning: Could not use precomputed {config_name} config: {e}')
+        try:
+            content = getattr(self, TARGET_RENDERERS[config_name])(config_path, theme)
+            staged = None
+            if content is not None and not config_writer.is_current(config_path, content):
+                staged = config_writer.stage(config_path, content)
+            ok = True
+        except Exception as e:
+            log(f'Error updating {config_path}: {e}')
+            staged, ok = None, False
+        return ok, staged, time.perf_counter() - start
+    
+    def _timed_razer_update(self, theme):
+        start = time.perf_counter()
+        try:
+            self.update_razer_keyboard(theme)
+            ok = True
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+    
+    def _timed_lockscreen_update(self, wallpaper_path):
+        start = time.perf_counter()
+        try:
+            self.lockscreen.update(wallpaper_path)
+            ok = True
+        except Exception as e:
+            log(f'Warning: Could not update lock screen image: {e}')
+            ok = False
+        return ok, time.perf_counter() - start
+    
+    def _timed_live_push(self, theme, targets):
+        from live_push import summarize
+        
+        start = time.perf_counter()
+        results = self.live_push.push(self.kitty_colors(theme) if 'kitty' in targets else None,
+                                      self.nvim_highlights(theme) if 'nvim' in targets else None)
+        if results:
+            log(f'Live-pushed colors to {summarize(results)}')
+        for (kind, path), (ok, _, detail) in results.items():
+            if not ok:
+                log(f'Warning: Could not push colors to {kind} at {path}: {detail}')
+        return time.perf_counter() - start
+    
+    def write_targets(self, targets, theme, bundle=None, wallpaper_path=None):
+        """Render, stage and commit {config_name: path} targets concurrently
+        
+        Every target renders and fsyncs its temp file on its own thread, then all
+        files are renamed into place together. The Razer update talks to DBus and
+        can block for seconds, and blurring the lock screen image is the slowest
+        step of a cold switch, so both run alongside the file writes, as does the
+        live push recoloring already running terminals and editors. Targets
+        covered by a precomputed bundle are swapped in without rendering.
+        Returns (results, changed, timings): changed lists the targets whose files
+        were actually rewritten, timings are in milliseconds.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        results, timings, staged = {}, {}, {}
+        with ThreadPoolExecutor(max_workers=len(targets) + 3) as pool:
+            razer = pool.submit(self._timed_razer_update, theme)
+            lock = live = None
+            if self.lockscreen and wallpaper_path:
+                lock = pool.submit(self._timed_lockscreen_update, wallpaper_path)
+            if self.live_push and ('kitty' in targets or 'nvim' in targets):
+                live = pool.submit(self._timed_live_push, theme, targets)
+            futures = {name: pool.submit(self._stage_target, name, path, theme, bundle) for name, path in targets.items()}
+            
+            try:
+                for name, future in futures.items():
+                    ok, staged_file, elapsed = future.result()
+                    results[name] = ok
+                    timings[name] = round(elapsed * 1000, 1)
+                    if staged_file:
+                        staged[name] = staged_file
+            except BaseException:
+                # Never leave temp files (or links into bundles) behind
+                config_writer.discard([future.result()[1] for future in futures.values()
+                                       if not future.exception() and future.result()[1]])
+                raise
+            
+            start = time.perf_counter()
+            errors = config_writer.commit(staged)
+            for name, error in errors.items():
+                log(f'Error updating {targets[name]}: {error}')
+                results[name] = False
+            timings['commit'] = round((time.perf_counter() - start) * 1000, 1)
+            changed = [name for name in staged if name not in errors]
+            
+            results['razer'], elapsed = razer.result()
+            timings['razer'] = round(elapsed * 1000, 1)
+            if lock:
+                # Logged but not counted as a failed target; a stale lock image is not worth failing the switch
+                _, elapsed = lock.result()
+                timings['lockscreen'] = round(elapsed * 1000, 1)
+            if live:
+                # Failures are per instance and only logged, like the lock screen
+                timings['live_push'] = round(live.result() * 1000, 1)
+        
+        return results, changed, timings
+    
+    def update_razer_keyboard(self, theme):
         """Update Razer keyboard RGB colors using OpenRazer Python API"""
         try:
             from openrazer.client import DeviceManager
 
-            # Get primary colors and enhance for keyboard visibility
-            primary_raw = self.rgb_to_hex(*colors[0])
-            primary_r, primary_g, primary_b = self.hex_to_rgb(primary_raw)
-            primary_h, primary_l, primary_s = colorsys.rgb_to_hls(primary_r/255.0, primary_g/255.0, primary_b/255.0)
-
-            # Boost saturation and adjust brightness for keyboard LEDs
-            deep_s = min(primary_s * 1.8, 1.0)
-            deep_l = max(primary_l * 0.8, 0.25)
-
-            deep_r, deep_g, deep_b = colorsys.hls_to_rgb(primary_h, deep_l, deep_s)
-            primary_rgb = (int(deep_r*255), int(deep_g*255), int(deep_b*255))
-
-            # Secondary color for logo
-            secondary_raw = self.rgb_to_hex(*colors[1]) if len(colors) > 1 else self.adjust_brightness(primary_raw, 0.7)
-            secondary = self.adjust_brightness(secondary_raw, 0.6)
-            secondary = self.ensure_minimum_brightness(secondary, 0.25)
-            secondary_rgb = self.hex_to_rgb(secondary)
+            # Saturated dominant color for the backlight, secondary color for the logo
+            theme = self.as_theme(theme)
+            primary_rgb = self.hex_to_rgb(theme['keyboard_primary'])
+            secondary_rgb = self.hex_to_rgb(theme['keyboard_logo'])
 
             # Connect to OpenRazer daemon
             device_manager = DeviceManager()
 
             if not device_manager.devices:
-                print('No Razer devices found', file=sys.stderr)
+                log('No Razer devices found')
                 return
 
             for device in device_manager.devices:
@@ -668,7 +890,7 @@ highlight Warning guifg={warning_fg} guibg={warning_bg}'''
                     device.fx.breath_single(*primary_rgb)
                     mode = 'breath'
                 else:
-                    print(f'Device {device_name} does not support static or breath effects', file=sys.stderr)
+                    log(f'Device {device_name} does not support static or breath effects')
                     continue
 
                 # Set logo if available
@@ -679,54 +901,65 @@ highlight Warning guifg={warning_fg} guibg={warning_bg}'''
                         pass
 
                 brightness_info = ', brightness=15%' if brightness_set else ''
-                print(f'Updated Razer keyboard ({device_name}): {mode} mode with #{self.rgb_to_hex(*primary_rgb)[1:]}{brightness_info}', file=sys.stderr)
+                log(f'Updated Razer keyboard ({device_name}): {mode} mode with #{self.rgb_to_hex(*primary_rgb)[1:]}{brightness_info}')
 
         except ImportError:
-            print('OpenRazer Python library not installed, skipping keyboard update', file=sys.stderr)
+            log('OpenRazer Python library not installed, skipping keyboard update')
         except Exception as e:
-            print(f'Error updating Razer keyboard: {e}', file=sys.stderr)
+            log(f'Error updating Razer keyboard: {e}')
+    
+    def publish_theme(self, theme, wallpaper_path):
+        """Write the applied theme's palette and roles to CURRENT_THEME_PATH"""
+        content = json.dumps({
+            'version': THEME_VERSION,
+            'wallpaper': os.path.abspath(wallpaper_path),
+            'palette': [self.rgb_to_hex(*c) for c in theme.colors],
+            'roles': theme.resolve(),
+        }, indent=1)
+        try:
+            if not config_writer.is_current(CURRENT_THEME_PATH, content):
+                os.makedirs(os.path.dirname(CURRENT_THEME_PATH), exist_ok=True)
+                config_writer.write_atomic(CURRENT_THEME_PATH, content)
+        except OSError as e:
+            log(f'Warning: Could not write {CURRENT_THEME_PATH}: {e}')
     
     def process_wallpaper(self, wallpaper_path):
         """Main method to process wallpaper and update all configs"""
+        return self.apply_wallpaper(wallpaper_path)['ok']
+    
+    def apply_wallpaper(self, wallpaper_path):
+        """Process wallpaper and return the palette with per-target results"""
         try:
-            # Extract colors using improved k-means method
-            colors = self.extract_dominant_colors_kmeans(wallpaper_path)
-            
-            # Track success/failure for each config update
-            results = {}
-            
-            # Update each config safely with backup/rollback
+            # Collect the configured targets that exist
+            targets = {}
             for config_name, config_path in self.config_paths.items():
                 if not config_path or not os.path.exists(config_path):
                     if config_path:  # Only warn if path was specified
                         print(f'Warning: Config file not found: {config_path}', file=sys.stderr)
                     continue
-                    
-                if config_name == 'i3':
-                    results[config_name] = self.update_config_safely(config_path, self.update_i3_config, colors)
-                elif config_name == 'hyprland':
-                    results[config_name] = self.update_config_safely(config_path, self.update_hyprland_config, colors)
-                elif config_name == 'kitty':
-                    results[config_name] = self.update_config_safely(config_path, self.update_kitty_config, colors)
-                elif config_name == 'dunst':
-                    results[config_name] = self.update_config_safely(config_path, self.update_dunst_config, colors)
-                elif config_name == 'mako':
-                    results[config_name] = self.update_config_safely(config_path, self.update_mako_config, colors)
-                elif config_name == 'i3blocks':
-                    results[config_name] = self.update_config_safely(config_path, self.update_i3blocks_config, colors)
-                elif config_name == 'waybar':
-                    results[config_name] = self.update_config_safely(config_path, self.update_waybar_config, colors)
-                elif config_name == 'waybar_style':
-                    results[config_name] = self.update_config_safely(config_path, self.update_waybar_style, colors)
-                elif config_name == 'nvim':
-                    results[config_name] = self.update_config_safely(config_path, self.update_nvim_config, colors)
+                if config_name in TARGET_RENDERERS:
+                    targets[config_name] = config_path
             
-            # Update Razer keyboard (doesn't need backup)
-            try:
-                self.update_razer_keyboard(colors)
-                results['razer'] = True
-            except Exception:
-                results['razer'] = False
+            # Use the precomputed bundle when there is one, otherwise extract colors
+            # and derive every target's roles from them once
+            bundle = None
+            if self.bundles:
+                bundle = self.bundles.open(wallpaper_path, self.extraction_params(), targets, TARGET_TEMPLATE_MASKS)
+            if bundle:
+                print(f'Using precomputed configs for: {", ".join(sorted(bundle.valid))}', file=sys.stderr)
+                theme = Theme.from_dict(self, bundle.theme)
+            else:
+                theme = self.extract_theme(wallpaper_path)
+            
+            # Write every config (and the Razer keyboard) concurrently
+            results, changed, timings = self.write_targets(targets, theme, bundle, wallpaper_path)
+            if bundle:
+                # Swapped-in files keep the template fingerprint they were checked against
+                self.bundles.remember(targets, bundle.fingerprints)
+            print('Target timings: ' + ', '.join(f'{name} {ms:.1f} ms' for name, ms in timings.items()), file=sys.stderr)
+            unchanged = [name for name in targets if results.get(name) and name not in changed]
+            if unchanged:
+                print(f'Unchanged (not rewritten): {", ".join(unchanged)}', file=sys.stderr)
             
             # Report results
             successful = [k for k, v in results.items() if v]
@@ -737,56 +970,214 @@ highlight Warning guifg={warning_fg} guibg={warning_bg}'''
             if failed:
                 print(f'Failed to update: {", ".join(failed)}', file=sys.stderr)
             
-                
-            return len(failed) == 0
+            changed_roles = sorted(theme.diff(self.last_theme))
+            self.last_theme = theme
+            self.publish_theme(theme, wallpaper_path)
+            
+            return {
+                'ok': len(failed) == 0,
+                'wallpaper': wallpaper_path,
+                'palette': [self.rgb_to_hex(*c) for c in theme.colors],
+                'changed': changed,
+                'changed_roles': changed_roles,
+                'results': results,
+                'timings': timings,
+            }
             
         except Exception as e:
             print(f'Critical error processing wallpaper: {e}', file=sys.stderr)
-            return False
+            return {'ok': False, 'wallpaper': wallpaper_path, 'error': str(e)}
 
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: color_processor.py <wallpaper_path> <wm_type> [config_paths...]", file=sys.stderr)
-        print("  wm_type: 'i3' or 'hyprland'", file=sys.stderr)
-        print("  For i3: <wallpaper_path> i3 <i3_config> <kitty_config> <dunst_config> <i3blocks_config>", file=sys.stderr)
-        print("  For hyprland: <wallpaper_path> hyprland <hyprland_config> <kitty_config> <mako_config> [waybar_config] [waybar_style]", file=sys.stderr)
-        sys.exit(1)
+def cache_command(args):
+    """Handle `color_processor.py cache <purge|clear|stats>`"""
+    cache = PaletteCache()
+    action = args[0] if args else 'stats'
     
-    wallpaper_path = sys.argv[1]
-    wm_type = sys.argv[2]
+    if action == 'purge':
+        removed = cache.purge_stale()
+        removed += cache.evict()
+        print(f'Purged {removed} stale palette cache entries', file=sys.stderr)
+    elif action == 'clear':
+        removed = cache.clear()
+        bundles = BundleStore().clear()
+        lock_images = LockScreen().evict(keep=0)
+        print(f'Removed {removed} palette cache entries, {bundles} precomputed bundles '
+              f'and {lock_images} lock screen images', file=sys.stderr)
+    elif action == 'stats':
+        print(json.dumps(cache.stats()))
+    else:
+        print("Usage: color_processor.py cache <purge|clear|stats>", file=sys.stderr)
+        return 1
+    return 0
+
+
+def parse_config_paths(argv):
+    """Map `<wm_type> [config_paths...]` arguments to a config_paths dict, or None if invalid"""
+    wm_type = argv[0] if argv else None
     
     if wm_type == "i3":
-        if len(sys.argv) != 8:
+        if len(argv) != 6:
             print("Usage for i3: color_processor.py <wallpaper_path> i3 <i3_config> <kitty_config> <dunst_config> <i3blocks_config> <nvim_config>", file=sys.stderr)
-            sys.exit(1)
-        config_paths = {
-            'i3': sys.argv[3],
-            'kitty': sys.argv[4],
-            'dunst': sys.argv[5],
-            'i3blocks': sys.argv[6],
-            'nvim': sys.argv[7]
+            return None
+        return {
+            'i3': argv[1],
+            'kitty': argv[2],
+            'dunst': argv[3],
+            'i3blocks': argv[4],
+            'nvim': argv[5]
         }
     elif wm_type == "hyprland":
-        if len(sys.argv) < 7:
+        if len(argv) < 5:
             print("Usage for hyprland: color_processor.py <wallpaper_path> hyprland <hyprland_config> <kitty_config> <mako_config> [waybar_config] [waybar_style] <nvim_config>", file=sys.stderr)
-            sys.exit(1)
-        config_paths = {
-            'hyprland': sys.argv[3],
-            'kitty': sys.argv[4],
-            'mako': sys.argv[5],
-            'waybar': sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] != 'None' else None,
-            'waybar_style': sys.argv[7] if len(sys.argv) > 7 and sys.argv[7] != 'None' else None,
-            'nvim': sys.argv[8] if len(sys.argv) > 8 else (sys.argv[6] if len(sys.argv) == 7 else None)
+            return None
+        return {
+            'hyprland': argv[1],
+            'kitty': argv[2],
+            'mako': argv[3],
+            'waybar': argv[4] if len(argv) > 4 and argv[4] != 'None' else None,
+            'waybar_style': argv[5] if len(argv) > 5 and argv[5] != 'None' else None,
+            'nvim': argv[6] if len(argv) > 6 else (argv[4] if len(argv) == 5 else None)
         }
-    else:
-        print(f"Error: Unknown window manager type '{wm_type}'. Use 'i3' or 'hyprland'", file=sys.stderr)
+    
+    print(f"Error: Unknown window manager type '{wm_type}'. Use 'i3' or 'hyprland'", file=sys.stderr)
+    return None
+
+
+def quantizers_command(args):
+    """Handle `color_processor.py quantizers <image> [--reference NAME] [--tolerance DELTA_E]`"""
+    import numpy as np
+    from quantizers import compare_quantizers
+    
+    image_path = None
+    reference = 'sklearn'
+    tolerance = 10.0
+    i = 0
+    while i < len(args):
+        if args[i] == '--reference' and i + 1 < len(args):
+            reference = args[i + 1]
+            i += 2
+        elif args[i] == '--tolerance' and i + 1 < len(args):
+            tolerance = float(args[i + 1])
+            i += 2
+        else:
+            image_path = args[i]
+            i += 1
+    
+    if not image_path:
+        print("Usage: color_processor.py quantizers <image> [--reference NAME] [--tolerance DELTA_E]", file=sys.stderr)
+        return 1
+    
+    data = ColorProcessor({}).load_pixels(image_path).astype(np.float64)
+    try:
+        report = compare_quantizers(data, 5, reference)
+    except ImportError:
+        print(f"Reference quantizer '{reference}' is not available, using '{DEFAULT_QUANTIZER}'", file=sys.stderr)
+        reference = DEFAULT_QUANTIZER
+        report = compare_quantizers(data, 5, reference)
+    
+    ok = True
+    for name, (elapsed, delta_e) in report.items():
+        within = delta_e <= tolerance
+        ok = ok and within
+        print(f'{name:<12} {elapsed * 1000:8.1f} ms   ΔE vs {reference}: {delta_e:5.2f} {"ok" if within else "EXCEEDS"}', file=sys.stderr)
+    return 0 if ok else 1
+
+
+def pop_option(argv, name, default=None):
+    """Remove `name VALUE` from argv and return VALUE (an empty string if it is missing)"""
+    if name not in argv:
+        return default
+    pos = argv.index(name)
+    value = argv[pos + 1] if pos + 1 < len(argv) else ''
+    del argv[pos:pos + 2]
+    return value
+
+
+def main():
+    startup_profile.maybe_profile()
+    
+    # Global flags may appear anywhere on the command line
+    use_cache = '--no-cache' not in sys.argv
+    live = '--no-live-push' not in sys.argv
+    sys.argv = [arg for arg in sys.argv if arg not in ('--no-cache', '--no-live-push')]
+    
+    quantizer = pop_option(sys.argv, '--quantizer', DEFAULT_QUANTIZER)
+    if quantizer not in QUANTIZERS:
+        print(f"Error: Unknown quantizer '{quantizer}'. Choose from: {', '.join(QUANTIZERS)}", file=sys.stderr)
         sys.exit(1)
     
-    processor = ColorProcessor(config_paths)
-    success = processor.process_wallpaper(wallpaper_path)
+    # Keep a blurred lock screen image in sync (resolution is detected when not given)
+    lockscreen = None
+    lock_image = pop_option(sys.argv, '--lock-image')
+    lock_resolution = pop_option(sys.argv, '--lock-resolution')
+    if lock_image:
+        try:
+            lockscreen = LockScreen(lock_image, parse_resolution(lock_resolution) if lock_resolution else None)
+        except ValueError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            sys.exit(1)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        # The daemon marks its startup done once it is listening
+        from live_push import LivePush
+        from theming_daemon import serve_command
+        sys.exit(serve_command(sys.argv[2:], use_cache, quantizer, lockscreen, LivePush() if live else None))
+    
+    # Everything up to here is startup; extraction imports NumPy and PIL on demand
+    startup_profile.mark()
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        sys.exit(cache_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'index':
+        from palette_index import index_command
+        sys.exit(index_command(sys.argv[2:], use_cache, quantizer))
+    if len(sys.argv) > 1 and sys.argv[1] == 'quantizers':
+        sys.exit(quantizers_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'precompute':
+        from theme_bundles import precompute_command
+        sys.exit(precompute_command(sys.argv[2:], use_cache, quantizer))
+    if len(sys.argv) > 1 and sys.argv[1] == 'prefetch':
+        from theme_bundles import prefetch_command
+        sys.exit(prefetch_command(sys.argv[2:], use_cache, quantizer, lockscreen))
+    if len(sys.argv) > 1 and sys.argv[1] == 'select':
+        from palette_search import select_command
+        sys.exit(select_command(sys.argv[2:], use_cache, quantizer))
+    
+    if len(sys.argv) < 3:
+        print("Usage: color_processor.py [--no-cache] [--no-live-push] [--quantizer NAME] [--lock-image PATH [--lock-resolution WxH]] <wallpaper_path> <wm_type> [config_paths...]", file=sys.stderr)
+        print("       color_processor.py cache <purge|clear|stats>", file=sys.stderr)
+        print("       color_processor.py index <wallpaper_dir> [--workers N] [--index-file PATH]", file=sys.stderr)
+        print("       color_processor.py serve [--socket PATH] [--wallpaper-dir DIR] [--index-file PATH] <wm_type> [config_paths...]", file=sys.stderr)
+        print("       color_processor.py quantizers <image> [--reference NAME] [--tolerance DELTA_E]", file=sys.stderr)
+        print("       color_processor.py precompute <wallpaper_dir> <wm_type> [config_paths...]", file=sys.stderr)
+        print("       color_processor.py prefetch [--index-file PATH] [--mode MODE] <wallpaper_dir> <wm_type> [config_paths...]", file=sys.stderr)
+        print("       color_processor.py select [--index-file PATH] <wallpaper_dir> <next|previous|random|shuffle|similar|contrast>", file=sys.stderr)
+        print(f"  quantizers: {', '.join(QUANTIZERS)} (default: {DEFAULT_QUANTIZER})", file=sys.stderr)
+        print("  --profile-startup (any command): report import times and time to first useful work", file=sys.stderr)
+        print("  wm_type: 'i3' or 'hyprland'", file=sys.stderr)
+        print("  For i3: <wallpaper_path> i3 <i3_config> <kitty_config> <dunst_config> <i3blocks_config>", file=sys.stderr)
+        print("  For hyprland: <wallpaper_path> hyprland <hyprland_config> <kitty_config> <mako_config> [waybar_config] [waybar_style]", file=sys.stderr)
+        sys.exit(1)
+    
+    wallpaper_path = sys.argv[1]
+    config_paths = parse_config_paths(sys.argv[2:])
+    if config_paths is None:
+        sys.exit(1)
+    
+    # Recolor running kitty and Neovim instances along with their configs
+    live_push = None
+    if live:
+        from live_push import LivePush
+        live_push = LivePush()
+    
+    processor = ColorProcessor(config_paths, PaletteCache() if use_cache else None, quantizer,
+                               bundles=BundleStore() if use_cache else None, lockscreen=lockscreen,
+                               live_push=live_push)
+    response = processor.apply_wallpaper(wallpaper_path)
     
-    sys.exit(0 if success else 1)
+    # Machine-readable summary so callers only reload daemons whose configs changed
+    print(json.dumps({'ok': response['ok'], 'changed': response.get('changed', [])}))
+    sys.exit(0 if response['ok'] else 1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Atomic config file commits for the theming engine
+
+Files are written in two phases so readers (waybar reloading on SIGUSR2, a
+crash mid-apply) only ever see the old or the new file, never a truncated one:
+stage() writes and fsyncs a temp file next to the target, commit() renames all
+staged files into place and then fsyncs each touched directory once.
+"""
+
+import filecmp
+import os
+import shutil
+import stat
+import tempfile
+
+# Mode for configs that did not exist before
+NEW_FILE_MODE = 0o644
+
+
+def is_current(path, content):
+    """Return True if path already holds exactly this content"""
+    try:
+        with open(path, 'r') as f:
+            return f.read() == content
+    except (FileNotFoundError, UnicodeDecodeError):
+        return False
+
+
+def stage(path, content):
+    """Write content to a synced temp file beside path, returning (target, temp_path)"""
+    # Write through symlinks so dotfile managers keep their links
+    target = os.path.realpath(path)
+    directory = os.path.dirname(target)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(target).st_mode)
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        discard([(target, tmp_path)])
+        raise
+    return target, tmp_path
+
+
+def stage_copy(path, source_path):
+    """Stage a copy of an already rendered file (e.g. a precomputed bundle) beside path
+
+    A copy rather than a hardlink: editors and tools that rewrite the live config
+    in place would otherwise rewrite the cached bundle with it.
+    """
+    target = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target)}.', suffix='.tmp',
+                                    dir=os.path.dirname(target))
+    try:
+        with os.fdopen(fd, 'wb') as f, open(source_path, 'rb') as source:
+            shutil.copyfileobj(source, f)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(target).st_mode)
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        discard([(target, tmp_path)])
+        raise
+    return target, tmp_path
+
+
+def same_content(path, other_path):
+    """Return True if two separate files hold the same bytes
+
+    The same inode counts as different, so a config left hardlinked to a bundle
+    by an older version is replaced by a copy.
+    """
+    try:
+        return not os.path.samefile(path, other_path) and filecmp.cmp(path, other_path, shallow=False)
+    except FileNotFoundError:
+        return False
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit(staged):
+    """Rename staged {name: (target, temp_path)} files into place, returning {name: error}"""
+    errors = {}
+    directories = set()
+    for name, (target, tmp_path) in staged.items():
+        try:
+            os.replace(tmp_path, target)
+            directories.add(os.path.dirname(target))
+        except OSError as e:
+            discard([(target, tmp_path)])
+            errors[name] = e
+    # One directory fsync covers every rename made in it
+    for directory in directories:
+        try:
+            _fsync_directory(directory)
+        except OSError:
+            pass
+    return errors
+
+
+def discard(staged):
+    """Remove temp files that will not be committed"""
+    for _, tmp_path in staged:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def write_atomic(path, content):
+    """Stage and commit a single file"""
+    errors = commit({path: stage(path, content)})
+    if errors:
+        raise errors[path]
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Fast reduced-resolution wallpaper decoding"""
+
+from PIL import Image, ImageOps
+
+
+def open_reduced(image_path, size):
+    """Decode an image at roughly the given (width, height) instead of full resolution
+
+    JPEGs are downscaled in the DCT domain while decoding (up to 1/8 scale), other
+    formats are shrunk with integer-factor reduction before resampling. EXIF
+    orientation is applied after the reduced decode, where it is cheap.
+    """
+    img = Image.open(image_path)
+
+    # Ask libjpeg for the smallest 1/2, 1/4 or 1/8 scale that still covers `size`
+    if img.format == 'JPEG':
+        img.draft('RGB', size)
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def load_thumbnail(image_path, size=(100, 100)):
+    """Decode an image and resample it to exactly `size` (aspect ratio is not kept)"""
+    img = open_reduced(image_path, size)
+    # reducing_gap lets Pillow box-reduce by an integer factor before the final resample
+    return img.resize(size, reducing_gap=2.0)
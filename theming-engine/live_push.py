@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""Push a new theme into running kitty and Neovim instances without restarting them
+
+kitty listens for remote-control commands on the sockets named by `listen_on`
+in kitty.conf ($XDG_RUNTIME_DIR/kitty-PID); one `set-colors --all --configured`
+per instance recolors every window and the defaults for new ones. Neovim serves
+msgpack-RPC on $XDG_RUNTIME_DIR/nvim.PID.0; every highlight group goes out as
+an nvim_set_hl request, all pipelined over one connection. Instances are
+handled concurrently and each gets its own deadline, so a hung editor costs
+at most the timeout. FakeKitty and FakeNeovim serve the same protocols from a
+temporary directory so the push can be exercised without either program.
+"""
+
+import glob
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import startup_profile
+
+DEFAULT_TIMEOUT = 0.5
+MAX_WORKERS = 16
+KITTY_PREFIX = b'\x1bP@kitty-cmd'
+KITTY_SUFFIX = b'\x1b\\'
+# Oldest kitty whose set-colors takes this payload
+KITTY_VERSION = [0, 26, 0]
+
+
+def runtime_dir():
+    return os.environ.get('XDG_RUNTIME_DIR', f'/run/user/{os.getuid()}')
+
+
+def _sockets(patterns):
+    found = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            try:
+                if stat.S_ISSOCK(os.stat(path).st_mode) and path not in found:
+                    found.append(path)
+            except OSError:
+                pass
+    return found
+
+
+def kitty_sockets():
+    """Remote-control sockets of running kitty instances"""
+    patterns = [os.path.join(runtime_dir(), 'kitty-*')]
+    # Set inside kitty windows; abstract (unix:@name) sockets cannot be found on disk
+    listen_on = os.environ.get('KITTY_LISTEN_ON', '')
+    if listen_on.startswith('unix:') and not listen_on.startswith('unix:@'):
+        patterns.append(glob.escape(listen_on[5:]))
+    return _sockets(patterns)
+
+
+def nvim_sockets():
+    """RPC server sockets of running Neovim instances"""
+    patterns = [os.path.join(runtime_dir(), 'nvim.*.0')]
+    # Neovim's fallback when XDG_RUNTIME_DIR is unset
+    user = os.environ.get('USER') or str(os.getuid())
+    patterns.append(os.path.join(tempfile.gettempdir(), f'nvim.{user}', '*', 'nvim.*.0'))
+    return _sockets(patterns)
+
+
+class Truncated(ValueError):
+    """The buffer ends inside a msgpack object"""
+
+
+def pack(obj):
+    """Encode None, bools, ints, floats, str, bytes, lists/tuples and dicts as msgpack"""
+    if obj is None:
+        return b'\xc0'
+    if obj is True:
+        return b'\xc3'
+    if obj is False:
+        return b'\xc2'
+    if isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            return bytes([obj])
+        if -32 <= obj < 0:
+            return struct.pack('>b', obj)
+        for code, fmt, low, high in ((0xcc, '>B', 0, 0xff), (0xcd, '>H', 0, 0xffff), (0xce, '>I', 0, 0xffffffff),
+                                     (0xcf, '>Q', 0, 0xffffffffffffffff), (0xd0, '>b', -0x80, 0x7f),
+                                     (0xd1, '>h', -0x8000, 0x7fff), (0xd2, '>i', -0x80000000, 0x7fffffff),
+                                     (0xd3, '>q', -0x8000000000000000, 0x7fffffffffffffff)):
+            if low <= obj <= high:
+                return bytes([code]) + struct.pack(fmt, obj)
+        raise ValueError(f'Integer out of msgpack range: {obj}')
+    if isinstance(obj, float):
+        return b'\xcb' + struct.pack('>d', obj)
+    if isinstance(obj, str):
+        data = obj.encode()
+        n = len(data)
+        if n < 32:
+            return bytes([0xa0 | n]) + data
+        if n < 0x100:
+            return b'\xd9' + struct.pack('>B', n) + data
+        return (b'\xda' + struct.pack('>H', n) if n < 0x10000 else b'\xdb' + struct.pack('>I', n)) + data
+    if isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            return b'\xc4' + struct.pack('>B', n) + obj
+        return (b'\xc5' + struct.pack('>H', n) if n < 0x10000 else b'\xc6' + struct.pack('>I', n)) + obj
+    if isinstance(obj, (list, tuple)):
+        n = len(obj)
+        head = bytes([0x90 | n]) if n < 16 else (b'\xdc' + struct.pack('>H', n) if n < 0x10000 else b'\xdd' + struct.pack('>I', n))
+        return head + b''.join(pack(item) for item in obj)
+    if isinstance(obj, dict):
+        n = len(obj)
+        head = bytes([0x80 | n]) if n < 16 else (b'\xde' + struct.pack('>H', n) if n < 0x10000 else b'\xdf' + struct.pack('>I', n))
+        return head + b''.join(pack(key) + pack(value) for key, value in obj.items())
+    raise TypeError(f'Cannot msgpack {type(obj).__name__}')
+
+
+# Fixed-size types: code -> (struct format, size)
+_FIXED = {0xca: ('>f', 4), 0xcb: ('>d', 8), 0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+          0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8)}
+# Length-prefixed types: code -> (kind, length format, length size)
+_SIZED = {0xc4: ('bin', '>B', 1), 0xc5: ('bin', '>H', 2), 0xc6: ('bin', '>I', 4),
+          0xc7: ('ext', '>B', 1), 0xc8: ('ext', '>H', 2), 0xc9: ('ext', '>I', 4),
+          0xd9: ('str', '>B', 1), 0xda: ('str', '>H', 2), 0xdb: ('str', '>I', 4),
+          0xdc: ('array', '>H', 2), 0xdd: ('array', '>I', 4), 0xde: ('map', '>H', 2), 0xdf: ('map', '>I', 4)}
+
+
+def unpack(data, pos=0):
+    """Decode one msgpack object at pos, returning (object, next pos); raises Truncated if data ends early
+
+    Ext types (Neovim's buffer, window and tabpage handles) decode to (type code, bytes).
+    """
+    def take(n):
+        nonlocal pos
+        if pos + n > len(data):
+            raise Truncated('msgpack data ends early')
+        chunk = data[pos:pos + n]
+        pos += n
+        return chunk
+
+    code = take(1)[0]
+    if code < 0x80:
+        return code, pos
+    if code >= 0xe0:
+        return code - 0x100, pos
+    if code in (0xc0, 0xc2, 0xc3):
+        return {0xc0: None, 0xc2: False, 0xc3: True}[code], pos
+    if code in _FIXED:
+        fmt, size = _FIXED[code]
+        return struct.unpack(fmt, take(size))[0], pos
+    if 0xd4 <= code <= 0xd8:
+        ext_type = struct.unpack('>b', take(1))[0]
+        return (ext_type, bytes(take(1 << (code - 0xd4)))), pos
+    if 0xa0 <= code <= 0xbf:
+        kind, n = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, n = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, n = 'map', code & 0x0f
+    elif code in _SIZED:
+        kind, fmt, size = _SIZED[code]
+        n = struct.unpack(fmt, take(size))[0]
+    else:
+        raise ValueError(f'Unsupported msgpack type 0x{code:02x}')
+
+    if kind == 'str':
+        return bytes(take(n)).decode('utf-8', 'replace'), pos
+    if kind == 'bin':
+        return bytes(take(n)), pos
+    if kind == 'ext':
+        ext_type = struct.unpack('>b', take(1))[0]
+        return (ext_type, bytes(take(n))), pos
+    if kind == 'array':
+        items = []
+        for _ in range(n):
+            item, pos = unpack(data, pos)
+            items.append(item)
+        return items, pos
+    result = {}
+    for _ in range(n):
+        key, pos = unpack(data, pos)
+        result[key], pos = unpack(data, pos)
+    return result, pos
+
+
+def _exchange(path, payload, parse, timeout):
+    """Send payload and feed the replies to parse(buffer) until it returns non-None, all within timeout"""
+    deadline = time.monotonic() + timeout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        sock.sendall(payload)
+        buffer = b''
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f'no reply within {timeout * 1000:.0f} ms')
+            sock.settimeout(remaining)
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                raise TimeoutError(f'no reply within {timeout * 1000:.0f} ms') from None
+            if not chunk:
+                raise ConnectionError('connection closed before the reply')
+            buffer += chunk
+            result = parse(buffer)
+            if result is not None:
+                return result
+    finally:
+        sock.close()
+
+
+def kitty_message(colors):
+    """Remote-control frame for `set-colors --all --configured` with {setting: '#rrggbb'}"""
+    command = {
+        'cmd': 'set-colors',
+        'version': KITTY_VERSION,
+        'no_response': False,
+        'payload': {
+            'colors': {name: int(color.lstrip('#'), 16) for name, color in colors.items()},
+            'all': True,
+            'configured': True,
+            'reset': False,
+            'match_window': None,
+            'match_tab': None,
+        },
+    }
+    return KITTY_PREFIX + json.dumps(command).encode() + KITTY_SUFFIX
+
+
+def _kitty_reply(buffer):
+    end = buffer.find(KITTY_SUFFIX)
+    if end < 0:
+        return None
+    start = buffer.find(KITTY_PREFIX)
+    start = start + len(KITTY_PREFIX) if start >= 0 else 0
+    return json.loads(buffer[start:end])
+
+
+def kitty_set_colors(path, colors, timeout=DEFAULT_TIMEOUT):
+    """Recolor every window of the kitty instance listening on path"""
+    reply = _exchange(path, kitty_message(colors), _kitty_reply, timeout)
+    if not reply.get('ok'):
+        raise RuntimeError(reply.get('error') or 'set-colors failed')
+    return f'{len(colors)} colors'
+
+
+def nvim_requests(highlights):
+    """Pipelined msgpack-RPC nvim_set_hl requests (msgids 0..n-1) for {group: attributes}"""
+    return b''.join(pack([0, msgid, 'nvim_set_hl', [0, group, attrs]])
+                    for msgid, (group, attrs) in enumerate(highlights.items()))
+
+
+def nvim_set_highlights(path, highlights, timeout=DEFAULT_TIMEOUT):
+    """Set highlight groups in the Neovim serving RPC on path, raising on the first rejected group"""
+    groups = list(highlights)
+    pending = set(range(len(groups)))
+    errors = {}
+    pos = 0
+
+    def parse(buffer):
+        nonlocal pos
+        while pending:
+            try:
+                message, pos = unpack(buffer, pos)
+            except Truncated:
+                return None
+            # Notifications Neovim sends meanwhile (type 2) are not ours
+            if isinstance(message, list) and len(message) == 4 and message[0] == 1 and message[1] in pending:
+                pending.discard(message[1])
+                if message[2] is not None:
+                    errors[message[1]] = message[2]
+        return True
+
+    if groups:
+        _exchange(path, nvim_requests(highlights), parse, timeout)
+    if errors:
+        msgid, error = min(errors.items())
+        # Errors are [type, message]
+        text = error[1] if isinstance(error, list) and len(error) > 1 else error
+        raise RuntimeError(f'{groups[msgid]}: {text}')
+    return f'{len(groups)} groups'
+
+
+class LivePush:
+    """Fan theme colors out to every running kitty and Neovim
+
+    kitty_sockets and nvim_sockets replace discovery with fixed socket lists
+    (the fake servers in tests); timeout applies to each instance on its own.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, kitty_sockets=None, nvim_sockets=None):
+        self.timeout = timeout
+        self._kitty_sockets = kitty_sockets
+        self._nvim_sockets = nvim_sockets
+
+    def instances(self):
+        """[(kind, socket path)] of the instances a push would reach"""
+        kitty = kitty_sockets() if self._kitty_sockets is None else self._kitty_sockets
+        nvim = nvim_sockets() if self._nvim_sockets is None else self._nvim_sockets
+        return [('kitty', path) for path in kitty] + [('nvim', path) for path in nvim]
+
+    def _timed(self, push, path, values):
+        start = time.perf_counter()
+        try:
+            ok, detail = True, push(path, values, self.timeout)
+        except (OSError, ValueError, RuntimeError) as e:
+            ok, detail = False, str(e) or type(e).__name__
+        return ok, (time.perf_counter() - start) * 1000, detail
+
+    def push(self, kitty_colors=None, nvim_highlights=None):
+        """Push to every instance concurrently, returning {(kind, path): (ok, ms, detail)}
+
+        A kind whose values are None is skipped.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        jobs = []
+        for kind, path in self.instances():
+            if kind == 'kitty' and kitty_colors is not None:
+                jobs.append((kind, path, kitty_set_colors, kitty_colors))
+            elif kind == 'nvim' and nvim_highlights is not None:
+                jobs.append((kind, path, nvim_set_highlights, nvim_highlights))
+        if not jobs:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs))) as pool:
+            futures = {(kind, path): pool.submit(self._timed, push, path, values) for kind, path, push, values in jobs}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def summarize(results):
+    """One line per kind: 'kitty 2/2, nvim 1/2'"""
+    counts = {}
+    for (kind, _), (ok, _, _) in results.items():
+        done, total = counts.get(kind, (0, 0))
+        counts[kind] = (done + ok, total + 1)
+    return ', '.join(f'{kind} {done}/{total}' for kind, (done, total) in counts.items())
+
+
+class _FakeServer:
+    """Unix socket server in a temporary directory answering each connection on its own thread"""
+
+    name = 'fake.sock'
+
+    def __init__(self, delay=0.0):
+        # Seconds to wait before answering, to exercise timeouts
+        self.delay = delay
+        self.path = None
+        self._tmp = None
+        self._server = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix='live-push-')
+        self.path = os.path.join(self._tmp.name, self.name)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.close()
+        self._tmp.cleanup()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            buffer = b''
+            try:
+                while True:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        return
+                    buffer += chunk
+                    reply, buffer = self.handle(buffer)
+                    if reply:
+                        time.sleep(self.delay)
+                        conn.sendall(reply)
+            except OSError:
+                return
+
+    def handle(self, buffer):
+        """Consume complete requests from buffer, returning (reply bytes, rest of buffer)"""
+        raise NotImplementedError
+
+
+class FakeKitty(_FakeServer):
+    """Stand-in kitty remote-control socket recording every command it receives
+
+        with FakeKitty() as kitty:
+            kitty_set_colors(kitty.path, {'background': '#101010'})
+            kitty.commands[0]['payload']['colors']
+    """
+
+    name = 'kitty-fake'
+
+    def __init__(self, delay=0.0, error=None):
+        super().__init__(delay)
+        # Reply with this error instead of success
+        self.error = error
+        self.commands = []
+
+    def handle(self, buffer):
+        end = buffer.find(KITTY_SUFFIX)
+        if end < 0:
+            return b'', buffer
+        self.commands.append(json.loads(buffer[len(KITTY_PREFIX):end]))
+        reply = {'ok': False, 'error': self.error} if self.error else {'ok': True}
+        return KITTY_PREFIX + json.dumps(reply).encode() + KITTY_SUFFIX, buffer[end + len(KITTY_SUFFIX):]
+
+
+class FakeNeovim(_FakeServer):
+    """Stand-in Neovim RPC socket recording (method, params) of every request
+
+    Requests for groups in reject get an error reply, like Neovim for an invalid
+    attribute. The fake also sends a notification first, as a real editor may.
+    """
+
+    name = 'nvim.fake.0'
+
+    def __init__(self, delay=0.0, reject=()):
+        super().__init__(delay)
+        self.reject = set(reject)
+        self.calls = []
+
+    def handle(self, buffer):
+        replies, pos = [pack([2, 'nvim_buf_lines_event', []])], 0
+        while True:
+            try:
+                message, end = unpack(buffer, pos)
+            except Truncated:
+                break
+            pos = end
+            _, msgid, method, params = message
+            self.calls.append((method, params))
+            group = params[1] if len(params) > 1 else None
+            error = [0, f'Invalid highlight group {group}'] if group in self.reject else None
+            replies.append(pack([1, msgid, error, None]))
+        return (b''.join(replies) if len(replies) > 1 else b''), buffer[pos:]
+
+
+def main():
+    startup_profile.maybe_profile()
+    args = sys.argv[1:]
+    timeout = DEFAULT_TIMEOUT
+    if len(args) > 1 and args[0] == '--timeout':
+        timeout = float(args[1])
+        args = args[2:]
+    if args not in ([], ['list']):
+        print("Usage: live_push.py [--profile-startup] [--timeout SECONDS] [list]", file=sys.stderr)
+        print("  Pushes the last applied theme to running kitty and Neovim instances", file=sys.stderr)
+        sys.exit(1)
+
+    live = LivePush(timeout)
+    startup_profile.mark()
+    if args == ['list']:
+        for kind, path in live.instances():
+            print(f'{kind}\t{path}')
+        return
+
+    from color_processor import CURRENT_THEME_PATH, ColorProcessor
+
+    try:
+        with open(CURRENT_THEME_PATH) as f:
+            roles = json.load(f)['roles']
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Error: no applied theme in {CURRENT_THEME_PATH}: {e}', file=sys.stderr)
+        sys.exit(1)
+    processor = ColorProcessor({})
+    results = live.push(processor.kitty_colors(roles), processor.nvim_highlights(roles))
+    for (kind, path), (ok, ms, detail) in results.items():
+        print(f'{kind:<6} {ms:6.1f} ms  {"ok" if ok else "FAILED"}  {path}  ({detail})', file=sys.stderr)
+    sys.exit(0 if all(ok for ok, _, _ in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
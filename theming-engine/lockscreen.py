@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Blurred lock screen images, rendered with Pillow and cached per wallpaper and resolution
+
+The blur runs on a copy reduced WORK_SCALE times: a Gaussian with sigma/WORK_SCALE
+at that size looks the same as the full-size blur once upscaled, for a fraction of
+the decode, blur and resample work.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+import startup_profile
+from palette_cache import CACHE_ROOT
+
+# Bump whenever the rendering changes
+LOCK_VERSION = 1
+
+DEFAULT_LOCK_DIR = os.path.join(CACHE_ROOT, 'lockscreen')
+DEFAULT_LOCK_IMAGE = os.path.expanduser('~/.cache/betterlockscreen/current/lock_blur.png')
+# Same strength as the previous `convert -blur 0x8` at full resolution
+BLUR_SIGMA = 8
+WORK_SCALE = 4
+# Enough for the current and the prefetched wallpaper plus a few recent ones
+MAX_CACHED_IMAGES = 8
+
+
+def parse_resolution(text):
+    """Parse 'WIDTHxHEIGHT' into (width, height)"""
+    match = re.fullmatch(r'(\d+)x(\d+)', text.strip())
+    if not match or not all(int(v) for v in match.groups()):
+        raise ValueError(f'Invalid resolution: {text}')
+    return int(match.group(1)), int(match.group(2))
+
+
+def _run(command):
+    import subprocess
+
+    return subprocess.run(command, capture_output=True, text=True, timeout=2, check=True).stdout
+
+
+def detect_resolution():
+    """Size of the focused (Hyprland) or primary (X11) monitor, or None if neither answers"""
+    import subprocess
+
+    from reload_orchestrator import hyprland_ipc
+
+    try:
+        ipc = hyprland_ipc()
+        monitors = ipc.monitors() if ipc else json.loads(_run(['hyprctl', 'monitors', '-j']))
+        if monitors:
+            monitor = next((m for m in monitors if m.get('focused')), monitors[0])
+            # Rotated outputs (transform 1, 3, 5, 7) show the mode sideways
+            if monitor.get('transform', 0) % 2:
+                return monitor['height'], monitor['width']
+            return monitor['width'], monitor['height']
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError):
+        pass
+
+    try:
+        outputs = re.findall(r' connected (primary )?(\d+)x(\d+)\+', _run(['xrandr', '--current']))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if not outputs:
+        return None
+    primary = next((o for o in outputs if o[0]), outputs[0])
+    return int(primary[1]), int(primary[2])
+
+
+def render_lock_image(wallpaper_path, size, output_path):
+    """Cover-crop the wallpaper to size, blur it and save it as a PNG"""
+    from PIL import ImageFilter, ImageOps
+
+    from image_loader import open_reduced
+
+    width, height = size
+    work = (max(1, round(width / WORK_SCALE)), max(1, round(height / WORK_SCALE)))
+    img = open_reduced(wallpaper_path, work)
+    # Fill the screen and crop the overflow around the center (like `-resize WxH^ -extent WxH`)
+    img = ImageOps.fit(img, work)
+    img = img.filter(ImageFilter.GaussianBlur(BLUR_SIGMA / WORK_SCALE))
+    img = img.resize((width, height))
+    # Blurred images compress poorly anyway, so favor encoding speed
+    img.save(output_path, 'PNG', compress_level=1)
+
+
+class LockScreen:
+    """Keeps the lock screen image in sync with the applied wallpaper"""
+
+    def __init__(self, output_path=None, resolution=None, cache_dir=None):
+        self.output_path = output_path or DEFAULT_LOCK_IMAGE
+        # None means ask the compositor on every update, monitors come and go
+        self.resolution = resolution
+        self.cache_dir = cache_dir or DEFAULT_LOCK_DIR
+
+    def screen_size(self):
+        return self.resolution or detect_resolution()
+
+    def cache_path(self, wallpaper_path, size):
+        st = os.stat(wallpaper_path)
+        material = f'{LOCK_VERSION}:{os.path.abspath(wallpaper_path)}:{st.st_mtime_ns}:{st.st_size}:{size[0]}x{size[1]}'
+        return os.path.join(self.cache_dir, hashlib.blake2b(material.encode(), digest_size=16).hexdigest() + '.png')
+
+    def render(self, wallpaper_path, size=None):
+        """Return the cached lock image for a wallpaper, rendering it first if needed"""
+        size = size or self.screen_size()
+        if size is None:
+            raise RuntimeError('Could not detect the screen resolution (pass --lock-resolution)')
+        path = self.cache_path(wallpaper_path, size)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            render_lock_image(wallpaper_path, size, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.evict()
+        return path
+
+    def evict(self, keep=MAX_CACHED_IMAGES):
+        """Drop least recently used lock images beyond keep, returning how many were removed"""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.png')]
+            entries.sort(key=os.path.getmtime, reverse=True)
+        except OSError:
+            return 0
+        removed = 0
+        for path in entries[keep:]:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def update(self, wallpaper_path):
+        """Replace the lock screen image with the wallpaper's blurred image"""
+        source = self.render(wallpaper_path)
+        target = os.path.realpath(self.output_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A copy rather than a link: lock screen tools may rewrite their image in place
+        tmp_path = f'{target}.{os.getpid()}.tmp'
+        try:
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+def main():
+    startup_profile.maybe_profile()
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        print("Usage: lockscreen.py [--profile-startup] <wallpaper_path> [WIDTHxHEIGHT] [output_path]", file=sys.stderr)
+        sys.exit(1)
+    try:
+        resolution = parse_resolution(sys.argv[2]) if len(sys.argv) > 2 else None
+        startup_profile.mark()
+        LockScreen(sys.argv[3] if len(sys.argv) > 3 else None, resolution).update(sys.argv[1])
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f'Error updating lock screen: {e}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Persistent on-disk palette cache for the theming engine"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import config_writer
+
+# Bump whenever the extraction pipeline changes in a way that alters palettes
+CACHE_VERSION = 2
+
+# Extraction parameters (besides the quantizer) for themes; the index seeds the cache under the same key
+EXTRACTION_PARAMS = {'n_colors': 5, 'dark_threshold': 30, 'light_threshold': 225}
+
+CACHE_ROOT = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'theming-engine')
+DEFAULT_CACHE_DIR = os.path.join(CACHE_ROOT, 'palettes')
+DEFAULT_MAX_BYTES = int(os.environ.get('THEMING_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+# Eviction trims the cache to this fraction of max_bytes, so it is not rerun on the very next put
+EVICT_TARGET = 0.9
+DIGEST_INDEX_PATH = os.path.join(CACHE_ROOT, 'digests.json')
+MAX_DIGESTS = 4096
+
+# realpath -> [mtime_ns, size, ino, ctime_ns, hash], shared by every lookup in the process
+_digests = None
+_digests_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Hash file contents in chunks so large wallpapers are never fully buffered"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_digests():
+    global _digests
+    if _digests is None:
+        try:
+            with open(DIGEST_INDEX_PATH, 'r') as f:
+                _digests = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _digests = {}
+    return _digests
+
+
+def _save_digests():
+    try:
+        os.makedirs(CACHE_ROOT, exist_ok=True)
+        config_writer.write_atomic(DIGEST_INDEX_PATH, json.dumps(_digests))
+    except OSError as e:
+        print(f'Warning: Could not save wallpaper digests: {e}', file=sys.stderr)
+
+
+def cached_digest(path, st):
+    """Content hash of a file, recomputed only when its stat differs from the last hash"""
+    real = os.path.realpath(path)
+    stamp = [st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns]
+    with _digests_lock:
+        cached = _load_digests().get(real)
+    if cached and cached[:4] == stamp:
+        return cached[4]
+
+    digest = file_digest(real)
+    with _digests_lock:
+        digests = _load_digests()
+        digests.pop(real, None)
+        digests[real] = stamp + [digest]
+        # Oldest first, so the wallpapers hashed longest ago go first
+        for stale in list(digests)[:max(0, len(digests) - MAX_DIGESTS)]:
+            del digests[stale]
+        _save_digests()
+    return digest
+
+
+def describe_source(image_path):
+    """Return identifying information (path, mtime, size, content hash) for a wallpaper file"""
+    st = os.stat(image_path)
+    return {
+        'path': os.path.abspath(image_path),
+        'mtime': st.st_mtime_ns,
+        'size': st.st_size,
+        'hash': cached_digest(image_path, st),
+    }
+
+
+class PaletteCache:
+    """Palette cache keyed by wallpaper content hash, file stat and extraction parameters"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        # Running total of entry sizes, measured on the first put and kept up to date after it
+        self._usage = None
+        self._usage_lock = threading.Lock()
+
+    def describe_source(self, image_path):
+        """Return identifying information for a wallpaper file"""
+        return describe_source(image_path)
+
+    def make_key(self, source, params):
+        """Build the cache key from source identity and extraction parameters"""
+        material = json.dumps({
+            'version': CACHE_VERSION,
+            'hash': source['hash'],
+            'mtime': source['mtime'],
+            'size': source['size'],
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.blake2b(material.encode(), digest_size=16).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _load(self, key):
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get('version') != CACHE_VERSION:
+            return None
+        return entry
+
+    def get(self, image_path, params, source=None):
+        """Return the cached entry for a wallpaper, or None on a miss"""
+        try:
+            source = source or self.describe_source(image_path)
+        except OSError:
+            return None
+        key = self.make_key(source, params)
+        entry = self._load(key)
+        if entry is None:
+            return None
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(self._entry_path(key))
+        except OSError:
+            pass
+        entry['colors'] = [tuple(c) for c in entry['colors']]
+        return entry
+
+    def put(self, image_path, params, colors, derived=None, source=None):
+        """Store extracted colors (and optional derived color sets) for a wallpaper"""
+        try:
+            source = source or self.describe_source(image_path)
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f'Warning: Could not write palette cache: {e}', file=sys.stderr)
+            return None
+
+        key = self.make_key(source, params)
+        entry = {
+            'version': CACHE_VERSION,
+            'source': source,
+            'params': params,
+            'colors': [[int(c) for c in color] for color in colors],
+            'derived': derived or {},
+            'created': time.time(),
+        }
+
+        entry_path = self._entry_path(key)
+        data = json.dumps(entry, separators=(',', ':'))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f'.{key}.', suffix='.tmp')
+        except OSError as e:
+            print(f'Warning: Could not write palette cache: {e}', file=sys.stderr)
+            return None
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            with self._usage_lock:
+                try:
+                    replaced = os.stat(entry_path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, entry_path)
+                self._account(len(data) - replaced)
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            print(f'Warning: Could not write palette cache: {e}', file=sys.stderr)
+            return None
+        return key
+
+    def _account(self, delta):
+        """Track the cache size after a write (under _usage_lock), evicting once it passes max_bytes"""
+        if self._usage is None:
+            self._usage = self.stats()['bytes']
+        else:
+            self._usage += delta
+        if self._usage > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICT_TARGET))
+
+    def _entries(self):
+        """List cache entry files as (path, size, mtime) tuples"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= max_bytes:
+                break
+            if self._remove(path):
+                removed += 1
+            total -= size
+        self._usage = total
+        return removed
+
+    def purge_stale(self):
+        """Remove entries whose wallpaper was deleted or modified since extraction"""
+        removed = 0
+        for path, _, _ in self._entries():
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+                source = entry['source']
+                st = os.stat(source['path'])
+                stale = (entry.get('version') != CACHE_VERSION
+                         or st.st_mtime_ns != source['mtime']
+                         or st.st_size != source['size'])
+            except (OSError, ValueError, KeyError):
+                stale = True
+            if stale and self._remove(path):
+                removed += 1
+        self._usage = None
+        return removed
+
+    def clear(self):
+        """Remove every cache entry"""
+        removed = 0
+        for path, _, _ in self._entries():
+            if self._remove(path):
+                removed += 1
+        self._usage = None
+        return removed
+
+    def stats(self):
+        """Return entry count and total size of the cache"""
+        entries = self._entries()
+        return {
+            'dir': self.cache_dir,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Batch palette pre-indexing for a whole wallpaper directory"""
+
+import json
+import os
+import sys
+import time
+
+import config_writer
+from palette_cache import CACHE_ROOT, CACHE_VERSION, EXTRACTION_PARAMS, PaletteCache
+from quantizers import DEFAULT_QUANTIZER
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+DEFAULT_INDEX_PATH = os.path.join(CACHE_ROOT, 'palette-index.jsonl')
+
+
+def list_wallpapers(wallpaper_dir):
+    """List image files in a wallpaper directory, sorted by name"""
+    return sorted(f for f in os.listdir(wallpaper_dir)
+                  if os.path.isfile(os.path.join(wallpaper_dir, f))
+                  and os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def load_index(index_path=None):
+    """Load index entries keyed by absolute wallpaper path"""
+    entries = {}
+    try:
+        with open(index_path or DEFAULT_INDEX_PATH, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry['path']] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def save_index(entries, index_path=None):
+    """Atomically rewrite the index file as JSON lines"""
+    index_path = index_path or DEFAULT_INDEX_PATH
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    content = ''.join(json.dumps(entries[path], separators=(',', ':')) + '\n' for path in sorted(entries))
+    config_writer.write_atomic(index_path, content)
+
+
+def _init_worker():
+    # Each worker is one process per core, so keep BLAS/OpenMP single threaded. Runs in the
+    # worker before it first imports numpy; the parent's environment is left alone
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = '1'
+
+
+def _extract_worker(image_path, params):
+    """Extract one wallpaper's palette in a worker process"""
+    from color_processor import ColorProcessor
+
+    from PIL import Image
+
+    source = PaletteCache().describe_source(image_path)
+    colors = ColorProcessor({}).extract_palette(image_path, **params)
+    # Reads only the header
+    with Image.open(image_path) as image:
+        size = image.size
+    return source, [list(c) for c in colors], size
+
+
+def _is_current(entry, st, params):
+    return (entry is not None
+            and entry.get('version') == CACHE_VERSION
+            and entry.get('mtime') == st.st_mtime_ns
+            and entry.get('size') == st.st_size
+            and entry.get('params') == params)
+
+
+def build_index(wallpaper_dir, index_path=None, workers=None, params=None, cache=None):
+    """Incrementally (re)index a wallpaper directory, returning (entries, processed, failed)"""
+    params = dict(params or dict(EXTRACTION_PARAMS, quantizer=DEFAULT_QUANTIZER))
+    wallpaper_dir = os.path.abspath(wallpaper_dir)
+    old_entries = load_index(index_path)
+    entries = {}
+    pending = []
+
+    for name in list_wallpapers(wallpaper_dir):
+        path = os.path.join(wallpaper_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entry = old_entries.get(path)
+        if _is_current(entry, st, params):
+            entries[path] = entry
+        else:
+            pending.append(path)
+
+    # Keep entries for other directories sharing the same index file
+    for path, entry in old_entries.items():
+        if os.path.dirname(path) != wallpaper_dir:
+            entries[path] = entry
+
+    failed = []
+    if pending:
+        # Imported here so listing wallpapers stays cheap for the cycler
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as pool:
+            futures = {pool.submit(_extract_worker, path, params): path for path in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    source, colors, (width, height) = future.result()
+                except Exception as e:
+                    print(f'Error indexing {path}: {e}', file=sys.stderr)
+                    failed.append(path)
+                    continue
+                entries[path] = {
+                    'version': CACHE_VERSION,
+                    'path': path,
+                    'mtime': source['mtime'],
+                    'size': source['size'],
+                    'hash': source['hash'],
+                    'params': params,
+                    'colors': colors,
+                    'width': width,
+                    'height': height,
+                    'indexed': time.time(),
+                }
+                # Seed the palette cache so the next apply skips extraction
+                if cache:
+                    cache.put(path, params, colors, source=source)
+
+    save_index(entries, index_path)
+    return entries, len(pending) - len(failed), failed
+
+
+def index_command(args, use_cache=True, quantizer=None):
+    """Handle `color_processor.py index <WALLPAPER_DIR> [--workers N] [--index-file PATH]`"""
+    wallpaper_dir = None
+    workers = None
+    index_path = None
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--workers' and i + 1 < len(args):
+            workers = int(args[i + 1])
+            i += 2
+        elif args[i] == '--index-file' and i + 1 < len(args):
+            index_path = args[i + 1]
+            i += 2
+        elif wallpaper_dir is None:
+            wallpaper_dir = args[i]
+            i += 1
+        else:
+            print(f'Unknown argument: {args[i]}', file=sys.stderr)
+            return 1
+
+    if not wallpaper_dir or not os.path.isdir(wallpaper_dir):
+        print("Usage: color_processor.py index <WALLPAPER_DIR> [--workers N] [--index-file PATH]", file=sys.stderr)
+        return 1
+
+    start = time.time()
+    params = dict(EXTRACTION_PARAMS, quantizer=quantizer or DEFAULT_QUANTIZER)
+    try:
+        entries, processed, failed = build_index(wallpaper_dir, index_path, workers, params,
+                                                 cache=PaletteCache() if use_cache else None)
+    except OSError as e:
+        print(f'Error: Could not index {wallpaper_dir}: {e}', file=sys.stderr)
+        return 1
+
+    # Share hashes, dimensions and palettes with the wallpaper catalog
+    from wallpaper_catalog import WallpaperCatalog
+    try:
+        with WallpaperCatalog(wallpaper_dir) as catalog:
+            catalog.merge_index(entries)
+    except OSError as e:
+        print(f'Warning: Could not update wallpaper catalog: {e}', file=sys.stderr)
+    print(f'Indexed {processed} wallpapers ({len(entries)} total, {len(failed)} failed) '
+          f'in {time.time() - start:.1f}s', file=sys.stderr)
+    # A wallpaper that fails to extract is reported above but is not fatal for the run
+    return 0
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Palette-similarity wallpaper selection backed by an in-memory CIELAB index
+
+NumPy is only imported once a search runs, so sequential and random picks
+through select_wallpaper() start as fast as the catalog itself.
+"""
+
+import heapq
+import os
+import sys
+
+from quantizers import rgb_to_lab
+from wallpaper_catalog import SELECTION_MODES, WallpaperCatalog
+
+SEARCH_MODES = ('similar', 'contrast')
+# Wallpapers shown this recently are skipped so similar picks do not ping-pong
+RECENT_WINDOW = 8
+
+
+def hex_palette_to_rgb(palette):
+    """Convert ['#rrggbb', ...] to a (K, 3) float array"""
+    import numpy as np
+
+    return np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in palette], dtype=np.float64)
+
+
+class PaletteSearchIndex:
+    """Brute-force nearest/furthest palette search over an (N, K, 3) CIELAB matrix
+
+    Palettes are compared with the symmetric Chamfer distance: the mean ΔE from
+    each color to the closest color of the other palette, both ways, so the
+    dominance order of the colors does not matter. Rows live in a preallocated
+    matrix that doubles when full, so adding a wallpaper is amortized O(1) and
+    removing one moves the last row into its slot.
+    """
+
+    def __init__(self, palette_size=5):
+        import numpy as np
+
+        self.palette_size = palette_size
+        self.names = []
+        self._rows = {}
+        self._palettes = {}
+        self._lab = np.empty((64, palette_size, 3))
+        # Squared norms of every row, for the matmul form of the pairwise distances
+        self._norms = np.empty((64, palette_size))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def _to_rgb(self, palette):
+        import numpy as np
+
+        # Repeat colors so palettes of other sizes still fit the matrix
+        return np.resize(hex_palette_to_rgb(palette), (self.palette_size, 3))
+
+    def add(self, name, palette):
+        """Insert or update one wallpaper's palette"""
+        palette = tuple(palette)
+        if self._palettes.get(name) != palette:
+            self._store(name, palette, rgb_to_lab(self._to_rgb(palette)))
+
+    def _store(self, name, palette, lab):
+        import numpy as np
+
+        row = self._rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self._lab):
+                self._lab = np.concatenate([self._lab, np.empty_like(self._lab)])
+                self._norms = np.concatenate([self._norms, np.empty_like(self._norms)])
+            self.names.append(name)
+            self._rows[name] = row
+        self._lab[row] = lab
+        self._norms[row] = (lab ** 2).sum(-1)
+        self._palettes[name] = palette
+
+    def remove(self, name):
+        row = self._rows.pop(name, None)
+        if row is None:
+            return
+        del self._palettes[name]
+        last = self.names.pop()
+        if last != name:
+            self.names[row] = last
+            self._rows[last] = row
+            self._lab[row] = self._lab[len(self.names)]
+            self._norms[row] = self._norms[len(self.names)]
+
+    def sync(self, palettes):
+        """Make the index hold exactly {name: palette}, touching only what changed"""
+        import numpy as np
+
+        for name in [name for name in self._rows if name not in palettes]:
+            self.remove(name)
+        changed = {name: tuple(palette) for name, palette in palettes.items()
+                   if self._palettes.get(name) != tuple(palette)}
+        if not changed:
+            return
+        # One vectorized color conversion for everything new, e.g. a cold start
+        labs = rgb_to_lab(np.stack([self._to_rgb(palette) for palette in changed.values()]))
+        for (name, palette), lab in zip(changed.items(), labs):
+            self._store(name, palette, lab)
+
+    def distances(self, palette):
+        """Chamfer ΔE from palette to every indexed palette, in self.names order"""
+        import numpy as np
+
+        n, k = len(self.names), self.palette_size
+        query = rgb_to_lab(self._to_rgb(palette))
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab for every (row color, query color) pair in one matmul
+        cross = (self._lab[:n].reshape(-1, 3) @ query.T).reshape(n, k, k)
+        dist2 = self._norms[:n, :, None] + (query ** 2).sum(-1)[None, None, :] - 2 * cross
+        dist = np.sqrt(np.maximum(dist2, 0.0))
+        return 0.5 * (dist.min(2).mean(1) + dist.min(1).mean(1))
+
+    def query(self, palette, k=1, furthest=False, exclude=()):
+        """Return up to k (name, distance) pairs nearest to (or furthest from) palette"""
+        import numpy as np
+
+        if not self.names:
+            return []
+        dist = self.distances(palette)
+        key = -dist if furthest else dist.copy()
+        for name in exclude:
+            if name in self._rows:
+                key[self._rows[name]] = np.inf
+        k = min(k, int(np.isfinite(key).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(key, k - 1)[:k]
+        best = best[np.argsort(key[best])]
+        return [(self.names[i], float(dist[i])) for i in best]
+
+
+def catalog_palettes(catalog):
+    """{name: palette} for every cataloged wallpaper with a known palette"""
+    images = catalog.data['images']
+    return {name: images[name]['palette'] for name in catalog.files
+            if 'palette' in images.get(name, {})}
+
+
+def recent_names(catalog, window=RECENT_WINDOW):
+    """Names of the window most recently shown wallpapers"""
+    shown = ((info['last_shown'], name) for name, info in catalog.data['images'].items() if 'last_shown' in info)
+    return {name for _, name in heapq.nlargest(window, shown)}
+
+
+def _choose(catalog, mode, index, processor=None):
+    """Name of the wallpaper a search mode picks next (falls back to plain cycling)"""
+    index.sync(catalog_palettes(catalog))
+    current = catalog.data['current']
+    palette = catalog.data['images'].get(current, {}).get('palette')
+    if current and palette is None and processor is not None:
+        # Current wallpaper was applied without recording its palette; the cache makes this cheap
+        try:
+            colors = processor.extract_dominant_colors_kmeans(os.path.join(catalog.wallpaper_dir, current))
+            catalog.update(current, palette=colors)
+            palette = catalog.data['images'][current]['palette']
+            index.add(current, palette)
+        except Exception as e:
+            print(f'Warning: Could not extract palette of {current}: {e}', file=sys.stderr)
+
+    if palette is not None:
+        recent = recent_names(catalog, min(RECENT_WINDOW, len(index) // 2)) | {current}
+        match = index.query(palette, furthest=(mode == 'contrast'), exclude=recent)
+        if not match:
+            match = index.query(palette, furthest=(mode == 'contrast'), exclude={current})
+        if match:
+            return match[0][0]
+
+    print(f'No palettes to compare for {mode} selection (run --index first), cycling to the next wallpaper',
+          file=sys.stderr)
+    return os.path.basename(catalog.peek('next'))
+
+
+def peek_wallpaper(catalog, mode, index=None, processor=None):
+    """Path select_wallpaper() will pick for any selection or search mode, without moving the cursor"""
+    if mode in SEARCH_MODES:
+        index = PaletteSearchIndex() if index is None else index
+        return os.path.join(catalog.wallpaper_dir, _choose(catalog, mode, index, processor))
+    return catalog.peek(mode)
+
+
+def select_wallpaper(catalog, mode, index=None, processor=None):
+    """Pick a wallpaper by any selection or search mode and move the catalog cursor to it"""
+    if mode in SEARCH_MODES:
+        name = _choose(catalog, mode, PaletteSearchIndex() if index is None else index, processor)
+        catalog.mark_shown(name)
+        return os.path.join(catalog.wallpaper_dir, name)
+    return catalog.select(mode)
+
+
+def select_command(args, use_cache=True, quantizer=None):
+    """Handle `color_processor.py select [--index-file PATH] <wallpaper_dir> <mode>`"""
+    from color_processor import ColorProcessor
+    from palette_cache import PaletteCache
+
+    index_file = os.path.expanduser('~/.wallpaper_index')
+    if len(args) > 1 and args[0] == '--index-file':
+        index_file = args[1]
+        args = args[2:]
+    if len(args) != 2 or not os.path.isdir(args[0]) or args[1] not in SELECTION_MODES + SEARCH_MODES:
+        print("Usage: color_processor.py select [--index-file PATH] <wallpaper_dir> "
+              f"<{'|'.join(SELECTION_MODES + SEARCH_MODES)}>", file=sys.stderr)
+        return 1
+
+    processor = ColorProcessor({}, PaletteCache() if use_cache else None, quantizer)
+    try:
+        with WallpaperCatalog(args[0], index_file=index_file) as catalog:
+            print(select_wallpaper(catalog, args[1], processor=processor))
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Pluggable color quantizer backends for palette extraction
+
+Every quantizer takes an (N, 3) array of RGB pixels and returns a tuple of
+(centers, counts): a (k, 3) float array of palette colors and the number of
+pixels assigned to each. The ColorProcessor orders the palette by count.
+NumPy is imported inside the backends, so looking up names in the registry
+stays cheap for commands that never extract a palette.
+"""
+
+import itertools
+import time
+
+DEFAULT_QUANTIZER = 'kmeans'
+
+
+def _assign(data, centers):
+    """Label each pixel with its nearest center, returning labels and squared distances"""
+    import numpy as np
+
+    dist = ((data ** 2).sum(1)[:, None]
+            - 2.0 * data @ centers.T
+            + (centers ** 2).sum(1)[None, :])
+    labels = dist.argmin(1)
+    return labels, np.maximum(dist[np.arange(len(data)), labels], 0.0)
+
+
+def _cluster_means(data, labels, k):
+    """Per-cluster pixel counts and mean colors (NaN rows for empty clusters)"""
+    import numpy as np
+
+    counts = np.bincount(labels, minlength=k).astype(np.float64)
+    sums = np.stack([np.bincount(labels, weights=data[:, c], minlength=k) for c in range(3)], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts[:, None]
+    return counts, means
+
+
+def _kmeans_plusplus(data, k, rng):
+    """k-means++ seeding: spread initial centers proportionally to squared distance"""
+    import numpy as np
+
+    centers = np.empty((k, 3))
+    centers[0] = data[rng.integers(len(data))]
+    closest = ((data - centers[0]) ** 2).sum(1)
+    for i in range(1, k):
+        total = closest.sum()
+        idx = rng.integers(len(data)) if total == 0 else rng.choice(len(data), p=closest / total)
+        centers[i] = data[idx]
+        closest = np.minimum(closest, ((data - centers[i]) ** 2).sum(1))
+    return centers
+
+
+def kmeans_quantize(data, n_colors, seed=42, n_init=3, batch_size=1024, max_iter=50, tol=0.5):
+    """Mini-batch k-means with k-means++ seeding, polished with full-batch Lloyd steps"""
+    import numpy as np
+
+    data = np.asarray(data, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    best = None
+
+    for _ in range(n_init):
+        centers = _kmeans_plusplus(data, n_colors, rng)
+        seen = np.zeros(n_colors)
+
+        for _ in range(max_iter):
+            batch = data[rng.integers(0, len(data), batch_size)] if len(data) > batch_size else data
+            labels, _ = _assign(batch, centers)
+            batch_counts, batch_means = _cluster_means(batch, labels, n_colors)
+            hit = batch_counts > 0
+            seen[hit] += batch_counts[hit]
+            # Per-center learning rate decays as the center absorbs more samples
+            eta = (batch_counts[hit] / seen[hit])[:, None]
+            previous = centers.copy()
+            centers[hit] = (1.0 - eta) * centers[hit] + eta * batch_means[hit]
+            if np.abs(centers - previous).max() < tol:
+                break
+
+        # A few exact Lloyd iterations are cheap at thumbnail sizes and remove batch noise
+        for _ in range(10):
+            labels, _ = _assign(data, centers)
+            _, means = _cluster_means(data, labels, n_colors)
+            means = np.where(np.isnan(means), centers, means)
+            if np.abs(means - centers).max() < tol:
+                centers = means
+                break
+            centers = means
+
+        labels, dist = _assign(data, centers)
+        inertia = dist.sum()
+        if best is None or inertia < best[0]:
+            best = (inertia, centers, np.bincount(labels, minlength=n_colors))
+
+    return best[1], best[2]
+
+
+def median_cut_quantize(data, n_colors):
+    """Median-cut: repeatedly split the most spread-out box at its median"""
+    import numpy as np
+
+    data = np.asarray(data, dtype=np.float64)
+    boxes = [data]
+
+    while len(boxes) < n_colors:
+        scores = [np.ptp(box, axis=0).max() * len(box) if len(box) > 1 else -1 for box in boxes]
+        target = int(np.argmax(scores))
+        if scores[target] <= 0:
+            break
+        box = boxes.pop(target)
+        channel = int(np.argmax(np.ptp(box, axis=0)))
+        box = box[box[:, channel].argsort(kind='stable')]
+        mid = len(box) // 2
+        boxes.extend([box[:mid], box[mid:]])
+
+    centers = np.array([box.mean(axis=0) for box in boxes])
+    counts = np.array([len(box) for box in boxes])
+    return centers, counts
+
+
+def histogram_quantize(data, n_colors, bits=4, min_distance=32.0, refine_steps=2):
+    """Histogram binning: take the most populated color bins, skipping near-duplicates"""
+    import numpy as np
+
+    data = np.asarray(data, dtype=np.float64)
+    q = data.astype(np.int64) >> (8 - bits)
+    bins = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    counts, means = _cluster_means(data, bins, 1 << (3 * bits))
+
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    chosen = []
+    for threshold in (min_distance, 0.0):
+        for b in order:
+            if len(chosen) >= n_colors:
+                break
+            if any(np.abs(means[b] - means[c]).max() < threshold or b == c for c in chosen):
+                continue
+            chosen.append(b)
+
+    # Reassign every pixel to the chosen bins so counts and means reflect real clusters,
+    # with a couple of Lloyd refinements to pull the bin colors toward true cluster means
+    centers = means[chosen]
+    for _ in range(refine_steps + 1):
+        labels, _ = _assign(data, centers)
+        counts, refined = _cluster_means(data, labels, len(centers))
+        centers = np.where(np.isnan(refined), centers, refined)
+    return centers, counts
+
+
+def sklearn_quantize(data, n_colors):
+    """scikit-learn KMeans (the original backend), if scikit-learn is installed"""
+    import numpy as np
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+    labels = kmeans.fit_predict(data)
+    return kmeans.cluster_centers_, np.bincount(labels, minlength=n_colors)
+
+
+QUANTIZERS = {
+    'kmeans': kmeans_quantize,
+    'median-cut': median_cut_quantize,
+    'histogram': histogram_quantize,
+    'sklearn': sklearn_quantize,
+}
+
+
+def get_quantizer(name):
+    """Look up a quantizer backend by name"""
+    try:
+        return QUANTIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown quantizer '{name}'. Choose from: {', '.join(QUANTIZERS)}")
+
+
+def rgb_to_lab(rgb):
+    """Convert 0-255 sRGB colors (..., 3) to CIELAB under D65"""
+    import numpy as np
+
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = c @ np.array([[0.4124564, 0.2126729, 0.0193339],
+                        [0.3575761, 0.7151522, 0.1191920],
+                        [0.1804375, 0.0721750, 0.9503041]])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def palette_delta_e(palette_a, palette_b):
+    """Mean CIE76 ΔE between two palettes under the best one-to-one color matching"""
+    import numpy as np
+
+    if len(palette_a) > len(palette_b):
+        palette_a, palette_b = palette_b, palette_a
+    lab_a = rgb_to_lab(palette_a)
+    lab_b = rgb_to_lab(palette_b)
+    dist = np.sqrt(((lab_a[:, None, :] - lab_b[None, :, :]) ** 2).sum(-1))
+    n = len(lab_a)
+    if len(lab_b) <= 8:
+        return float(min(np.mean([dist[i, j] for i, j in enumerate(perm)])
+                         for perm in itertools.permutations(range(len(lab_b)), n)))
+    # Greedy matching for large palettes
+    dist = dist.copy()
+    total = []
+    for _ in range(n):
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        total.append(dist[i, j])
+        dist[i, :] = np.inf
+        dist[:, j] = np.inf
+    return float(np.mean(total))
+
+
+def compare_quantizers(data, n_colors, reference, names=None):
+    """Run quantizers on the same pixels, returning {name: (seconds, ΔE vs reference)}"""
+    ref_centers, _ = get_quantizer(reference)(data, n_colors)
+    report = {}
+    for name in names or QUANTIZERS:
+        start = time.perf_counter()
+        try:
+            centers, _ = get_quantizer(name)(data, n_colors)
+        except ImportError:
+            continue
+        elapsed = time.perf_counter() - start
+        report[name] = (elapsed, float(palette_delta_e(ref_centers, centers)))
+    return report
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Reload the desktop after a theme switch, in parallel and without fixed sleeps
+
+Each step (wallpaper, compositor, bar, notifications) runs on its own thread and
+finishes when the thing it reloaded is actually ready: a command replied, a
+process exited or appeared, or a DBus name got an owner. Every wait is bounded
+by a timeout, so a missing or stuck daemon costs at most that long.
+"""
+
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import startup_profile
+
+# Upper bound for any single readiness wait
+READY_TIMEOUT = 2.0
+NOTIFICATIONS_BUS_NAME = 'org.freedesktop.Notifications'
+HYPRLAND_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hyprland-ecosystem')
+
+
+def hyprland_ipc():
+    """Socket client for the running Hyprland (see hypr_ipc.py), or None to fall back to hyprctl"""
+    if HYPRLAND_SCRIPTS_DIR not in sys.path:
+        sys.path.append(HYPRLAND_SCRIPTS_DIR)
+    try:
+        import hypr_ipc
+    except ImportError:
+        return None
+    return hypr_ipc.connect()
+
+
+def wait_for(predicate, timeout=READY_TIMEOUT, interval=0.005):
+    """Poll predicate with a growing interval until it is true, False on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, 0.05)
+
+
+def run(command, timeout=READY_TIMEOUT):
+    """Run a command and return (ok, stdout); a missing binary or timeout is a failure"""
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return False, ''
+    return result.returncode == 0, result.stdout
+
+
+def spawn(command):
+    """Start a daemon detached from this process"""
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def pids_of(name):
+    """PIDs of processes whose command name is exactly name (like `pgrep -x`)"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/comm') as f:
+                if f.read().rstrip('\n') == name[:15]:
+                    pids.append(int(entry))
+        except OSError:
+            pass
+    return pids
+
+
+def _alive(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Zombies of processes we spawned count as gone
+            return f.read().rpartition(')')[2].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def terminate(pids, timeout=READY_TIMEOUT):
+    """SIGTERM pids and wait until they have exited, returning False if some did not"""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    return wait_for(lambda: not any(_alive(pid) for pid in pids), timeout)
+
+
+def bus_name_owned(name):
+    """True/False if the session bus has an owner for name, None if the bus cannot be asked"""
+    if shutil.which('busctl'):
+        ok, out = run(['busctl', '--user', 'call', 'org.freedesktop.DBus', '/org/freedesktop/DBus',
+                       'org.freedesktop.DBus', 'NameHasOwner', 's', name])
+        return out.strip() == 'b true' if ok else None
+    if shutil.which('dbus-send'):
+        ok, out = run(['dbus-send', '--session', '--print-reply', '--dest=org.freedesktop.DBus',
+                       '/org/freedesktop/DBus', 'org.freedesktop.DBus.NameHasOwner', f'string:{name}'])
+        return 'boolean true' in out if ok else None
+    return None
+
+
+def wait_for_notifications(process_name):
+    """Wait until a notification daemon serves DBus (or at least runs, without a bus to ask)"""
+    def ready():
+        owned = bus_name_owned(NOTIFICATIONS_BUS_NAME)
+        return bool(pids_of(process_name)) if owned is None else owned
+    return wait_for(ready)
+
+
+def restart_notifications(process_name):
+    """Replace a notification daemon; the old one must release the bus name first"""
+    if not terminate(pids_of(process_name)):
+        raise RuntimeError(f'old {process_name} did not exit')
+    spawn([process_name])
+    if not wait_for_notifications(process_name):
+        raise RuntimeError(f'{process_name} did not claim {NOTIFICATIONS_BUS_NAME}')
+    return 'restarted'
+
+
+class ReloadOrchestrator:
+    """Runs the reload steps of one window manager concurrently and times them
+
+    changed lists the config targets the theme switch rewrote; None means
+    unknown, in which case everything is reloaded.
+    """
+
+    def __init__(self, wm_type, changed=None, hypr=None):
+        self.wm_type = wm_type
+        if changed is not None and (isinstance(changed, (str, dict)) or
+                                    not all(isinstance(target, str) for target in changed)):
+            raise TypeError(f'changed must be a list of target names, got {changed!r}')
+        self._changed = None if changed is None else set(changed)
+        # Talking to Hyprland's sockets directly saves a hyprctl fork per command
+        self.hypr = hypr if hypr is not None or wm_type != 'hyprland' else hyprland_ipc()
+
+    def changed(self, *targets):
+        return self._changed is None or not self._changed.isdisjoint(targets)
+
+    def steps(self, wallpaper):
+        """{step name: callable} for everything this switch needs reloaded"""
+        steps = {}
+        if self.wm_type == 'hyprland':
+            steps['wallpaper'] = lambda: self.hyprland_wallpaper(wallpaper)
+            if self.changed('hyprland'):
+                steps['hyprland'] = self.hyprland_reload
+            if shutil.which('waybar') and (self.changed('waybar', 'waybar_style') or not pids_of('waybar')):
+                steps['waybar'] = self.waybar_reload
+            if self.changed('mako') or not pids_of('mako'):
+                steps['mako'] = self.mako_reload
+        elif self.wm_type == 'i3':
+            steps['wallpaper'] = lambda: self.i3_wallpaper(wallpaper)
+            if self.changed('i3', 'i3blocks') or not pids_of('i3blocks'):
+                steps['i3'] = self.i3_reload
+            if self.changed('dunst') or not pids_of('dunst'):
+                steps['dunst'] = self.dunst_reload
+        return steps
+
+    def run(self, wallpaper):
+        """Run every step at once; returns {step: (ok, milliseconds, detail)}"""
+        steps = self.steps(wallpaper)
+        if not steps:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+            futures = {name: pool.submit(self._timed, step) for name, step in steps.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def _timed(step):
+        start = time.perf_counter()
+        try:
+            ok, detail = True, step()
+        except Exception as e:
+            ok, detail = False, str(e)
+        return ok, round((time.perf_counter() - start) * 1000, 1), detail
+
+    # Hyprland
+
+    def hyprland_wallpaper(self, wallpaper):
+        # Same preference order as before: swaybg, then hyprpaper, then wpaperd
+        if shutil.which('swaybg'):
+            old = pids_of('swaybg')
+            terminate(pids_of('hyprpaper') + pids_of('wpaperd'))
+            spawn(['swaybg', '-i', wallpaper, '-m', 'fill'])
+            # The new instance covers the output on its own, so the old one can go right away
+            terminate(old)
+            return 'swaybg'
+        if shutil.which('hyprpaper'):
+            return self.hyprpaper_wallpaper(wallpaper)
+        if shutil.which('wpaperd'):
+            terminate(pids_of('swaybg') + pids_of('hyprpaper'))
+            if not pids_of('wpaperd'):
+                spawn(['wpaperd'])
+            return 'wpaperd'
+        raise RuntimeError('no Wayland wallpaper tool found')
+
+    def hyprpaper_wallpaper(self, wallpaper):
+        # Keep the config current so the wallpaper survives a hyprpaper restart
+        conf = os.path.expanduser('~/.config/hypr/hyprpaper.conf')
+        os.makedirs(os.path.dirname(conf), exist_ok=True)
+        with open(conf, 'w') as f:
+            f.write(f'preload = {wallpaper}\nwallpaper = ,{wallpaper}\n')
+        terminate(pids_of('swaybg') + pids_of('wpaperd'))
+
+        if self.hyprpaper_ready():
+            # Swap over IPC instead of restarting: no blank frame, no startup cost
+            for command in (f'preload {wallpaper}', f'wallpaper ,{wallpaper}', 'unload unused'):
+                self.hyprpaper(command)
+            return 'ipc'
+
+        terminate(pids_of('hyprpaper'))
+        spawn(['hyprpaper'])
+        if not wait_for(self.hyprpaper_ready):
+            raise RuntimeError('hyprpaper did not start answering IPC')
+        return 'started'
+
+    def hyprpaper(self, command):
+        if self.hypr:
+            self.hypr.hyprpaper(command)
+            return
+        ok, out = run(['hyprctl', 'hyprpaper', *command.split(' ', 1)])
+        if not ok or out.strip() != 'ok':
+            raise RuntimeError(f'hyprpaper {command} failed: {out.strip()}')
+
+    def hyprpaper_ready(self):
+        if self.hypr:
+            return self.hypr.has_hyprpaper()
+        ok, out = run(['hyprctl', 'hyprpaper', 'listloaded'], timeout=0.5)
+        return ok and "Couldn't" not in out
+
+    def hyprland_reload(self):
+        if self.hypr:
+            self.hypr.reload()
+            return 'reloaded'
+        ok, out = run(['hyprctl', 'reload'])
+        if not ok or out.strip() != 'ok':
+            raise RuntimeError(f'hyprctl reload failed: {out.strip()}')
+        return 'reloaded'
+
+    def waybar_reload(self):
+        pids = pids_of('waybar')
+        if not pids:
+            spawn(['waybar'])
+            return 'started'
+        # waybar reloads config and CSS on SIGUSR2 by itself; nothing downstream waits on it
+        for pid in pids:
+            os.kill(pid, signal.SIGUSR2)
+        return 'signaled'
+
+    def mako_reload(self):
+        if pids_of('mako') and shutil.which('makoctl'):
+            # makoctl returns once mako has re-read its config
+            ok, _ = run(['makoctl', 'reload'])
+            if ok:
+                return 'reloaded'
+        if not shutil.which('mako'):
+            raise RuntimeError('mako not installed')
+        return restart_notifications('mako')
+
+    # i3
+
+    def i3_wallpaper(self, wallpaper):
+        # xwallpaper exits once the root window pixmap is set
+        ok, _ = run(['xwallpaper', '--zoom', wallpaper])
+        if not ok:
+            raise RuntimeError('xwallpaper failed')
+        return 'xwallpaper'
+
+    def i3_reload(self):
+        detail = 'i3 unchanged'
+        if self.changed('i3', 'i3blocks'):
+            # i3blocks must be gone before the reload so i3bar starts it with the new config
+            if self.changed('i3blocks'):
+                terminate(pids_of('i3blocks'))
+            # i3-msg returns after i3 has replied to the reload
+            ok, _ = run(['i3-msg', 'reload'])
+            if not ok:
+                raise RuntimeError('i3-msg reload failed')
+            detail = 'reloaded'
+            if wait_for(lambda: bool(pids_of('i3blocks')), timeout=1.0):
+                return detail
+        if not pids_of('i3blocks'):
+            spawn(['i3blocks'])
+            detail += ', started i3blocks'
+        return detail
+
+    def dunst_reload(self):
+        if pids_of('dunst') and shutil.which('dunstctl'):
+            ok, _ = run(['dunstctl', 'reload'])
+            if ok:
+                return 'reloaded'
+        if not shutil.which('dunst'):
+            raise RuntimeError('dunst not installed')
+        return restart_notifications('dunst')
+
+
+def parse_changed(text):
+    """Target names from --changed: a JSON list, or color_processor's {"changed": [...]} reply; None if neither"""
+    try:
+        changed = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(changed, dict):
+        changed = changed.get('changed')
+    if not isinstance(changed, list) or not all(isinstance(target, str) for target in changed):
+        return None
+    return changed
+
+
+def main():
+    startup_profile.maybe_profile()
+    args = sys.argv[1:]
+    changed = None
+    if len(args) > 1 and args[0] == '--changed':
+        changed = parse_changed(args[1])
+        if changed is None:
+            print(f'Error: --changed expects a JSON list of target names, got {args[1]!r}', file=sys.stderr)
+            sys.exit(1)
+        args = args[2:]
+    if len(args) != 2 or args[0] not in ('hyprland', 'i3'):
+        print("Usage: reload_orchestrator.py [--profile-startup] [--changed JSON_LIST] <hyprland|i3> <wallpaper_path>", file=sys.stderr)
+        sys.exit(1)
+
+    startup_profile.mark()
+    start = time.perf_counter()
+    results = ReloadOrchestrator(args[0], changed).run(args[1])
+    for name, (ok, _, detail) in results.items():
+        if not ok:
+            print(f'Warning: {name} reload failed: {detail}', file=sys.stderr)
+    timings = [f'{name} {ms:.1f} ms ({detail})' for name, (ok, ms, detail) in results.items() if ok]
+    timings.append(f'total {(time.perf_counter() - start) * 1000:.1f} ms')
+    print('Reload timings: ' + ', '.join(timings), file=sys.stderr)
+    sys.exit(0 if all(ok for ok, _, _ in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
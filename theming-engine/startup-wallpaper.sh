@@ -42,8 +42,15 @@ if [ ! -d "$WALLPAPER_DIR" ] || [ -z "$(ls -A "$WALLPAPER_DIR" 2>/dev/null)" ];
     exit 0
 fi
 
-# Get a random wallpaper
-FIRST_WALLPAPER=$(find "$WALLPAPER_DIR" -type f \( -iname "*.jpg" -o -iname "*.jpeg" -o -iname "*.png" -o -iname "*.webp" -o -iname "*.bmp" \) | shuf | head -1)
+# Get a random wallpaper from the catalog (also moves the cycle cursor to it)
+FIRST_WALLPAPER=$(python3 "$SCRIPT_DIR/wallpaper_catalog.py" --index-file "${INDEX_FILE:-$HOME/.wallpaper_index}" "$WALLPAPER_DIR" random)
+
+# Start the theming daemon so later cycles skip Python startup and imports
+"$SCRIPT_DIR/wallpaper-cycler.sh" --serve >/dev/null 2>&1 &
+
+# Refresh the palette index, then the precomputed config bundles, in the background
+# so later cycles skip extraction and rendering (precompute runs even if indexing fails)
+("$SCRIPT_DIR/wallpaper-cycler.sh" --index; "$SCRIPT_DIR/wallpaper-cycler.sh" --precompute) >/dev/null 2>&1 &
 
 if [ -n "$FIRST_WALLPAPER" ]; then
     echo "Loading startup wallpaper: $FIRST_WALLPAPER" >&2
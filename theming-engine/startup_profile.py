@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""`--profile-startup` for the Python entry points: import-time breakdown and time to first useful work
+
+An entry point calls maybe_profile() first thing in main() and mark() once it
+is about to do real work (dispatching a command, sending a request, listening
+on its socket). With --profile-startup on the command line the command runs
+again as a child under `python -X importtime`; its output passes through and a
+report goes to stderr: the slowest imports before the mark, total import time,
+and the time from spawning the interpreter to the mark, checked against a budget
+(STARTUP_BUDGET_MS, default 100 ms). The exit status is the command's own, or 1
+if it succeeded but missed the budget.
+
+Stdlib only and nothing imported up front, so entry points can import it freely.
+"""
+
+import os
+import sys
+import time
+
+FLAG = '--profile-startup'
+# Set in the child: wall-clock time the parent spawned it
+START_ENV = 'STARTUP_PROFILE_START'
+MARKER = 'startup-profile: ready after '
+DEFAULT_BUDGET_MS = 100.0
+TOP_IMPORTS = 15
+
+
+def maybe_profile(argv=None):
+    """Run the command under the profiler and exit if --profile-startup is in argv"""
+    argv = sys.argv if argv is None else argv
+    if FLAG in argv:
+        sys.exit(profile([arg for arg in argv if arg != FLAG]))
+
+
+def mark():
+    """Report reaching first useful work to a profiling parent (no-op otherwise)"""
+    # Popped so commands started from here are not mistaken for the profiled one
+    start = os.environ.pop(START_ENV, None)
+    if start is not None:
+        print(f'{MARKER}{(time.time() - float(start)) * 1000:.1f} ms', file=sys.stderr, flush=True)
+
+
+def parse_importtime(line):
+    """(self µs, cumulative µs, depth, module) for a `-X importtime` line, or None"""
+    fields = line[len('import time:'):].split('|')
+    if len(fields) != 3 or not fields[0].strip().isdigit():
+        return None
+    name = fields[2].rstrip('\n')
+    stripped = name.lstrip(' ')
+    # One leading space, then two more per nesting level
+    return int(fields[0]), int(fields[1]), (len(name) - len(stripped) - 1) // 2, stripped
+
+
+def report(command, before, after, ready_ms, budget_ms, out=sys.stderr):
+    """Print the startup report; returns True if the budget was met"""
+    print(f'Startup profile: {" ".join(command)}', file=out)
+    total = sum(entry[0] for entry in before)
+    print(f'  imports before first useful work: {len(before)} modules, {total / 1000:.1f} ms', file=out)
+    for self_us, cumulative_us, depth, name in sorted(before, key=lambda entry: -entry[1])[:TOP_IMPORTS]:
+        print(f'    {cumulative_us / 1000:7.1f} ms cumulative {self_us / 1000:7.1f} ms self  '
+              f'{"  " * depth}{name}', file=out)
+    if after:
+        print(f'  imported after first useful work: {len(after)} modules, '
+              f'{sum(entry[0] for entry in after) / 1000:.1f} ms', file=out)
+    if ready_ms is None:
+        print('  first useful work: not reached', file=out)
+        return True
+    within = ready_ms <= budget_ms
+    print(f'  time to first useful work: {ready_ms:.1f} ms (budget {budget_ms:.0f} ms: '
+          f'{"ok" if within else "EXCEEDED"})', file=out)
+    return within
+
+
+def profile(argv):
+    """Run argv (script and arguments) in a child interpreter with -X importtime, returning its exit status"""
+    import subprocess
+
+    budget_ms = float(os.environ.get('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS))
+    command = [sys.executable, '-X', 'importtime', *argv]
+    env = dict(os.environ, **{START_ENV: repr(time.time())})
+    child = subprocess.Popen(command, stderr=subprocess.PIPE, env=env, text=True, errors='replace')
+
+    before, after, ready_ms, reported = [], [], None, False
+    within = True
+    # Relay the child's own stderr while collecting the importtime lines
+    for line in child.stderr:
+        if line.startswith('import time:'):
+            entry = parse_importtime(line)
+            # None for the column header
+            if entry is not None:
+                (before if ready_ms is None else after).append(entry)
+        elif ready_ms is None and line.startswith(MARKER):
+            ready_ms = float(line[len(MARKER):].split()[0])
+            # Long-running commands (servers) report as soon as they are up
+            within = report(argv, before, (), ready_ms, budget_ms)
+            reported = True
+        else:
+            sys.stderr.write(line)
+    status = child.wait()
+
+    if not reported:
+        within = report(argv, before, after, ready_ms, budget_ms)
+    elif after:
+        print(f'Startup profile: {len(after)} modules ({sum(entry[0] for entry in after) / 1000:.1f} ms) '
+              'imported after first useful work', file=sys.stderr)
+    return status if status or within else 1
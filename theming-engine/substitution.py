@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Precompiled multi-key regex substitution for config rewriting"""
+
+import os
+import re
+
+_QUANTIFIERS = '?*+{'
+
+
+def literal_prefix(pattern):
+    """Leading characters every match of a regex pattern must start with"""
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            literal, width = pattern[i + 1], 2
+        elif c.isalnum() or c in ' -_@#"\'=,;:/<>!%&~`':
+            literal, width = c, 1
+        else:
+            break
+        # A quantified character is optional or repeated, so the prefix ends before it
+        if i + width < len(pattern) and pattern[i + width] in _QUANTIFIERS:
+            break
+        prefix.append(literal)
+        i += width
+    return ''.join(prefix)
+
+
+class MultiSubstitution:
+    """Rewrite several key patterns of one config file with patterns compiled once
+
+    When every pattern starts with the same literal text (waybar's
+    `@define-color`, Hyprland's `col.`) the patterns are combined into one
+    alternation and the file is rewritten in a single pass; longer keys are
+    tried first. Without a shared prefix the re module can no longer skip
+    ahead with a literal search and an alternation scan is slower than one
+    precompiled pass per key, so the keys are applied in rule order instead.
+
+    Patterns are compiled on first use, so modules can declare substitutions
+    at import time without paying for them in commands that never rewrite.
+    """
+
+    def __init__(self, rules, flags=0):
+        # rules: {key: pattern}
+        prefix = os.path.commonprefix([literal_prefix(pattern) for pattern in rules.values()])
+        self.single_pass = len(rules) > 1 and bool(prefix)
+        self.keys = sorted(rules, key=len, reverse=True) if self.single_pass else list(rules)
+        self._rules = rules
+        self._flags = flags
+        self._compiled = None
+
+    def _compile(self):
+        """(per-key patterns, combined regex or None), compiled once"""
+        if self._compiled is None:
+            patterns = [(key, re.compile(self._rules[key], self._flags)) for key in self.keys]
+            regex = None
+            if self.single_pass:
+                # Non-capturing groups only; capturing groups would disable the prefix search too
+                regex = re.compile('|'.join(f'(?:{self._rules[key]})' for key in self.keys), self._flags)
+            # Assigned in one step; threads racing here just compile the same patterns twice
+            self._compiled = (patterns, regex)
+        return self._compiled
+
+    @property
+    def regex(self):
+        return self._compile()[1]
+
+    def _key_at(self, text, pos):
+        """Key of the alternative the combined regex took at pos (the first that matches)"""
+        for key, pattern in self._compile()[0]:
+            if pattern.match(text, pos):
+                return key
+        raise AssertionError('combined match without a matching key')
+
+    def apply(self, text, values):
+        """Replace every match with values[key], returning (text, {key: match count})
+
+        Values are inserted literally (no backslash or group expansion).
+        """
+        counts = dict.fromkeys(self.keys, 0)
+        patterns, regex = self._compile()
+
+        if not self.single_pass:
+            for key, pattern in patterns:
+                value = values[key]
+                text, counts[key] = pattern.subn(lambda match: value, text)
+            return text, counts
+
+        def replace(match):
+            key = self._key_at(match.string, match.start())
+            counts[key] += 1
+            return values[key]
+
+        return regex.sub(replace, text), counts
+
+    @staticmethod
+    def unmatched(counts):
+        """Keys from an apply() result that matched nothing"""
+        return [key for key, count in counts.items() if count == 0]
+
+
+class SectionSubstitution:
+    """A MultiSubstitution applied only inside the named `[section]`s of an INI-style file
+
+    Lines before the first header and in other sections are left alone, so
+    masks can cover exactly the sections a renderer themes.
+    """
+
+    HEADER = re.compile(r'^\[([^\]\n]*)\]$', re.MULTILINE)
+
+    def __init__(self, sections, rules, flags=0):
+        self.sections = frozenset(sections)
+        self.substitution = MultiSubstitution(rules, flags)
+        self.keys = self.substitution.keys
+
+    def apply(self, text, values):
+        """Replace matches in the listed sections with values[key], returning (text, {key: match count})"""
+        counts = dict.fromkeys(self.keys, 0)
+        parts = []
+        # Each chunk runs from one header (or the start) to the next
+        starts = [0] + [match.start() for match in self.HEADER.finditer(text)]
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            chunk = text[start:end]
+            header = self.HEADER.match(chunk)
+            if header and header.group(1) in self.sections:
+                chunk, chunk_counts = self.substitution.apply(chunk, values)
+                for key, count in chunk_counts.items():
+                    counts[key] += count
+            parts.append(chunk)
+        return ''.join(parts), counts
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Theme: every named color role derived from one wallpaper palette
+
+Roles are computed lazily on first access and memoized, so a role shared by
+several targets (the terminal background, the most vibrant accent, ...) is
+derived once per palette. A fully resolved theme is plain JSON and can be
+cached alongside the palette or diffed against the previous wallpaper's.
+"""
+
+import colorsys
+
+# Bump whenever a role definition changes so cached themes are re-derived
+THEME_VERSION = 1
+
+
+def most_vibrant(colors):
+    """Pick the most saturated-and-bright color of a palette"""
+    best = colors[0]
+    max_vibrancy = 0
+    for r, g, b in colors:
+        color_range = max(r, g, b) - min(r, g, b)
+        brightness = (r + g + b) / 3
+        vibrancy = color_range * (brightness / 255.0)
+        if vibrancy > max_vibrancy:
+            max_vibrancy = vibrancy
+            best = (r, g, b)
+    return best
+
+
+def _gradient(t):
+    """12-step status bar gradient fanned out from the dominant color"""
+    base_h, base_l, base_s = colorsys.rgb_to_hls(*[c/255.0 for c in t.colors[0]])
+    gradient = []
+    for i in range(12):
+        hue_shift = (i * 30) % 360 / 360.0
+        new_h = (base_h + hue_shift * 0.3) % 1.0
+        new_l = 0.4 + (0.4 * (i / 11.0))
+        new_s = min(base_s * 1.4, 0.9)
+        r, g, b = colorsys.hls_to_rgb(new_h, new_l, new_s)
+        gradient.append(t.hex((int(r*255), int(g*255), int(b*255))))
+    return gradient
+
+
+def _keyboard_primary(t):
+    """Dominant color with boosted saturation so it reads on keyboard LEDs"""
+    h, l, s = colorsys.rgb_to_hls(*[c/255.0 for c in t.colors[0]])
+    r, g, b = colorsys.hls_to_rgb(h, max(l * 0.8, 0.25), min(s * 1.8, 1.0))
+    return t.hex((int(r*255), int(g*255), int(b*255)))
+
+
+def _keyboard_logo(t):
+    secondary = t.hex(t.colors[1]) if len(t.colors) > 1 else t.adjust(t['base'], 0.7)
+    return t.at_least(t.adjust(secondary, 0.6), 0.25)
+
+
+# Role name -> derivation. Roles may reference other roles through t[name].
+THEME_ROLES = {
+    # Palette anchors
+    'base': lambda t: t.hex(t.colors[0]),
+    'secondary': lambda t: t.hex(t.colors[1]) if len(t.colors) > 1 else t.adjust(t['base'], 0.8),
+    'tertiary': lambda t: t.hex(t.colors[2]) if len(t.colors) > 2 else t.adjust(t['base'], 0.6),
+    'vibrant': lambda t: t.hex(most_vibrant(t.colors)),
+
+    # Window borders (i3, Hyprland)
+    'primary': lambda t: t.at_least(t['vibrant'], 0.25),
+    'primary_inactive': lambda t: t.adjust(t['primary'], 0.7),
+    'primary_unfocused': lambda t: t.adjust(t['primary'], 0.4),
+    'primary_placeholder': lambda t: t.adjust(t['primary'], 0.2),
+    'focused_text': lambda t: t.text_on(t['primary'], 3.5),
+    'inactive_text': lambda t: t.text_on(t['primary_inactive'], 2.5),
+    'unfocused_text': lambda t: t.text_on(t['primary_unfocused'], 2.0),
+    'placeholder_text': lambda t: t.text_on(t['primary_placeholder'], 1.8),
+
+    # i3bar
+    'bar_bg': lambda t: t.at_least(t.adjust(t['primary'], 0.15), 0.1),
+    'bar_text': lambda t: t.text_on(t['bar_bg'], 3.0),
+    'bar_separator': lambda t: t.adjust(t['primary'], 0.3),
+    'workspace_focused_text': lambda t: t.text_on(t['primary'], 3.0),
+    'workspace_active_text': lambda t: t.text_on(t['primary_inactive'], 3.0),
+    'workspace_inactive_text': lambda t: t.text_on(t['primary_unfocused'], 2.5),
+    'bar_gradient': _gradient,
+
+    # Terminal and editor
+    'bg': lambda t: t.at_least(t.adjust(t['base'], 0.08), 0.05),
+    'fg_on_bg': lambda t: t.text_on(t['bg'], 3.0, accents=t.colors[1:3]),
+    'editor_fg': lambda t: t.text_on(t['bg'], 3.0),
+    'selection_bg': lambda t: t.at_least(t.adjust(t['base'], 0.3), 0.2),
+    'selection_fg': lambda t: t.text_on(t['selection_bg'], 3.0),
+    'cursor': lambda t: t.at_least(t.adjust(t['base'], 0.7), 0.4),
+    'cursor_line_bg': lambda t: t.adjust(t['bg'], 1.5),
+    'line_nr_fg': lambda t: t.adjust(t['base'], 0.4),
+    'search_fg': lambda t: t.text_on(t['base'], 4.0, prefer_color=False),
+    'inc_search_fg': lambda t: t.text_on(t['secondary'], 4.0, prefer_color=False),
+    'status_line_bg': lambda t: t.adjust(t['base'], 0.2),
+    'status_line_fg': lambda t: t.text_on(t['status_line_bg'], 3.0),
+    'status_line_nc_bg': lambda t: t.adjust(t['bg'], 1.2),
+    'comment_fg': lambda t: t.adjust(t['base'], 0.5),
+    'keyword_fg': lambda t: t.adjust(t['secondary'], 1.2),
+    'type_fg': lambda t: t.adjust(t['tertiary'], 1.1),
+
+    # Notifications (dunst, mako)
+    'notification_bg': lambda t: t.at_least(t.adjust(t['base'], 0.15), 0.1),
+    'notification_fg': lambda t: t.text_on(t['notification_bg'], 3.5),
+    'notification_border': lambda t: t.at_least(t.adjust(t['secondary'], 0.6), 0.3),
+
+    # Waybar
+    'panel_primary': lambda t: t.at_least(t['base'], 0.3),
+    'panel_bg': lambda t: t.at_least(t.adjust(t['panel_primary'], 0.1), 0.05),
+    'panel_module_bg': lambda t: t.at_least(t.adjust(t['panel_bg'], 2.0), 0.08),
+    'panel_text': lambda t: t.text_on(t['panel_bg'], 3.0),
+    'panel_text_dim': lambda t: t.adjust(t['panel_text'], 0.6),
+    'accent': lambda t: t.at_least(t['vibrant'], 0.3),
+    'accent_border': lambda t: t.at_least(t.adjust(t['accent'], 0.8), 0.25),
+
+    # Razer keyboard
+    'keyboard_primary': _keyboard_primary,
+    'keyboard_logo': _keyboard_logo,
+}
+
+
+class Theme:
+    """Lazily derived, memoized color roles for one palette"""
+
+    def __init__(self, processor, colors, roles=None):
+        self.processor = processor
+        self.colors = [tuple(int(c) for c in color) for color in colors]
+        self._roles = dict(roles or {})
+        self._memo = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._roles[name]
+        except KeyError:
+            pass
+        value = THEME_ROLES[name](self)
+        self._roles[name] = value
+        return value
+
+    def _memoized(self, key, compute):
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = compute()
+            return value
+
+    def hex(self, rgb):
+        return self.processor.rgb_to_hex(*rgb)
+
+    def adjust(self, hex_color, factor):
+        """Memoized ColorProcessor.adjust_brightness"""
+        return self._memoized(('adjust', hex_color, factor),
+                              lambda: self.processor.adjust_brightness(hex_color, factor))
+
+    def at_least(self, hex_color, min_brightness):
+        """Memoized ColorProcessor.ensure_minimum_brightness"""
+        return self._memoized(('at_least', hex_color, min_brightness),
+                              lambda: self.processor.ensure_minimum_brightness(hex_color, min_brightness))
+
+    def text_on(self, bg_color, min_contrast, prefer_color=True, accents=None):
+        """Memoized readable text color for a background, using the palette as accents"""
+        accents = self.colors if accents is None else [tuple(a) for a in accents]
+        key = ('text_on', bg_color, min_contrast, prefer_color, tuple(accents))
+        return self._memoized(key, lambda: self.processor.create_readable_text_color(
+            bg_color, accents, min_contrast, prefer_color=prefer_color))
+
+    def resolve(self):
+        """Derive every role and return them as a dict"""
+        return {name: self[name] for name in THEME_ROLES}
+
+    def to_dict(self):
+        return {
+            'version': THEME_VERSION,
+            'colors': [list(color) for color in self.colors],
+            'roles': self.resolve(),
+        }
+
+    @classmethod
+    def from_dict(cls, processor, data):
+        """Rebuild a theme from to_dict() output, ignoring roles from another THEME_VERSION"""
+        roles = data.get('roles') if data.get('version') == THEME_VERSION else None
+        return cls(processor, data['colors'], roles)
+
+    def diff(self, other):
+        """Return {role: (ours, theirs)} for every role that differs from another theme"""
+        theirs = other.resolve() if other is not None else {}
+        return {name: (value, theirs.get(name)) for name, value in self.resolve().items()
+                if theirs.get(name) != value}
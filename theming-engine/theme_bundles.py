@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Precomputed per-wallpaper config bundles, so applying a theme is a file swap
+
+A bundle holds the exact rendered content of every target for one wallpaper,
+plus the resolved theme. Each rendered file was derived from the live config
+at precompute time; the live config's template fingerprint (its content with
+every themed region masked out) is recorded next to it, so editing anything
+outside the themed regions automatically invalidates the bundle for that target.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+
+import config_writer
+from palette_cache import CACHE_ROOT, describe_source
+from theme import THEME_VERSION
+
+# Bump whenever the bundle layout changes
+BUNDLE_VERSION = 1
+
+DEFAULT_BUNDLE_DIR = os.path.join(CACHE_ROOT, 'bundles', f'v{BUNDLE_VERSION}')
+MANIFEST_NAME = 'manifest.json'
+
+
+def template_fingerprint(substitution, text):
+    """Hash of a config with every region the substitution rewrites masked out"""
+    masked, _ = substitution.apply(text, {key: f'\0{key}\0' for key in substitution.keys})
+    return hashlib.blake2b(masked.encode(), digest_size=16).hexdigest()
+
+
+class Bundle:
+    """A wallpaper's bundle, with the targets that are still valid for the live configs"""
+
+    def __init__(self, path, manifest, valid, fingerprints):
+        self.path = path
+        self.theme = manifest['theme']
+        self.valid = valid
+        self.fingerprints = fingerprints
+
+    def file(self, target):
+        return os.path.join(self.path, target)
+
+
+class BundleStore:
+    """On-disk store of precomputed bundles keyed by wallpaper and extraction parameters"""
+
+    def __init__(self, bundle_dir=None):
+        self.bundle_dir = bundle_dir or DEFAULT_BUNDLE_DIR
+        self._fingerprint_path = os.path.join(self.bundle_dir, 'fingerprints.json')
+        self._fingerprints = None
+
+    def bundle_key(self, source, params):
+        material = json.dumps({
+            'hash': source['hash'],
+            'mtime': source['mtime'],
+            'size': source['size'],
+            'params': params,
+            'theme': THEME_VERSION,
+        }, sort_keys=True)
+        return hashlib.blake2b(material.encode(), digest_size=16).hexdigest()
+
+    def _load_fingerprints(self):
+        if self._fingerprints is None:
+            try:
+                with open(self._fingerprint_path, 'r') as f:
+                    self._fingerprints = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._fingerprints = {}
+        return self._fingerprints
+
+    def fingerprint(self, config_path, substitution):
+        """Template fingerprint of a live config, recomputed only when its stat changes"""
+        real = os.path.realpath(config_path)
+        st = os.stat(real)
+        stamp = [st.st_mtime_ns, st.st_size, st.st_ino]
+        fingerprints = self._load_fingerprints()
+        cached = fingerprints.get(real)
+        if cached and cached[:3] == stamp:
+            return cached[3]
+        with open(real, 'r') as f:
+            fp = template_fingerprint(substitution, f.read())
+        fingerprints[real] = stamp + [fp]
+        return fp
+
+    def remember(self, config_paths, fingerprints):
+        """Record fingerprints for configs just replaced from a bundle or a fresh render"""
+        stored = self._load_fingerprints()
+        for name, config_path in config_paths.items():
+            if name not in fingerprints:
+                continue
+            real = os.path.realpath(config_path)
+            try:
+                st = os.stat(real)
+            except FileNotFoundError:
+                continue
+            stored[real] = [st.st_mtime_ns, st.st_size, st.st_ino, fingerprints[name]]
+        self.save_fingerprints()
+
+    def save_fingerprints(self):
+        try:
+            os.makedirs(self.bundle_dir, exist_ok=True)
+            config_writer.write_atomic(self._fingerprint_path, json.dumps(self._load_fingerprints()))
+        except OSError as e:
+            print(f'Warning: Could not save bundle fingerprints: {e}', file=sys.stderr)
+
+    def _load_manifest(self, bundle_path):
+        try:
+            with open(os.path.join(bundle_path, MANIFEST_NAME), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _current_fingerprints(self, targets, masks):
+        fingerprints = {}
+        for name, config_path in targets.items():
+            if name not in masks:
+                continue
+            try:
+                fingerprints[name] = self.fingerprint(config_path, masks[name])
+            except (OSError, UnicodeDecodeError):
+                continue
+        return fingerprints
+
+    def _valid_targets(self, manifest, targets, fingerprints):
+        valid = set()
+        for name, config_path in targets.items():
+            entry = manifest['targets'].get(name)
+            if (entry and name in fingerprints
+                    and entry['path'] == os.path.realpath(config_path)
+                    and entry['fingerprint'] == fingerprints[name]):
+                valid.add(name)
+        return valid
+
+    def open(self, wallpaper_path, params, targets, masks):
+        """Return the wallpaper's Bundle if it covers at least one target, else None"""
+        try:
+            source = describe_source(wallpaper_path)
+        except OSError:
+            return None
+        bundle_path = os.path.join(self.bundle_dir, self.bundle_key(source, params))
+        manifest = self._load_manifest(bundle_path)
+        if manifest is None:
+            return None
+
+        fingerprints = self._current_fingerprints(targets, masks)
+        valid = self._valid_targets(manifest, targets, fingerprints)
+        if not valid:
+            return None
+        return Bundle(bundle_path, manifest, valid, fingerprints)
+
+    def precompute(self, processor, wallpaper_path, targets, masks):
+        """Render every target for a wallpaper into its bundle; returns (key, rebuilt)"""
+        from color_processor import TARGET_RENDERERS
+
+        params = processor.extraction_params()
+        source = describe_source(wallpaper_path)
+        key = self.bundle_key(source, params)
+        bundle_path = os.path.join(self.bundle_dir, key)
+
+        fingerprints = self._current_fingerprints(targets, masks)
+        manifest = self._load_manifest(bundle_path)
+        if manifest and self._valid_targets(manifest, targets, fingerprints) == set(fingerprints):
+            return key, False
+
+        # A fallback theme must not be frozen into a bundle, so extraction errors propagate
+        theme = processor.extract_theme(wallpaper_path, fallback=False)
+        tmp_path = f'{bundle_path}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        manifest = {
+            'version': BUNDLE_VERSION,
+            'wallpaper': source['path'],
+            'params': params,
+            'theme': theme.to_dict(),
+            'targets': {},
+            'created': time.time(),
+        }
+        for name, config_path in targets.items():
+            if name not in fingerprints:
+                continue
+            # Renderers narrate every change; that is noise when rendering ahead of time
+            with contextlib.redirect_stderr(io.StringIO()):
+                content = getattr(processor, TARGET_RENDERERS[name])(config_path, theme)
+            if content is None:
+                continue
+            with open(os.path.join(tmp_path, name), 'w') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(os.path.realpath(config_path), os.path.join(tmp_path, name))
+            manifest['targets'][name] = {'path': os.path.realpath(config_path), 'fingerprint': fingerprints[name]}
+
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+
+        # Swap the whole directory; an apply racing with this falls back to rendering
+        shutil.rmtree(bundle_path, ignore_errors=True)
+        os.replace(tmp_path, bundle_path)
+        return key, True
+
+    def prune(self, keep):
+        """Remove bundles whose key is not in keep, returning how many were removed"""
+        removed = 0
+        try:
+            names = os.listdir(self.bundle_dir)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(self.bundle_dir, name)
+            if name in keep or not os.path.isdir(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Remove every bundle and the fingerprint cache"""
+        removed = self.prune(set())
+        self._fingerprints = {}
+        try:
+            os.remove(self._fingerprint_path)
+        except FileNotFoundError:
+            pass
+        return removed
+
+
+def precompute_command(args, use_cache=True, quantizer=None):
+    """Handle `color_processor.py precompute <wallpaper_dir> <wm_type> [config_paths...]`"""
+    from color_processor import ColorProcessor, TARGET_TEMPLATE_MASKS, parse_config_paths
+    from palette_cache import PaletteCache
+    from palette_index import list_wallpapers
+
+    if len(args) < 2 or not os.path.isdir(args[0]):
+        print("Usage: color_processor.py precompute <wallpaper_dir> <wm_type> [config_paths...]", file=sys.stderr)
+        return 1
+    wallpaper_dir = args[0]
+    config_paths = parse_config_paths(args[1:])
+    if config_paths is None:
+        return 1
+
+    targets = {name: path for name, path in config_paths.items() if path and os.path.exists(path)}
+    processor = ColorProcessor(config_paths, PaletteCache() if use_cache else None, quantizer)
+    store = BundleStore()
+
+    start = time.time()
+    keep, rebuilt, failed = set(), 0, 0
+    for name in list_wallpapers(wallpaper_dir):
+        try:
+            key, built = store.precompute(processor, os.path.join(wallpaper_dir, name), targets, TARGET_TEMPLATE_MASKS)
+        except Exception as e:
+            print(f'Error precomputing {name}: {e}', file=sys.stderr)
+            failed += 1
+            continue
+        keep.add(key)
+        rebuilt += built
+    store.save_fingerprints()
+    pruned = store.prune(keep)
+
+    print(f'Precomputed {rebuilt} bundles ({len(keep)} current, {pruned} pruned, {failed} failed) '
+          f'in {time.time() - start:.1f}s', file=sys.stderr)
+    return 1 if failed else 0
+
+
+def prefetch_command(args, use_cache=True, quantizer=None, lockscreen=None):
+    """Handle `color_processor.py prefetch [--index-file PATH] [--mode MODE] <wallpaper_dir> <wm_type> [config_paths...]`
+
+    Builds the bundle (and with it the cached palette and theme) and the blurred lock
+    image for the wallpaper the cycler will pick next, then prints that wallpaper's path.
+    """
+    from color_processor import ColorProcessor, TARGET_TEMPLATE_MASKS, parse_config_paths
+    from palette_cache import PaletteCache
+    from palette_search import SEARCH_MODES, peek_wallpaper
+    from wallpaper_catalog import SELECTION_MODES, WallpaperCatalog
+
+    index_file = os.path.expanduser('~/.wallpaper_index')
+    mode = 'next'
+    while len(args) > 1 and args[0] in ('--index-file', '--mode'):
+        if args[0] == '--index-file':
+            index_file = args[1]
+        else:
+            mode = args[1]
+        args = args[2:]
+    if len(args) < 2 or not os.path.isdir(args[0]) or mode not in SELECTION_MODES + SEARCH_MODES:
+        print("Usage: color_processor.py prefetch [--index-file PATH] [--mode MODE] "
+              "<wallpaper_dir> <wm_type> [config_paths...]", file=sys.stderr)
+        return 1
+    config_paths = parse_config_paths(args[1:])
+    if config_paths is None:
+        return 1
+
+    processor = ColorProcessor(config_paths, PaletteCache() if use_cache else None, quantizer)
+    try:
+        with WallpaperCatalog(args[0], index_file=index_file) as catalog:
+            wallpaper = peek_wallpaper(catalog, mode, processor=processor)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    if not use_cache:
+        # Nothing computed here would survive for the next apply to use
+        print(wallpaper)
+        return 0
+
+    targets = {name: path for name, path in config_paths.items() if path and os.path.exists(path)}
+    store = BundleStore()
+
+    start = time.time()
+    try:
+        _, built = store.precompute(processor, wallpaper, targets, TARGET_TEMPLATE_MASKS)
+    except Exception as e:
+        print(f'Error prefetching {wallpaper}: {e}', file=sys.stderr)
+        return 1
+    store.save_fingerprints()
+    if lockscreen:
+        try:
+            lockscreen.render(wallpaper)
+        except (OSError, RuntimeError) as e:
+            print(f'Warning: Could not prefetch lock screen image: {e}', file=sys.stderr)
+
+    state = 'prefetched' if built else 'already current'
+    print(f'Next wallpaper {os.path.basename(wallpaper)} {state} in {time.time() - start:.2f}s', file=sys.stderr)
+    print(wallpaper)
+    return 0
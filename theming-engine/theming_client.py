@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Thin client for the theming daemon (stdlib only, so it starts fast)
+
+Exit codes: 0 on success, 1 if the request failed (including a timeout or a bad
+reply after connecting), 2 if no daemon is listening.
+"""
+
+import json
+import os
+import socket
+import sys
+
+import startup_profile
+
+EXIT_UNAVAILABLE = 2
+
+
+def default_socket_path():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', f'/run/user/{os.getuid()}')
+    return os.path.join(runtime_dir, 'theming.sock')
+
+
+def request(line, socket_path=None, timeout=60.0):
+    """Send one request line and return the decoded response, or None if unavailable"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError:
+        sock.close()
+        return None
+
+    try:
+        sock.sendall((line.strip() + '\n').encode())
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith(b'\n'):
+                break
+    finally:
+        sock.close()
+    return json.loads(b''.join(chunks).decode())
+
+
+def main():
+    startup_profile.maybe_profile()
+    args = sys.argv[1:]
+    socket_path = None
+    field = None
+
+    while args and args[0].startswith('--'):
+        if args[0] == '--socket' and len(args) > 1:
+            socket_path = args[1]
+            args = args[2:]
+        elif args[0] == '--field' and len(args) > 1:
+            field = args[1]
+            args = args[2:]
+        else:
+            break
+
+    if not args or args[0] not in ('apply', 'next', 'select', 'dry-run', 'status'):
+        print("Usage: theming_client.py [--profile-startup] [--socket PATH] [--field NAME] <apply PATH|next [MODE]|select [MODE]|dry-run PATH|status>", file=sys.stderr)
+        sys.exit(1)
+
+    startup_profile.mark()
+    try:
+        response = request(' '.join(args), socket_path)
+    except (OSError, ValueError) as e:
+        # The daemon accepted the request, so it may still be applying it; not "unavailable"
+        print(f'Error talking to theming daemon: {e}', file=sys.stderr)
+        sys.exit(1)
+    if response is None:
+        sys.exit(EXIT_UNAVAILABLE)
+
+    if not response.get('ok'):
+        print(f"Theming daemon error: {response.get('error', 'request failed')}", file=sys.stderr)
+    if field:
+        if field in response:
+            value = response[field]
+            print(value if isinstance(value, str) else json.dumps(value))
+    else:
+        print(json.dumps(response))
+    sys.exit(0 if response.get('ok') else 1)
+
+
+if __name__ == '__main__':
+    main()
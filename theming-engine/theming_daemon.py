@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Long-running theming daemon that keeps the color pipeline imported between switches"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import startup_profile
+from color_processor import ColorProcessor, parse_config_paths
+from palette_cache import PaletteCache
+from palette_search import SEARCH_MODES, PaletteSearchIndex, select_wallpaper
+from quantizers import DEFAULT_QUANTIZER
+from theme_bundles import BundleStore
+from wallpaper_catalog import SELECTION_MODES, WallpaperCatalog
+
+
+def default_socket_path():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', f'/run/user/{os.getuid()}')
+    return os.path.join(runtime_dir, 'theming.sock')
+
+
+class ThemingDaemon:
+    """Request dispatcher shared by every client connection"""
+
+    def __init__(self, processor, wm_type, wallpaper_dir=None, index_file=None):
+        self.processor = processor
+        self.wm_type = wm_type
+        self.wallpaper_dir = wallpaper_dir
+        self.index_file = index_file
+        self.started = time.time()
+        self.requests = 0
+        self.last_apply = None
+        # Kept across requests and synced with the catalog on every search
+        self.search_index = PaletteSearchIndex()
+        # Config rewrites must not interleave, status queries may run alongside
+        self.apply_lock = threading.Lock()
+
+    def handle(self, line):
+        """Dispatch one request line and return a JSON-serializable response"""
+        self.requests += 1
+        command, _, arg = line.strip().partition(' ')
+        arg = arg.strip()
+
+        if command == 'apply':
+            if not arg or not os.path.isfile(arg):
+                return {'ok': False, 'error': f'Wallpaper file not found: {arg}'}
+            return self._apply(arg)
+        elif command in ('next', 'select'):
+            if not self.wallpaper_dir:
+                return {'ok': False, 'error': 'Daemon was started without --wallpaper-dir'}
+            mode = arg or 'next'
+            if mode not in SELECTION_MODES + SEARCH_MODES:
+                return {'ok': False, 'error': f'Unknown selection mode: {mode}'}
+            try:
+                with self.catalog() as catalog:
+                    wallpaper = select_wallpaper(catalog, mode, self.search_index, self.processor)
+            except (OSError, ValueError) as e:
+                return {'ok': False, 'error': str(e)}
+            # select only moves the cursor, the caller applies the wallpaper itself
+            if command == 'select':
+                return {'ok': True, 'wallpaper': wallpaper}
+            return self._apply(wallpaper)
+        elif command == 'dry-run':
+            if not arg or not os.path.isfile(arg):
+                return {'ok': False, 'error': f'Wallpaper file not found: {arg}'}
+            colors = self.processor.extract_dominant_colors_kmeans(arg)
+            return {'ok': True, 'wallpaper': arg, 'palette': [self.processor.rgb_to_hex(*c) for c in colors]}
+        elif command == 'status':
+            return self.status()
+
+        return {'ok': False, 'error': f'Unknown command: {command}'}
+
+    def catalog(self):
+        return WallpaperCatalog(self.wallpaper_dir, index_file=self.index_file)
+
+    def _apply(self, wallpaper):
+        start = time.time()
+        with self.apply_lock:
+            response = self.processor.apply_wallpaper(wallpaper)
+        response['elapsed'] = round(time.time() - start, 3)
+        self.last_apply = {'wallpaper': wallpaper, 'ok': response['ok'], 'time': time.time()}
+
+        # Remember the palette in the catalog for wallpapers from the cycled directory
+        cycled = self.wallpaper_dir and os.path.dirname(os.path.abspath(wallpaper)) == os.path.abspath(self.wallpaper_dir)
+        if response['ok'] and cycled:
+            try:
+                with self.catalog() as catalog:
+                    catalog.update(os.path.basename(wallpaper), palette=response['palette'])
+            except (OSError, ValueError) as e:
+                print(f'Warning: Could not update wallpaper catalog: {e}', file=sys.stderr)
+        return response
+
+    def status(self):
+        cache = self.processor.palette_cache
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'wm': self.wm_type,
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'last_apply': self.last_apply,
+            'quantizer': self.processor.quantizer,
+            'cache': cache.stats() if cache else None,
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode('utf-8', 'replace')
+        if not line.strip():
+            return
+        try:
+            response = self.server.daemon.handle(line)
+        except Exception as e:
+            print(f'Error handling request {line.strip()!r}: {e}', file=sys.stderr)
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response) + '\n').encode())
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _socket_in_use(socket_path):
+    """Return True if another daemon is answering on the socket"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(daemon, socket_path):
+    """Serve requests on a Unix socket until terminated"""
+    if os.path.exists(socket_path):
+        if _socket_in_use(socket_path):
+            print(f'Error: Theming daemon already running on {socket_path}', file=sys.stderr)
+            return 1
+        os.remove(socket_path)
+
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(socket_path, _RequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon = daemon
+
+    def shutdown(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f'Theming daemon listening on {socket_path}', file=sys.stderr)
+    startup_profile.mark()
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+    return 0
+
+
+def serve_command(args, use_cache=True, quantizer=DEFAULT_QUANTIZER, lockscreen=None, live_push=None):
+    """Handle `color_processor.py serve [options] <wm_type> [config_paths...]`"""
+    socket_path = default_socket_path()
+    wallpaper_dir = None
+    index_file = os.path.expanduser('~/.wallpaper_index')
+    positional = []
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--socket' and i + 1 < len(args):
+            socket_path = args[i + 1]
+            i += 2
+        elif args[i] == '--wallpaper-dir' and i + 1 < len(args):
+            wallpaper_dir = args[i + 1]
+            i += 2
+        elif args[i] == '--index-file' and i + 1 < len(args):
+            index_file = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    config_paths = parse_config_paths(positional)
+    if config_paths is None:
+        return 1
+
+    processor = ColorProcessor(config_paths, PaletteCache() if use_cache else None, quantizer,
+                               bundles=BundleStore() if use_cache else None, lockscreen=lockscreen,
+                               live_push=live_push)
+    daemon = ThemingDaemon(processor, positional[0], wallpaper_dir, index_file)
+    return serve(daemon, socket_path)
@@ -45,9 +45,39 @@ esac
 TERMINAL_CONFIG="$CONFIG_DIR/kitty/kitty.conf"
 NVIM_CONFIG="$CONFIG_DIR/nvim/init.vim"
 
+# Window manager type and config paths as passed to color_processor.py
+case "$WM" in
+    "i3")
+        CONFIG_ARGS=("i3" "$WM_CONFIG" "$TERMINAL_CONFIG" "$NOTIFICATION_CONFIG" "$BAR_CONFIG" "$NVIM_CONFIG")
+        ;;
+    "hyprland")
+        CONFIG_ARGS=("hyprland" "$WM_CONFIG" "$TERMINAL_CONFIG" "$NOTIFICATION_CONFIG" "$BAR_CONFIG" "$BAR_STYLE_CONFIG" "$NVIM_CONFIG")
+        ;;
+esac
+
+# Theming daemon socket (see color_processor.py serve)
+THEMING_SOCKET="${THEMING_SOCKET:-${XDG_RUNTIME_DIR:-/run/user/$(id -u)}/theming.sock}"
+
+# Blurred lock image, rendered and cached per wallpaper and resolution by lockscreen.py.
+# The resolution is detected from the focused monitor unless LOCK_RESOLUTION (WxH) is set.
+LOCK_IMAGE="$HOME/.cache/betterlockscreen/current/lock_blur.png"
+LOCK_ARGS=(--lock-image "$LOCK_IMAGE")
+if [ -n "$LOCK_RESOLUTION" ]; then
+    LOCK_ARGS+=(--lock-resolution "$LOCK_RESOLUTION")
+fi
+# Serializes background prefetches of the next wallpaper
+PREFETCH_LOCK="${XDG_RUNTIME_DIR:-/tmp}/theming-prefetch.lock"
+
 # Parse command line arguments
 DRY_RUN=false
 SPECIFIC_WALLPAPER=""
+SELECT_MODE="next"
+CACHE_FLAG=""
+QUANTIZER_ARGS=()
+PURGE_CACHE=false
+BUILD_INDEX=false
+PRECOMPUTE=false
+SERVE=false
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -59,12 +89,51 @@ while [[ $# -gt 0 ]]; do
             SPECIFIC_WALLPAPER="$2"
             shift 2
             ;;
+        --previous|--random|--shuffle|--similar|--contrast)
+            SELECT_MODE="${1#--}"
+            shift
+            ;;
+        --no-cache)
+            CACHE_FLAG="--no-cache"
+            shift
+            ;;
+        --quantizer)
+            QUANTIZER_ARGS=(--quantizer "$2")
+            shift 2
+            ;;
+        --purge-cache)
+            PURGE_CACHE=true
+            shift
+            ;;
+        --index)
+            BUILD_INDEX=true
+            shift
+            ;;
+        --precompute)
+            PRECOMPUTE=true
+            shift
+            ;;
+        --serve)
+            SERVE=true
+            shift
+            ;;
         --help)
             echo "Usage: $0 [OPTIONS]"
             echo ""
             echo "Options:"
             echo "  --dry-run           Test color extraction without applying changes"
             echo "  --wallpaper FILE    Use specific wallpaper file instead of cycling"
+            echo "  --previous          Cycle backwards instead of to the next wallpaper"
+            echo "  --random            Pick a random wallpaper (never the current one)"
+            echo "  --shuffle           Shuffle through every wallpaper once before repeating"
+            echo "  --similar           Pick the wallpaper whose palette is closest to the current one"
+            echo "  --contrast          Pick the wallpaper whose palette is furthest from the current one"
+            echo "  --no-cache          Bypass the palette cache and re-extract colors"
+            echo "  --quantizer NAME    Color quantizer: kmeans (default), median-cut, histogram, sklearn"
+            echo "  --purge-cache       Remove stale palette cache entries and exit"
+            echo "  --index             Pre-extract palettes for the whole wallpaper directory and exit"
+            echo "  --precompute        Pre-render every config for the whole wallpaper directory and exit"
+            echo "  --serve             Run the theming daemon so later switches skip Python startup"
             echo "  --help              Show this help message"
             echo ""
             echo "Environment Variables:"
@@ -90,11 +159,31 @@ fi
 # Activate virtual environment
 source "$VENV_DIR/bin/activate"
 
+if [ "$PURGE_CACHE" = "true" ]; then
+    python3 "$SCRIPT_DIR/color_processor.py" cache purge
+    exit $?
+fi
+
 if [ ! -d "$WALLPAPER_DIR" ]; then
     echo "Error: Wallpaper directory $WALLPAPER_DIR does not exist" >&2
     exit 1
 fi
 
+if [ "$SERVE" = "true" ]; then
+    exec python3 "$SCRIPT_DIR/color_processor.py" "${QUANTIZER_ARGS[@]}" "${LOCK_ARGS[@]}" serve --socket "$THEMING_SOCKET" \
+        --wallpaper-dir "$WALLPAPER_DIR" --index-file "$INDEX_FILE" "${CONFIG_ARGS[@]}"
+fi
+
+if [ "$BUILD_INDEX" = "true" ]; then
+    nice -n 19 python3 "$SCRIPT_DIR/color_processor.py" "${QUANTIZER_ARGS[@]}" index "$WALLPAPER_DIR"
+    exit $?
+fi
+
+if [ "$PRECOMPUTE" = "true" ]; then
+    nice -n 19 python3 "$SCRIPT_DIR/color_processor.py" "${QUANTIZER_ARGS[@]}" precompute "$WALLPAPER_DIR" "${CONFIG_ARGS[@]}"
+    exit $?
+fi
+
 # Check for wallpaper command based on window manager
 case "$WM" in
     "hyprland")
@@ -111,11 +200,21 @@ case "$WM" in
         ;;
 esac
 
+# Send a request to the theming daemon; returns 2 if it is not running
+daemon_request() {
+    [ -z "$CACHE_FLAG" ] && [ ${#QUANTIZER_ARGS[@]} -eq 0 ] && [ -S "$THEMING_SOCKET" ] || return 2
+    python3 "$SCRIPT_DIR/theming_client.py" --socket "$THEMING_SOCKET" "$@"
+}
+
 extract_colors_and_update_configs() {
     local wallpaper_path="$1"
     local dry_run="$2"
     
     if [ "$dry_run" = "true" ]; then
+        daemon_request dry-run "$wallpaper_path" >&2
+        local rc=$?
+        [ $rc -ne 2 ] && return $rc
+
         echo "DRY RUN: Would extract colors from: $wallpaper_path" >&2
         echo "DRY RUN: Would update configs for $WM window manager" >&2
         # Just test color extraction without updating configs
@@ -123,6 +222,7 @@ extract_colors_and_update_configs() {
 import sys
 sys.path.insert(0, '$SCRIPT_DIR')
 from color_processor import ColorProcessor
+from palette_cache import PaletteCache
 
 # Build config paths based on window manager
 config_paths = {'kitty': '$TERMINAL_CONFIG', 'nvim': '$NVIM_CONFIG'}
@@ -140,29 +240,46 @@ elif '$WM' == 'hyprland':
         'waybar_style': '$BAR_STYLE_CONFIG' if '$BAR_STYLE_CONFIG' else None
     })
 
-processor = ColorProcessor(config_paths)
+processor = ColorProcessor(config_paths, None if '$CACHE_FLAG' else PaletteCache(), '${QUANTIZER_ARGS[1]:-kmeans}')
 colors = processor.extract_dominant_colors_kmeans('$wallpaper_path')
 print(f'Extracted colors: {[processor.rgb_to_hex(*c) for c in colors]}', file=sys.stderr)
 "
         return 0
     else
-        # Use the new color processor script with window manager detection
-        case "$WM" in
-            "i3")
-                python3 "$SCRIPT_DIR/color_processor.py" "$wallpaper_path" "i3" "$WM_CONFIG" "$TERMINAL_CONFIG" "$NOTIFICATION_CONFIG" "$BAR_CONFIG" "$NVIM_CONFIG"
-                ;;
-            "hyprland")
-                python3 "$SCRIPT_DIR/color_processor.py" "$wallpaper_path" "hyprland" "$WM_CONFIG" "$TERMINAL_CONFIG" "$NOTIFICATION_CONFIG" "$BAR_CONFIG" "$BAR_STYLE_CONFIG" "$NVIM_CONFIG"
-                ;;
-        esac
+        # Prefer the resident daemon, fall back to a one-shot run if it is not there.
+        # Both report the targets whose config files were rewritten: the daemon as a JSON
+        # list, the one-shot run as {"ok": ..., "changed": [...]}; the orchestrator takes either.
+        CHANGED_TARGETS=$(daemon_request --field changed apply "$wallpaper_path")
+        local rc=$?
+        if [ $rc -eq 2 ]; then
+            CHANGED_TARGETS=$(python3 "$SCRIPT_DIR/color_processor.py" $CACHE_FLAG "${QUANTIZER_ARGS[@]}" "${LOCK_ARGS[@]}" "$wallpaper_path" "${CONFIG_ARGS[@]}")
+            rc=$?
+        fi
         
-        if [ $? -ne 0 ]; then
+        if [ $rc -ne 0 ]; then
             echo "Error: Color processing failed. Some configs may not have been updated." >&2
             return 1
         fi
     fi
 }
 
+# Prepare the wallpaper the next cycle will pick (palette, config bundle and lock image)
+# in the background at idle CPU and IO priority, so the next switch is a cache hit
+prefetch_next_wallpaper() {
+    [ -z "$CACHE_FLAG" ] || return 0
+    (
+        renice -n 19 -p $BASHPID >/dev/null 2>&1
+        ionice -c 3 -p $BASHPID >/dev/null 2>&1
+        # One prefetch at a time; a queued one still peeks the latest cycle position
+        if command -v flock &> /dev/null; then
+            flock 9
+        fi
+        export OMP_NUM_THREADS=1 OPENBLAS_NUM_THREADS=1 MKL_NUM_THREADS=1
+        python3 "$SCRIPT_DIR/color_processor.py" "${QUANTIZER_ARGS[@]}" "${LOCK_ARGS[@]}" prefetch \
+            --index-file "$INDEX_FILE" --mode "$SELECT_MODE" "$WALLPAPER_DIR" "${CONFIG_ARGS[@]}"
+    ) 9>"$PREFETCH_LOCK" >/dev/null 2>&1 &
+}
+
 # Handle wallpaper selection
 if [ -n "$SPECIFIC_WALLPAPER" ]; then
     # Use specific wallpaper file
@@ -172,47 +289,21 @@ if [ -n "$SPECIFIC_WALLPAPER" ]; then
     fi
     WALLPAPER="$SPECIFIC_WALLPAPER"
 else
-    # Cycle through wallpapers in directory
-    WALLPAPER=$(python3 -c "
-import os
-import sys
-
-wallpaper_dir = sys.argv[1]
-index_file = sys.argv[2]
-
-image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
-
-try:
-    wallpapers = sorted([f for f in os.listdir(wallpaper_dir) 
-                        if os.path.isfile(os.path.join(wallpaper_dir, f)) 
-                        and any(f.lower().endswith(ext) for ext in image_extensions)])
-    
-    if not wallpapers:
-        print('Error: No image files found in wallpaper directory', file=sys.stderr)
-        sys.exit(1)
-    
-    if not os.path.exists(index_file):
-        with open(index_file, 'w') as f:
-            f.write('0')
-    
-    with open(index_file) as f:
-        idx = int(f.read().strip())
-    
-    if idx >= len(wallpapers):
-        idx = 0
-    
-    wallpaper = wallpapers[idx]
-    next_idx = (idx + 1) % len(wallpapers)
-    
-    with open(index_file, 'w') as f:
-        f.write(str(next_idx))
-    
-    print(os.path.join(wallpaper_dir, wallpaper))
-    
-except Exception as e:
-    print(f'Error: {e}', file=sys.stderr)
-    sys.exit(1)
-" "$WALLPAPER_DIR" "$INDEX_FILE")
+    # Cycle through wallpapers in directory (the catalog only re-lists it when it changed).
+    # The daemon keeps the palette search index warm; without it, palette searches need
+    # NumPy while plain cycling only needs the stdlib catalog.
+    WALLPAPER=$(daemon_request --field wallpaper select "$SELECT_MODE")
+    if [ $? -eq 2 ]; then
+        case "$SELECT_MODE" in
+            similar|contrast)
+                WALLPAPER=$(python3 "$SCRIPT_DIR/color_processor.py" $CACHE_FLAG "${QUANTIZER_ARGS[@]}" select \
+                    --index-file "$INDEX_FILE" "$WALLPAPER_DIR" "$SELECT_MODE")
+                ;;
+            *)
+                WALLPAPER=$(python3 "$SCRIPT_DIR/wallpaper_catalog.py" --index-file "$INDEX_FILE" "$WALLPAPER_DIR" "$SELECT_MODE")
+                ;;
+        esac
+    fi
 fi
 
 if [ $? -ne 0 ] || [ -z "$WALLPAPER" ]; then
@@ -246,96 +337,31 @@ else
             fi
         fi
         
-        # Set wallpaper based on window manager
-        case "$WM" in
-            "hyprland")
-                # Kill existing wallpaper processes
-                pkill hyprpaper >/dev/null 2>&1
-                pkill swaybg >/dev/null 2>&1
-                pkill wpaperd >/dev/null 2>&1
-                sleep 0.2
-
-                # Set wallpaper using available tool
-                # Prefer swaybg as it's simpler and more reliable
-                if command -v swaybg &> /dev/null; then
-                    swaybg -i "$WALLPAPER" -m fill &
-                elif command -v hyprpaper &> /dev/null; then
-                    # Update permanent hyprpaper config
-                    HYPRPAPER_CONF="$HOME/.config/hypr/hyprpaper.conf"
-                    mkdir -p "$(dirname "$HYPRPAPER_CONF")"
-                    echo "preload = $WALLPAPER" > "$HYPRPAPER_CONF"
-                    echo "wallpaper = ,$WALLPAPER" >> "$HYPRPAPER_CONF"
-                    hyprpaper &
-                    sleep 0.5
-                elif command -v wpaperd &> /dev/null; then
-                    wpaperd &
-                fi
-                
-                # Reload Hyprland config
-                hyprctl reload >/dev/null 2>&1
-                
-                # Restart waybar if it exists
-                if command -v waybar &> /dev/null; then
-                    # Send SIGUSR2 to reload CSS, then restart if that fails
-                    pkill -SIGUSR2 waybar >/dev/null 2>&1
-                    sleep 0.3
-                    
-                    # If waybar isn't running, start it fresh
-                    if ! pgrep waybar >/dev/null 2>&1; then
-                        waybar >/dev/null 2>&1 &
-                        sleep 0.5
-                    fi
-                fi
-                
-                # Update hyprlock config with current wallpaper
-                HYPRLOCK_CONFIG="$HOME/.config/hypr/hyprlock.conf"
-                if [ -f "$HYPRLOCK_CONFIG" ]; then
-                    sed -i "s|path = .*|path = $WALLPAPER|g" "$HYPRLOCK_CONFIG"
-                    echo "Updated hyprlock with: $WALLPAPER" >&2
-                fi
-                
-                # Restart mako notifications
-                pkill mako >/dev/null 2>&1
-                sleep 0.3
-                if command -v mako &> /dev/null; then
-                    mako &
-                    sleep 0.5
-                fi
-                ;;
-            "i3")
-                xwallpaper --zoom "$WALLPAPER" &
-                
-                # First kill i3blocks before reloading i3
-                pkill i3blocks >/dev/null 2>&1
-                sleep 0.2
-                
-                # Reload i3 config which should restart i3blocks with new config
-                i3-msg reload >/dev/null 2>&1
-                
-                # If i3blocks didn't restart automatically, start it manually
-                sleep 0.5
-                if ! pgrep i3blocks >/dev/null 2>&1; then
-                    i3blocks &
-                fi
-                
-                pkill dunst >/dev/null 2>&1
-                dunst &
-                ;;
-        esac
+        if [ "$WM" = "hyprland" ]; then
+            # Update hyprlock config with current wallpaper
+            HYPRLOCK_CONFIG="$HOME/.config/hypr/hyprlock.conf"
+            if [ -f "$HYPRLOCK_CONFIG" ]; then
+                sed -i "s|path = .*|path = $WALLPAPER|g" "$HYPRLOCK_CONFIG"
+                echo "Updated hyprlock with: $WALLPAPER" >&2
+            fi
+        fi
         
-        # Update lockscreen with current wallpaper using simple approach
-        echo "Updating lockscreen cache..." >&2
-        mkdir -p ~/.cache/betterlockscreen/current/
-        RESOLUTION=$(xrandr | grep ' connected' | head -1 | awk '{print $4}' | cut -d'+' -f1)
-        convert "$WALLPAPER" -resize "${RESOLUTION}^" -gravity center -extent "$RESOLUTION" -blur 0x8 ~/.cache/betterlockscreen/current/lock_blur.png 2>/dev/null || echo "Warning: Failed to update lockscreen"
+        # Set the wallpaper and reload only daemons whose configs changed, all in parallel.
+        # Returns once each one is ready, so the notification below reaches a live daemon.
+        RELOAD_ARGS=()
+        if [ -n "$CHANGED_TARGETS" ]; then
+            RELOAD_ARGS=(--changed "$CHANGED_TARGETS")
+        fi
+        python3 "$SCRIPT_DIR/reload_orchestrator.py" "${RELOAD_ARGS[@]}" "$WM" "$WALLPAPER" || \
+            echo "Warning: Some components failed to reload" >&2
         
-        # Send notification - wait a bit for notification daemon to be ready
-        sleep 0.5
         if command -v notify-send &> /dev/null; then
             notify-send "Wallpaper Updated" "New color scheme applied! 🎨" >/dev/null 2>&1 &
         fi
         
         echo "Wallpaper and color scheme updated successfully" >&2
+        
+        prefetch_next_wallpaper
     else
         echo "Color processing failed. Wallpaper not changed." >&2
         exit 1
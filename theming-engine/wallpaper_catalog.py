@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Persistent wallpaper catalog: ordered listing, cycle cursor and per-image metadata
+
+The directory is only listed again when its mtime changes (a file was added,
+removed or renamed), so picking a wallpaper costs one stat instead of a
+listdir plus a stat per entry. Stdlib only, so the cycler can call it cheaply.
+"""
+
+import bisect
+import fcntl
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+import config_writer
+import startup_profile
+from palette_cache import CACHE_ROOT
+from palette_index import list_wallpapers
+
+# Bump whenever the catalog layout changes
+CATALOG_VERSION = 1
+
+DEFAULT_CATALOG_DIR = os.path.join(CACHE_ROOT, 'catalogs')
+SELECTION_MODES = ('next', 'previous', 'random', 'shuffle')
+
+
+def default_catalog_path(wallpaper_dir):
+    """One catalog file per wallpaper directory"""
+    digest = hashlib.blake2b(os.path.abspath(wallpaper_dir).encode(), digest_size=8).hexdigest()
+    return os.path.join(DEFAULT_CATALOG_DIR, f'{digest}.json')
+
+
+def _hex(color):
+    return color if isinstance(color, str) else '#{:02x}{:02x}{:02x}'.format(*color)
+
+
+class WallpaperCatalog:
+    """Catalog of one wallpaper directory, locked and loaded for the duration of a `with` block
+
+    position is the index of the wallpaper shown last (-1 before the first pick)
+    and current its name, so the cursor survives files being added or removed.
+    bag holds the names still to be drawn in the current shuffle round.
+    """
+
+    def __init__(self, wallpaper_dir, catalog_path=None, index_file=None):
+        self.wallpaper_dir = os.path.abspath(wallpaper_dir)
+        self.path = catalog_path or default_catalog_path(wallpaper_dir)
+        # Legacy ~/.wallpaper_index cursor, only read to seed a new catalog
+        self.index_file = index_file
+        self.data = None
+        self.dirty = False
+        self._positions = None
+        self._lock_fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock_fd = os.open(f'{self.path}.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self.data = self._load()
+            self.refresh()
+        except BaseException:
+            os.close(self._lock_fd)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.dirty and exc_type is None:
+                self.save()
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(self._lock_fd)
+
+    def _legacy_position(self):
+        try:
+            with open(self.index_file) as f:
+                # The legacy file stores the position to show next
+                return int(f.read().strip()) - 1
+        except (TypeError, FileNotFoundError, ValueError):
+            return -1
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CATALOG_VERSION and data.get('dir') == self.wallpaper_dir:
+                return data
+        except (FileNotFoundError, ValueError):
+            pass
+        self.dirty = True
+        return {
+            'version': CATALOG_VERSION,
+            'dir': self.wallpaper_dir,
+            'dir_mtime': None,
+            'files': [],
+            'position': self._legacy_position(),
+            'current': None,
+            'bag': [],
+            'upcoming_random': None,
+            'images': {},
+        }
+
+    def save(self):
+        config_writer.write_atomic(self.path, json.dumps(self.data, separators=(',', ':')))
+        self.dirty = False
+
+    @property
+    def files(self):
+        return self.data['files']
+
+    def refresh(self, force=False):
+        """List the directory again if its mtime changed, returning True if the listing changed"""
+        mtime = os.stat(self.wallpaper_dir).st_mtime_ns
+        if not force and self.data['dir_mtime'] == mtime:
+            return False
+        files = list_wallpapers(self.wallpaper_dir)
+        self.data['dir_mtime'] = mtime
+        self.dirty = True
+        if files == self.files:
+            return False
+        self._reindex(files)
+        return True
+
+    def _reindex(self, files):
+        data = self.data
+        present = set(files)
+        previous = set(data['files'])
+        data['files'] = files
+        self._positions = None
+
+        # Keep the cursor on the wallpaper shown last, or where it would sort if it is gone
+        current = data['current']
+        if current in present:
+            data['position'] = self._position_map()[current]
+        elif current is not None:
+            data['position'] = bisect.bisect_left(files, current) - 1
+        data['position'] = min(data['position'], len(files) - 1)
+
+        data['images'] = {name: info for name, info in data['images'].items() if name in present}
+        if data['upcoming_random'] not in present:
+            data['upcoming_random'] = None
+
+        # New files join the running shuffle round at random places
+        bag = [name for name in data['bag'] if name in present]
+        if bag:
+            for name in present - previous:
+                bag.insert(random.randint(0, len(bag)), name)
+        data['bag'] = bag
+
+    def _position_map(self):
+        if self._positions is None:
+            self._positions = {name: i for i, name in enumerate(self.files)}
+        return self._positions
+
+    def _random_other(self):
+        """Uniformly random wallpaper other than the current one"""
+        files = self.files
+        if len(files) == 1:
+            return files[0]
+        i = random.randrange(len(files) - 1)
+        if self.data['current'] in self._position_map() and i >= self.data['position']:
+            i += 1
+        return files[i]
+
+    def _upcoming(self, mode):
+        files = self.files
+        if not files:
+            raise FileNotFoundError('No image files found in wallpaper directory')
+        position = self.data['position']
+
+        if mode == 'next':
+            return files[(position + 1) % len(files)]
+        if mode == 'previous':
+            return files[(position - 1) % len(files)]
+        if mode == 'random':
+            # Drawn ahead of time so peek() and the following select() agree
+            if self.data['upcoming_random'] is None:
+                self.data['upcoming_random'] = self._random_other()
+                self.dirty = True
+            return self.data['upcoming_random']
+        if mode == 'shuffle':
+            if not self.data['bag']:
+                bag = list(files)
+                random.shuffle(bag)
+                # A new round must not start with the wallpaper just shown
+                if len(bag) > 1 and bag[-1] == self.data['current']:
+                    bag[0], bag[-1] = bag[-1], bag[0]
+                self.data['bag'] = bag
+                self.dirty = True
+            return self.data['bag'][-1]
+        raise ValueError(f'Unknown selection mode: {mode}')
+
+    def peek(self, mode='next'):
+        """Path select(mode) will return next, without moving the cursor"""
+        return os.path.join(self.wallpaper_dir, self._upcoming(mode))
+
+    def select(self, mode='next'):
+        """Move the cursor according to mode and return the chosen wallpaper's path"""
+        name = self._upcoming(mode)
+        if mode == 'random':
+            self.data['upcoming_random'] = None
+        elif mode == 'shuffle':
+            self.data['bag'].pop()
+        self.mark_shown(name)
+        return os.path.join(self.wallpaper_dir, name)
+
+    def mark_shown(self, name):
+        self.data['position'] = self._position_map()[name]
+        self.data['current'] = name
+        self.data['images'].setdefault(name, {})['last_shown'] = time.time()
+        self.dirty = True
+
+    def describe(self, name):
+        """Metadata for one wallpaper; content-derived fields are dropped once the file changes"""
+        info = self.data['images'].setdefault(name, {})
+        st = os.stat(os.path.join(self.wallpaper_dir, name))
+        if info.get('mtime') != st.st_mtime_ns or info.get('size') != st.st_size:
+            for field in ('hash', 'width', 'height', 'palette'):
+                info.pop(field, None)
+            info.update(mtime=st.st_mtime_ns, size=st.st_size)
+            self.dirty = True
+        return info
+
+    def update(self, name, **metadata):
+        """Record metadata (hash, width, height, palette) for a wallpaper in the catalog"""
+        if name not in self._position_map():
+            return
+        info = self.describe(name)
+        if 'palette' in metadata:
+            metadata['palette'] = [_hex(color) for color in metadata['palette']]
+        info.update(metadata)
+        self.dirty = True
+
+    def merge_index(self, entries):
+        """Copy hash, dimensions and palette from palette index entries for this directory"""
+        positions = self._position_map()
+        for path, entry in entries.items():
+            name = os.path.basename(path)
+            if os.path.dirname(path) != self.wallpaper_dir or name not in positions:
+                continue
+            try:
+                info = self.describe(name)
+            except OSError:
+                continue
+            # Skip entries indexed from an older version of the file
+            if (info['mtime'], info['size']) != (entry['mtime'], entry['size']):
+                continue
+            metadata = {'hash': entry['hash'], 'palette': entry['colors']}
+            if 'width' in entry:
+                metadata.update(width=entry['width'], height=entry['height'])
+            self.update(name, **metadata)
+
+    def summary(self):
+        return {
+            'dir': self.wallpaper_dir,
+            'count': len(self.files),
+            'current': self.data['current'],
+            'position': self.data['position'],
+            'shuffle_remaining': len(self.data['bag']),
+            'described': len(self.data['images']),
+        }
+
+
+def main():
+    startup_profile.maybe_profile()
+    args = sys.argv[1:]
+    index_file = None
+    if len(args) > 1 and args[0] == '--index-file':
+        index_file = args[1]
+        args = args[2:]
+
+    commands = SELECTION_MODES + ('peek', 'refresh', 'info')
+    if len(args) < 2 or args[1] not in commands or not os.path.isdir(args[0]):
+        print("Usage: wallpaper_catalog.py [--profile-startup] [--index-file PATH] <wallpaper_dir> "
+              "<next|previous|random|shuffle|peek [MODE]|refresh|info [NAME]>", file=sys.stderr)
+        sys.exit(1)
+    wallpaper_dir, command, rest = args[0], args[1], args[2:]
+    startup_profile.mark()
+
+    try:
+        with WallpaperCatalog(wallpaper_dir, index_file=index_file) as catalog:
+            if command in SELECTION_MODES:
+                print(catalog.select(command))
+            elif command == 'peek':
+                print(catalog.peek(rest[0] if rest else 'next'))
+            elif command == 'refresh':
+                catalog.refresh(force=True)
+                print(f'Catalog holds {len(catalog.files)} wallpapers', file=sys.stderr)
+            elif rest:
+                print(json.dumps(catalog.describe(rest[0])))
+            else:
+                print(json.dumps(catalog.summary()))
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()